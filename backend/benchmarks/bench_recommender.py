@@ -0,0 +1,100 @@
+"""
+Micro-benchmarks for the recommender at several catalog sizes.
+
+    python benchmarks/bench_recommender.py [--sizes 22000,220000,2200000] [--queries 200] [--out results.json]
+
+For each synthetic catalog (benchmarks/synthetic.py) times:
+  * build              Recommender.build, i.e. load_data minus reading the JSON files
+  * get_recommendations  random titles, default weights; plus a constrained and an MMR variant
+  * search_by_ai_intent  a fixed mix of parsed intents (SerpApi enrichment stubbed out)
+  * get_curated_content
+and merges the results into benchmarks/results.json. load_data on the real
+dataset files is timed too when they are present. 2.2M rows needs ~6 GB of RAM.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ml import recommender as recommender_module
+from ml.recommender import Recommender
+from results import DEFAULT_RESULTS_PATH, summarise, write_results
+from synthetic import make_catalog
+
+INTENTS = [
+    {"genre": "comedy", "sort_by": "rating", "limit": 10},
+    {"platform": "netflix", "year": [2010, 2020], "limit": 10},
+    {"genre": "horror", "min_rating": 7, "sort_by": "year", "limit": 20},
+    {"keyword": "dark", "limit": 10},
+    {"type": "tv show", "platform": "hulu", "limit": 10},
+]
+
+
+def timed(fn, calls):
+    samples = []
+    for args in calls:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_size(n, queries, seed):
+    rng = random.Random(seed)
+    df = make_catalog(n, seed)
+    results = {}
+
+    engine = Recommender()
+    start = time.perf_counter()
+    engine.build(df)
+    results[f"recommender.build[{n}]"] = {"seconds": round(time.perf_counter() - start, 3)}
+
+    titles = [rng.choice(df["Title"].tolist()) for _ in range(queries)]
+    results[f"recommender.get_recommendations[{n}]"] = summarise(
+        timed(lambda title: engine.get_recommendations(title, 10), [(t,) for t in titles]))
+    constraints = {"platform": "Netflix", "year_from": 2000, "min_imdb": 6.5}
+    results[f"recommender.get_recommendations_constrained[{n}]"] = summarise(
+        timed(lambda title: engine.get_recommendations(title, 10, constraints=constraints), [(t,) for t in titles]))
+    results[f"recommender.get_recommendations_mmr[{n}]"] = summarise(
+        timed(lambda title: engine.get_recommendations(title, 10, mmr_lambda=0.7), [(t,) for t in titles]))
+
+    intents = [(INTENTS[i % len(INTENTS)],) for i in range(max(queries // 10, len(INTENTS)))]
+    results[f"recommender.search_by_ai_intent[{n}]"] = summarise(timed(engine.search_by_ai_intent, intents))
+    results[f"recommender.get_curated_content[{n}]"] = summarise(timed(engine.get_curated_content, [()] * 5))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="22000,220000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=DEFAULT_RESULTS_PATH)
+    args = parser.parse_args()
+
+    # No network in benchmarks: SerpApi enrichment always misses
+    recommender_module.serp_api_service.search_movie_info = lambda title, year=None: None
+
+    results = {}
+    start = time.perf_counter()
+    engine = Recommender()
+    engine.load_data()
+    if engine.df is not None and not engine.df.empty:
+        results["recommender.load_data[dataset]"] = {
+            "seconds": round(time.perf_counter() - start, 3), "rows": len(engine.df)}
+
+    for n in (int(size) for size in args.sizes.split(",")):
+        results.update(bench_size(n, args.queries, args.seed))
+
+    print(f"\n{'benchmark':<55} {'p50 ms':>9} {'p99 ms':>9} {'seconds':>8}")
+    for name, metrics in results.items():
+        print(f"{name:<55} {metrics.get('p50_ms', ''):>9} {metrics.get('p99_ms', ''):>9} {metrics.get('seconds', ''):>8}")
+    write_results(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
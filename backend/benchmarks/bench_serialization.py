@@ -0,0 +1,93 @@
+"""
+Measures the JSON encoding cost of large route payloads per 10k documents.
+
+    python benchmarks/bench_serialization.py [--docs 10000] [--repeat 5]
+
+"before" is what FastAPI does for a plain dict return value
+(jsonable_encoder + stdlib json via JSONResponse), "after" is FastJSONResponse
+(orjson, BSON types handled natively) and "pre-encoded" is a PreEncodedCache hit.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from utils.serialization import FastJSONResponse, PreEncodedCache
+
+GENRES = ["Action", "Comedy", "Drama", "Sci-Fi", "Horror", "Romance", "Thriller", "Documentary"]
+PLATFORMS = ["Netflix", "Hulu", "Prime Video", "Disney+"]
+
+
+def make_docs(n):
+    """Documents shaped like the `content` collection as returned by pymongo"""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "title": f"Movie {i}",
+        "platform": rng.choice(PLATFORMS),
+        "imdb": round(rng.uniform(1, 10), 1),
+        "year": rng.randint(1950, 2026),
+        "genres": ",".join(rng.sample(GENRES, 3)),
+        "type": rng.choice(["movie", "tv"]),
+        "views": rng.randint(0, 100000),
+        "created_at": now - timedelta(minutes=i),
+    } for i in range(n)]
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    docs = make_docs(args.docs)
+    # jsonable_encoder cannot handle ObjectId, so the old routes stringified it first
+    legacy_docs = [dict(d, _id=str(d["_id"])) for d in docs]
+    scale = 10000 / args.docs
+
+    def before():
+        return JSONResponse(jsonable_encoder(legacy_docs)).body
+
+    def after():
+        return FastJSONResponse(docs).body
+
+    cache = PreEncodedCache()
+    cache.get_or_encode(("bench",), lambda: docs)
+
+    def pre_encoded():
+        return cache.get_or_encode(("bench",), lambda: docs)
+
+    results = {
+        "before (jsonable_encoder + json)": best_of(before, args.repeat),
+        "after (orjson FastJSONResponse)": best_of(after, args.repeat),
+        "pre-encoded cache hit": best_of(pre_encoded, args.repeat),
+    }
+
+    print(f"Encoding cost per 10k documents (best of {args.repeat}, {args.docs} docs, {len(after())} bytes)")
+    baseline = results["before (jsonable_encoder + json)"]
+    for name, seconds in results.items():
+        ms = seconds * 1000 * scale
+        speedup = baseline / seconds if seconds else float("inf")
+        print(f"  {name:<36} {ms:10.3f} ms   x{speedup:,.1f}")
+
+
+if __name__ == "__main__":
+    main()
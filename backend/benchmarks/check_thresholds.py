@@ -0,0 +1,58 @@
+"""
+Fails (exit 1) when benchmarks/results.json breaks a regression threshold.
+
+    python benchmarks/check_thresholds.py [--results results.json] [--thresholds thresholds.json]
+
+thresholds.json maps benchmark name -> metric -> {"max": x} and/or {"min": y}.
+Benchmarks missing from the results (e.g. a size that was not run) are
+reported as skipped, not failed.
+"""
+import argparse
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def check(results, thresholds):
+    failures, skipped = [], []
+    for name, metrics in thresholds.items():
+        measured = results.get(name)
+        if measured is None:
+            skipped.append(name)
+            continue
+        for metric, bounds in metrics.items():
+            value = measured.get(metric)
+            if value is None:
+                failures.append(f"{name}: metric '{metric}' missing")
+            elif "max" in bounds and value > bounds["max"]:
+                failures.append(f"{name}: {metric} {value} > {bounds['max']}")
+            elif "min" in bounds and value < bounds["min"]:
+                failures.append(f"{name}: {metric} {value} < {bounds['min']}")
+    return failures, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", default=os.path.join(HERE, "results.json"))
+    parser.add_argument("--thresholds", default=os.path.join(HERE, "thresholds.json"))
+    args = parser.parse_args()
+
+    with open(args.results, "r", encoding="utf-8") as f:
+        results = json.load(f).get("benchmarks", {})
+    with open(args.thresholds, "r", encoding="utf-8") as f:
+        thresholds = json.load(f)
+
+    failures, skipped = check(results, thresholds)
+    for name in skipped:
+        print(f"⚠️ skipped {name} (not in results)")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ {len(thresholds) - len(skipped)} benchmarks within thresholds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+HTTP load scenarios covering every router, against a running server.
+
+    # scratch mongod, no external calls: LLMs use FakeProvider, SerpApi has no key
+    MONGO_URI=mongodb://localhost:27017 LLM_PROVIDER=fake SERPAPI_KEY= uvicorn main:app --port 8000
+    python benchmarks/load_api.py --url http://localhost:8000 --concurrency 16 --seconds 10 [--only recommend,search]
+
+Signs up a throwaway user for the authenticated routes, waits for /readyz,
+then runs each scenario for --seconds with --concurrency clients and merges
+p50/p95/p99, req/s and the number of unexpected statuses into
+benchmarks/results.json as "http.<scenario>". Use --seed-content N once to
+fill the scratch database with a synthetic catalog. /events/watch is sent
+with the user token (rate limited per user) unless EVENTS_INGEST_KEY is set
+to the server's key. Needs httpx.
+"""
+import argparse
+import asyncio
+import collections
+import os
+import random
+import sys
+import time
+import uuid
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from results import DEFAULT_RESULTS_PATH, summarise, write_results
+from synthetic import PLATFORMS, make_catalog
+
+TITLES = ["Inception", "The Dark Knight", "Interstellar", "Stranger Things", "The Office", "Parasite"]
+QUERIES = ["dark", "love", "star", "inc", "the", "night", "comedy on netflix", "horror movies from 2019"]
+
+
+def _watch_batch(rng):
+    return [{
+        "title": rng.choice(TITLES),
+        "platform": rng.choice(PLATFORMS),
+        "user_email": f"bench{rng.randint(0, 500)}@example.com",
+        "duration_mins": round(rng.uniform(1, 120), 1),
+    } for _ in range(20)]
+
+
+# name -> (method, path or path(rng), needs auth, json body(rng) or None, accepted statuses)
+SCENARIOS = {
+    "platform": ("GET", lambda rng: f"/platform/{rng.choice(PLATFORMS)}", False, None, {200}),
+    "analytics.genre_popularity": ("GET", "/analytics/genre-popularity", False, None, {200}),
+    "analytics.year_distribution": ("GET", lambda rng: f"/analytics/year-distribution?platform={rng.choice(PLATFORMS)}",
+                                    False, None, {200}),
+    "trending": ("GET", lambda rng: f"/trending/?window={rng.choice(['1h', '24h', '7d'])}", False, None, {200}),
+    "recommend": ("GET", lambda rng: f"/recommend/?title={rng.choice(TITLES)}&limit={rng.choice([5, 10, 20])}",
+                  False, None, {200, 404}),
+    "recommend.uncached": ("GET", lambda rng: f"/recommend/?title={rng.choice(TITLES)}&mmr_lambda={rng.random():.3f}",
+                           False, None, {200, 404}),
+    "search": ("GET", lambda rng: f"/search/?query={rng.choice(QUERIES)}", False, None, {200}),
+    "search.suggest": ("GET", lambda rng: f"/search/suggest?q={rng.choice(QUERIES)[:rng.randint(1, 4)]}",
+                       False, None, {200}),
+    "ai.curated": ("GET", "/ai/curated", False, None, {200}),
+    "ai.search": ("GET", lambda rng: f"/ai/search?q={rng.choice(QUERIES)}", False, None, {200}),
+    "ai.recommendations": ("GET", lambda rng: f"/ai/recommendations?category={rng.choice(['drama', 'comedy'])}",
+                           False, None, {200}),
+    "ai.chat": ("POST", "/ai/chat", True,
+                lambda rng: {"user_email": "bench@example.com", "message": rng.choice(QUERIES)}, {200}),
+    "ai.history": ("GET", "/ai/history", True, None, {200}),
+    "analysis.overview": ("GET", "/analysis-v2/overview", False, None, {200}),
+    "admin.stats": ("GET", "/admin/stats", True, None, {200}),
+    "admin.content_list": ("GET", lambda rng: f"/admin/content-list?page={rng.randint(1, 20)}&limit=20",
+                           True, None, {200}),
+    "admin.user_analytics": ("GET", "/admin/user-analytics?limit=20", True, None, {200}),
+    "events.watch": ("POST", "/events/watch", True, _watch_batch, {202, 429, 503}),
+    # bcrypt bound; 429 is the server shedding load as designed
+    "auth.login": ("POST", "/auth/login", False, None, {200, 429}),
+}
+
+
+async def wait_ready(client, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit("Server did not become ready")
+
+
+async def run_scenario(client, name, scenario, args, headers, credentials):
+    method, path, needs_auth, body, accepted = scenario
+    latencies = []
+    statuses = collections.Counter()
+    deadline = time.perf_counter() + args.seconds
+
+    async def worker(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            kwargs = {"headers": headers if needs_auth else None}
+            if name == "auth.login":
+                kwargs["data"] = credentials
+            elif body is not None:
+                kwargs["json"] = body(rng)
+            url = path(rng) if callable(path) else path
+            start = time.perf_counter()
+            r = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            statuses[r.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(i) for i in range(args.concurrency)])
+    summary = summarise(latencies, time.perf_counter() - start)
+    summary["errors"] = sum(count for code, count in statuses.items() if code not in accepted)
+    summary["statuses"] = {str(code): count for code, count in sorted(statuses.items())}
+    return summary
+
+
+def seed_content(n):
+    import database
+    from synthetic import content_docs
+    db = database.connect_sync()
+    db["content"].insert_many(content_docs(make_catalog(n)), ordered=False)
+    print(f"Inserted {n} synthetic content documents")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--seed-content", type=int, default=0)
+    parser.add_argument("--out", default=DEFAULT_RESULTS_PATH)
+    args = parser.parse_args()
+
+    if args.seed_content:
+        seed_content(args.seed_content)
+
+    names = args.only.split(",") if args.only else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)}")
+
+    limits = httpx.Limits(max_connections=args.concurrency + 2)
+    async with httpx.AsyncClient(base_url=args.url, timeout=30, limits=limits) as client:
+        await wait_ready(client)
+        email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+        credentials = {"username": email, "password": "bench-password"}
+        r = await client.post("/auth/signup", json={"username": email.split("@")[0], "email": email,
+                                                   "password": credentials["password"]})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        if os.getenv("EVENTS_INGEST_KEY"):
+            headers["X-Ingest-Key"] = os.environ["EVENTS_INGEST_KEY"]
+
+        results = {}
+        print(f"{'scenario':<28} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}  statuses")
+        for name in names:
+            summary = await run_scenario(client, name, SCENARIOS[name], args, headers, credentials)
+            results[f"http.{name}"] = summary
+            print(f"{name:<28} {summary.get('rps', 0):>8} {summary.get('p50_ms', 0):>8} "
+                  f"{summary.get('p99_ms', 0):>8} {summary['errors']:>7}  {summary['statuses']}")
+    write_results(results, args.out)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Login-storm load test: non-auth latency while /auth/login is hammered.
+
+    uvicorn main:app --port 8000            # in another shell
+    python benchmarks/load_login_storm.py --url http://localhost:8000 --storm 64 --seconds 20
+
+Signs up a throwaway user, then measures GET /recommend latency from a few
+steady clients twice: once on an idle server ("baseline") and once while
+`--storm` coroutines log in back to back ("storm"). With hashing on the event
+loop the storm p99 jumps to several bcrypt rounds; with the hashing pool it
+should stay close to the baseline, and excess logins are answered with 429.
+Needs httpx (`pip install httpx`).
+"""
+import argparse
+import asyncio
+import collections
+import statistics
+import time
+import uuid
+
+import httpx
+
+PROBE_PATH = "/recommend/?title=Inception"
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[max(0, int(len(values) * pct) - 1)]
+
+
+async def probe(client, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(PROBE_PATH)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def login_loop(client, stop, credentials, statuses):
+    while not stop.is_set():
+        r = await client.post("/auth/login", data=credentials)
+        statuses[r.status_code] += 1
+        if r.status_code == 429:
+            await asyncio.sleep(float(r.headers.get("Retry-After", 1)))
+
+
+async def phase(name, client, seconds, probes, storm, credentials):
+    stop = asyncio.Event()
+    latencies = []
+    statuses = collections.Counter()
+    tasks = [asyncio.create_task(probe(client, stop, latencies)) for _ in range(probes)]
+    tasks += [asyncio.create_task(login_loop(client, stop, credentials, statuses)) for _ in range(storm)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    print(f"{name:<9} {len(latencies):6d} probes   "
+          f"p50 {statistics.median(latencies) * 1000:8.2f} ms   "
+          f"p99 {percentile(latencies, 0.99) * 1000:8.2f} ms   "
+          f"logins {dict(statuses)}")
+    return percentile(latencies, 0.99)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--storm", type=int, default=64, help="concurrent login loops")
+    parser.add_argument("--probes", type=int, default=4, help="concurrent /recommend clients")
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.storm + args.probes + 4)
+    async with httpx.AsyncClient(base_url=args.url, timeout=60, limits=limits) as client:
+        name = f"storm_{uuid.uuid4().hex[:8]}"
+        password = uuid.uuid4().hex
+        r = await client.post("/auth/signup", json={"username": name, "email": f"{name}@example.com", "password": password})
+        r.raise_for_status()
+        credentials = {"username": name, "password": password}
+
+        await client.get(PROBE_PATH)  # warm the response cache
+        baseline = await phase("baseline", client, args.seconds, args.probes, 0, credentials)
+        storm = await phase("storm", client, args.seconds, args.probes, args.storm, credentials)
+        print(f"p99 ratio storm/baseline x{storm / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
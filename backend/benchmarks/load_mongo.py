@@ -0,0 +1,99 @@
+"""
+Concurrent-throughput load test against a local mongod.
+
+    python benchmarks/load_mongo.py --uri mongodb://localhost:27017 --concurrency 64 --requests 5000
+
+Runs the same find_one/find workload from N concurrent coroutines twice:
+  * "sync-on-loop": a pymongo MongoClient called from coroutines, which is what the
+    routes did before (every call blocks the event loop)
+  * "async-pool":   database.connect()'s AsyncMongoClient with the tuned pool
+and prints throughput, p50/p99 latency and the pool statistics.
+Uses its own `ott_bench` database and drops it afterwards.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import MongoClient
+
+import database
+
+BENCH_DB = "ott_bench"
+DOCS = 20000
+
+
+def seed(uri):
+    collection = MongoClient(uri)[BENCH_DB]["content"]
+    collection.drop()
+    rng = random.Random(7)
+    collection.insert_many([{
+        "title": f"Movie {i}",
+        "platform": rng.choice(["Netflix", "Hulu", "Prime Video", "Disney+"]),
+        "imdb": round(rng.uniform(1, 10), 1),
+        "views": rng.randint(0, 100000),
+    } for i in range(DOCS)])
+    collection.create_index("title")
+    collection.create_index([("views", -1)])
+
+
+async def run_workload(name, op, concurrency, total):
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for i in remaining:
+            start = time.perf_counter()
+            await op(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"{name:<14} {total / elapsed:10.1f} req/s   "
+          f"p50 {statistics.median(latencies) * 1000:7.2f} ms   "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.2f} ms")
+    return total / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default=database.MONGO_URI)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    seed(args.uri)
+
+    sync_collection = MongoClient(args.uri)[BENCH_DB]["content"]
+
+    async def sync_op(i):
+        sync_collection.find_one({"title": f"Movie {i % DOCS}"})
+        list(sync_collection.find().sort("views", -1).limit(10))
+
+    database.MONGO_URI = args.uri
+    database.MONGO_DB_NAME = BENCH_DB
+    await database.connect()
+
+    async def async_op(i):
+        await database.content_collection.find_one({"title": f"Movie {i % DOCS}"})
+        await database.content_collection.find().sort("views", -1).limit(10).to_list()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    before = await run_workload("sync-on-loop", sync_op, args.concurrency, args.requests)
+    after = await run_workload("async-pool", async_op, args.concurrency, args.requests)
+    print(f"speedup x{after / before:.2f}")
+    print("pool:", database.pool_stats.snapshot())
+
+    await database.db.client.drop_database(BENCH_DB)
+    await database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Ingestion throughput for POST /events/watch against a running server.
+
+    EVENTS_INGEST_KEY=bench uvicorn main:app --port 8000            # in another shell
+    python benchmarks/load_watch_events.py --url http://localhost:8000 --ingest-key bench --concurrency 32 --batch 50 --seconds 15
+
+Sends batches of synthetic watch events from N concurrent clients and reports
+accepted events/s, request p50/p99 and how many requests were pushed back with
+503 (buffer full). Afterwards prints the buffer counters from /events/stats
+(needs --email/--password of an existing user). Needs httpx.
+"""
+import argparse
+import asyncio
+import collections
+import os
+import random
+import statistics
+import time
+
+import httpx
+
+TITLES = [f"Movie {i}" for i in range(500)]
+PLATFORMS = ["Netflix", "Hulu", "Prime Video", "Disney+"]
+
+
+def make_batch(rng, size):
+    return [{
+        "title": rng.choice(TITLES),
+        "platform": rng.choice(PLATFORMS),
+        "user_email": f"user{rng.randint(0, 5000)}@example.com",
+        "duration_mins": round(rng.uniform(1, 120), 1),
+    } for _ in range(size)]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--ingest-key", default=os.getenv("EVENTS_INGEST_KEY"),
+                        help="the server's EVENTS_INGEST_KEY (trusted ingest, not rate limited)")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    args = parser.parse_args()
+
+    latencies = []
+    statuses = collections.Counter()
+    accepted = 0
+    deadline = time.perf_counter() + args.seconds
+
+    async def worker(client, seed):
+        nonlocal accepted
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            batch = make_batch(rng, args.batch)
+            start = time.perf_counter()
+            r = await client.post("/events/watch", json=batch)
+            latencies.append(time.perf_counter() - start)
+            statuses[r.status_code] += 1
+            if r.status_code == 202:
+                accepted += len(batch)
+            elif r.status_code == 503:
+                await asyncio.sleep(float(r.headers.get("Retry-After", 1)))
+
+    limits = httpx.Limits(max_connections=args.concurrency + 2)
+    headers = {"X-Ingest-Key": args.ingest_key} if args.ingest_key else None
+    async with httpx.AsyncClient(base_url=args.url, timeout=30, limits=limits, headers=headers) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(client, i) for i in range(args.concurrency)])
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        print(f"{accepted / elapsed:10.1f} events/s   {len(latencies) / elapsed:8.1f} req/s   "
+              f"p50 {statistics.median(latencies) * 1000:7.2f} ms   "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.2f} ms   {dict(statuses)}")
+
+        if args.email and args.password:
+            r = await client.post("/auth/login", data={"username": args.email, "password": args.password})
+            token = r.json()["access_token"]
+            await asyncio.sleep(2)  # let the last partial batch flush
+            stats = await client.get("/events/stats", headers={"Authorization": f"Bearer {token}"})
+            print("buffer:", stats.json())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
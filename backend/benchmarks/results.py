@@ -0,0 +1,67 @@
+"""
+Shared helpers for the benchmark scripts: latency summaries and the
+machine-readable results file that check_thresholds.py reads.
+
+results.json looks like
+
+    {"meta": {"git": "...", "python": "...", "updated_at": "..."},
+     "benchmarks": {"recommender.get_recommendations[22000]": {"p50_ms": 1.4, ...}, ...}}
+
+Each script merges its own entries into the file, so the recommender
+micro-benchmarks and the HTTP scenarios can be run separately.
+"""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+DEFAULT_RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.json")
+
+
+def summarise(seconds, elapsed=None):
+    """p50/p95/p99/mean in ms for a list of per-call durations (seconds); rps when `elapsed` is given"""
+    samples = sorted(seconds)
+    if not samples:
+        return {"count": 0}
+
+    def pct(q):
+        return round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 3)
+
+    summary = {
+        "count": len(samples),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+    }
+    if elapsed:
+        summary["rps"] = round(len(samples) / elapsed, 1)
+    return summary
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def write_results(entries: dict, path: str = DEFAULT_RESULTS_PATH):
+    """Merge `entries` (name -> metrics) into the results file"""
+    results = {"benchmarks": {}}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            results = json.load(f)
+    results.setdefault("benchmarks", {}).update(entries)
+    results["meta"] = {
+        "git": _git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Results written to {path}")
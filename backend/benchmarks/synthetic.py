@@ -0,0 +1,90 @@
+"""
+Synthetic catalogs shaped like final_df_cleaned.json, for benchmarks at sizes
+the real dataset does not reach (22k / 220k / 2.2M rows).
+
+Column distributions roughly follow the real data: ~74% movies, 1-4 genres
+from the same 27 labels, IMDb around 6.3, a long tail of directors and one
+to two platforms per title. Generation is vectorised so 2.2M rows take
+seconds, and a fixed seed makes runs comparable.
+"""
+import numpy as np
+import pandas as pd
+
+GENRES = [
+    "Drama", "Comedy", "Thriller", "Action", "Documentary", "Romance", "Horror", "Crime", "Adventure",
+    "Family", "Mystery", "Sci-Fi", "Fantasy", "Biography", "History", "Animation", "Music", "War",
+    "Western", "Musical", "Sport", "Short", "News", "Film-Noir", "Reality-TV", "Talk-Show", "Game-Show",
+]
+# Relative label frequencies in the real catalog
+GENRE_WEIGHTS = np.array([
+    7046, 4489, 3277, 2624, 2359, 2317, 2178, 1784, 1735, 1462, 1236, 1203, 1064, 802, 690, 666, 641,
+    526, 490, 392, 387, 323, 97, 79, 14, 5, 5,
+], dtype=np.float64)
+PLATFORMS = ["Netflix", "Hulu", "Prime Video", "Disney+"]
+PLATFORM_WEIGHTS = np.array([0.40, 0.15, 0.38, 0.07])
+WORDS = [
+    "Dark", "Last", "Night", "City", "Love", "Secret", "Lost", "King", "Star", "Blue", "Dead", "Home",
+    "Girl", "War", "Man", "World", "Red", "House", "Story", "Time", "Wild", "Game", "Black", "River",
+]
+
+
+def make_catalog(n: int, seed: int = 42) -> pd.DataFrame:
+    """DataFrame with the columns Recommender.build expects"""
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS)
+    titles = (
+        pd.Series(words[rng.integers(0, len(words), n)]) + " " +
+        pd.Series(words[rng.integers(0, len(words), n)]) + " " +
+        pd.Series(np.arange(n)).astype(str)
+    )
+
+    # 1-4 distinct genres per title
+    genre_p = GENRE_WEIGHTS / GENRE_WEIGHTS.sum()
+    picks = rng.choice(len(GENRES), size=(n, 4), p=genre_p)
+    counts = rng.integers(1, 5, n)
+    labels = np.array(GENRES, dtype=object)
+    genres = [
+        ",".join(dict.fromkeys(labels[row[:count]]))
+        for row, count in zip(picks, counts)
+    ]
+
+    platform_main = rng.choice(len(PLATFORMS), size=n, p=PLATFORM_WEIGHTS)
+    platform_extra = rng.choice(len(PLATFORMS), size=n, p=PLATFORM_WEIGHTS)
+    has_extra = rng.random(n) < 0.1
+    flags = {
+        name: ((platform_main == i) | (has_extra & (platform_extra == i))).astype(int)
+        for i, name in enumerate(PLATFORMS)
+    }
+
+    directors = pd.Series(rng.zipf(1.3, n) % max(n // 3, 1)).map(lambda i: f"Director {i}")
+    return pd.DataFrame({
+        "Title": titles,
+        "Year": rng.integers(1920, 2027, n),
+        "Type": np.where(rng.random(n) < 0.74, "movie", "tv show"),
+        "IMDb": np.clip(rng.normal(6.3, 1.2, n), 1.0, 10.0).round(1),
+        "Genres": genres,
+        "Directors": directors,
+        "Country": "United States",
+        "Language": "English",
+        "Runtime": rng.integers(20, 180, n).astype(float),
+        **flags,
+        "Rotten Tomatoes": None,
+    })
+
+
+def content_docs(df: pd.DataFrame, seed: int = 42):
+    """The catalog as `content` collection documents, with synthetic view counts"""
+    rng = np.random.default_rng(seed)
+    views = rng.zipf(1.5, len(df)).clip(max=1_000_000)
+    platform = df[PLATFORMS].to_numpy().argmax(axis=1)
+    return [{
+        "title": title,
+        "platform": PLATFORMS[p],
+        "imdb": float(imdb),
+        "year": int(year),
+        "genres": genres,
+        "type": kind,
+        "views": int(v),
+    } for title, p, imdb, year, genres, kind, v in zip(
+        df["Title"], platform, df["IMDb"], df["Year"], df["Genres"], df["Type"], views
+    )]
@@ -0,0 +1,316 @@
+"""
+The movie catalog as one typed, columnar dataset.
+
+    python catalog.py            # rebuild dataset/catalog.parquet from the source files
+
+Sources (repo root): final_df_cleaned.json, falling back to
+dataset/final_df_cleaned.csv, then new_data.json and movies_2025_2026_500.json.
+Each is mapped to the final_df schema by a `SourceAdapter` in `SOURCES`, and
+rows describing the same (title, year) are merged into one item. The Parquet
+file stores small integer and float columns, dictionary-encodes the
+repetitive text columns (genres, directors, countries, ...) and adds a stable
+`item_id`. Loaders call `load_catalog(columns)` and read only the columns
+they use; without pyarrow, or when the Parquet file is missing or older than
+a source, the catalog is built from the sources in memory instead.
+"""
+import functools
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(BASE_DIR, "dataset", "catalog.parquet"))
+MAIN_JSON_PATH = os.path.join(BASE_DIR, "final_df_cleaned.json")
+MAIN_CSV_PATH = os.path.join(BASE_DIR, "dataset", "final_df_cleaned.csv")
+NEW_DATA_PATH = os.path.join(BASE_DIR, "new_data.json")
+UPCOMING_DATA_PATH = os.path.join(BASE_DIR, "movies_2025_2026_500.json")
+
+PLATFORMS = ["Netflix", "Hulu", "Prime Video", "Disney+"]
+# Repetitive text columns, stored dictionary-encoded
+DICTIONARY_COLUMNS = ["Age", "Type", "Genres", "Directors", "Country", "Language", "source"]
+COLUMNS = ["item_id", "Title", "Year", "Age", "IMDb", "Rotten Tomatoes", *PLATFORMS,
+           "Type", "Directors", "Genres", "Country", "Language", "Runtime", "source"]
+
+
+# --- Sources ---
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class SourceAdapter:
+    """Declarative mapping of one provider's records onto the catalog schema.
+
+    `rename` maps provider fields to catalog columns, `constants` sets columns
+    the provider has no field for, `defaults` fills whatever is still missing
+    after duplicates are merged (so a placeholder never hides another source's
+    real value), `lowercase` lists columns to lower-case and `platform_field`
+    names a field holding one platform name, expanded to the platform flags.
+    Every step is a whole-column operation.
+    """
+
+    def __init__(self, name, paths, rename=None, constants=None, defaults=None, lowercase=(),
+                 platform_field=None):
+        self.name = name
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.rename = rename or {}
+        self.constants = constants or {}
+        self.defaults = defaults or {}
+        self.lowercase = lowercase
+        self.platform_field = platform_field
+
+    @property
+    def path(self):
+        """The first candidate path that exists, or None"""
+        return next((path for path in self.paths if os.path.exists(path)), None)
+
+    def read(self) -> pd.DataFrame:
+        path = self.path
+        if path is None:
+            return pd.DataFrame()
+        if path.endswith(".csv"):
+            return pd.read_csv(path)
+        return pd.DataFrame(_read_json(path))
+
+    def frame(self) -> pd.DataFrame:
+        raw = self.read()
+        if raw.empty:
+            return pd.DataFrame(columns=SOURCE_COLUMNS)
+        df = raw.rename(columns=self.rename)
+        for column, value in self.constants.items():
+            df[column] = value
+        for column in self.lowercase:
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str).str.lower())
+        if self.platform_field is not None:
+            platform = raw[self.platform_field]
+            for name in PLATFORMS:
+                df[name] = platform.eq(name).astype("int8")
+        df = df.reindex(columns=SOURCE_COLUMNS[:-1])
+        df["source"] = self.name
+        return df
+
+
+# In priority order: on duplicates, a column's value comes from the first source that has one
+SOURCES = [
+    SourceAdapter("catalog", [MAIN_JSON_PATH, MAIN_CSV_PATH]),
+    # 2021-2025 additions; they carry no genre/director information
+    SourceAdapter(
+        "new_data", NEW_DATA_PATH,
+        rename={"title": "Title", "year": "Year", "type": "Type", "imdb_rating": "IMDb"},
+        constants={"Runtime": 0},
+        defaults={"Type": "movie", "Genres": "Drama", "Directors": "Unknown", "Country": "Unknown",
+                  "Language": "English"},
+        lowercase=["Type"],
+        platform_field="platform",
+    ),
+    # 2025-2026 releases
+    SourceAdapter(
+        "upcoming", UPCOMING_DATA_PATH,
+        rename={"title": "Title", "release_year": "Year", "imdb_rating": "IMDb", "category": "Genres",
+                "director": "Directors"},
+        constants={"Type": "movie", "Runtime": 0},
+        defaults={"Genres": "Drama", "Directors": "Unknown", "Country": "Unknown", "Language": "Multiple"},
+        platform_field="platform",
+    ),
+]
+SOURCE_COLUMNS = [c for c in COLUMNS if c != "item_id"]
+
+
+def source_paths():
+    return [source.path for source in SOURCES if source.path is not None]
+
+
+# --- Entity resolution ---
+# ASCII, Latin-1 and general punctuation; letters and marks of every script are kept
+PUNCTUATION = r"[!-/:-@\[-`{-~\u00a1-\u00bf\u2010-\u205e]"
+
+
+def title_keys(titles: pd.Series) -> pd.Series:
+    """Titles folded for matching: accents, case, punctuation and spacing ignored"""
+    # Fold each distinct title once; object dtype keeps Python's Unicode-aware regexes
+    codes, uniques = pd.factorize(titles.fillna("").astype(str))
+    keys = pd.Series(uniques, dtype=object).str.normalize("NFKD")
+    keys = keys.str.replace(r"[\u0300-\u036f]", "", regex=True).str.lower().str.replace("&", " and ", regex=False)
+    keys = keys.str.replace(PUNCTUATION, "", regex=True).str.replace(r"\s+", " ", regex=True).str.strip()
+    return pd.Series(keys.to_numpy()[codes], index=titles.index)
+
+
+def resolve_entities(df: pd.DataFrame) -> pd.DataFrame:
+    """Merge rows describing the same title into one, keeping the first row's order.
+
+    Rows are blocked on a 64-bit hash of the folded title and matched within a
+    block on year; a row without a year joins its block when the block has
+    exactly one year. Platform flags are OR-ed across the duplicates, other
+    columns take the first non-null value in source priority order.
+    """
+    keys = title_keys(df["Title"])
+    block = pd.Series(pd.util.hash_array(keys.to_numpy(dtype=object)), index=df.index)
+    year = pd.to_numeric(df["Year"], errors="coerce")
+    by_block = year.groupby(block)
+    year = year.where(year.notna() | (by_block.transform("nunique") != 1), by_block.transform("first"))
+
+    entity = pd.DataFrame({"block": block, "year": year}).groupby(
+        ["block", "year"], sort=False, dropna=False).ngroup()
+    # Untitled rows cannot be matched; each stays its own item
+    untitled = (keys == "").to_numpy()
+    entity = entity.to_numpy().copy()
+    entity[untitled] = entity.max(initial=-1) + 1 + np.arange(untitled.sum())
+
+    merged = df.assign(Year=year).groupby(entity, sort=False).first()
+    merged[PLATFORMS] = df[PLATFORMS].apply(pd.to_numeric, errors="coerce").fillna(0).groupby(
+        entity, sort=False).max()
+    return merged.reset_index(drop=True)
+
+
+def apply_defaults(df: pd.DataFrame) -> pd.DataFrame:
+    for source in SOURCES:
+        rows = df["source"] == source.name
+        for column, value in source.defaults.items():
+            # object so a text default fits a column that was all-missing; normalise() re-types it
+            df[column] = df[column].astype(object).mask(rows & df[column].isna(), value)
+    return df
+
+
+# --- Normalisation ---
+def item_ids(titles: pd.Series, years: pd.Series) -> np.ndarray:
+    """Stable 63-bit ids from (title, year); repeats get the occurrence number mixed in"""
+    keys = titles.fillna("").str.strip().str.lower() + "|" + years.astype("Int64").astype(str)
+    occurrence = keys.groupby(keys).cumcount()
+    keys = keys.where(occurrence == 0, keys + "#" + occurrence.astype(str))
+    return np.array([
+        int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big") >> 1
+        for key in keys
+    ], dtype=np.int64)
+
+
+def normalise(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce the merged sources to the catalog's column types"""
+    df = df.reindex(columns=SOURCE_COLUMNS)
+    out = pd.DataFrame({"Title": df["Title"].where(df["Title"].notna(), None)})
+    out["Year"] = pd.to_numeric(df["Year"], errors="coerce").astype("Int16")
+    out["item_id"] = item_ids(out["Title"], out["Year"])
+    for column in ("IMDb", "Rotten Tomatoes"):
+        out[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+    out["Runtime"] = pd.to_numeric(df["Runtime"], errors="coerce").astype("float32")
+    for platform in PLATFORMS:
+        out[platform] = pd.to_numeric(df[platform], errors="coerce").fillna(0).astype("int8")
+    for column in DICTIONARY_COLUMNS:
+        out[column] = df[column].where(df[column].notna(), None).astype("category")
+    return out[COLUMNS]
+
+
+def build_frame() -> pd.DataFrame:
+    frames = [source.frame() for source in SOURCES]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        print(f"⚠️ No catalog sources found: {[path for source in SOURCES for path in source.paths]}")
+        return normalise(pd.DataFrame(columns=SOURCE_COLUMNS))
+    df = pd.concat(frames, ignore_index=True)
+    merged = apply_defaults(resolve_entities(df))
+    print(f"✅ Resolved {len(df)} rows from {len(frames)} sources into {len(merged)} items "
+          f"({len(df) - len(merged)} duplicates merged)")
+    return normalise(merged)
+
+
+def write_catalog(df: pd.DataFrame, path: str = CATALOG_PATH):
+    if pa is None:
+        raise RuntimeError("pyarrow is required to write the Parquet catalog")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, compression="zstd", use_dictionary=DICTIONARY_COLUMNS)
+    # Readers never see a half-written file
+    os.replace(tmp_path, path)
+    return table
+
+
+# --- Loading ---
+def _parquet_is_current():
+    if pq is None or not os.path.exists(CATALOG_PATH):
+        return False
+    built_at = os.path.getmtime(CATALOG_PATH)
+    return all(os.path.getmtime(path) <= built_at for path in source_paths())
+
+
+@functools.lru_cache(maxsize=4)
+def _file_digest(path, mtime, size):
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def catalog_version() -> str:
+    """Content hash of the catalog being served (the Parquet file, else its sources).
+
+    Unlike the in-process catalog generation it survives restarts, so it can
+    key persisted data such as cached LLM answers.
+    """
+    paths = [CATALOG_PATH] if _parquet_is_current() else [path for path in source_paths() if os.path.exists(path)]
+    parts = []
+    for path in paths:
+        stat = os.stat(path)
+        parts.append(_file_digest(path, stat.st_mtime, stat.st_size))
+    return hashlib.blake2b("".join(parts).encode(), digest_size=8).hexdigest()
+
+
+def _decode(df: pd.DataFrame, categorical: bool) -> pd.DataFrame:
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            # Most consumers fillna()/str.* these columns, which categoricals do not allow with new values
+            if not categorical:
+                df[column] = df[column].astype(df[column].cat.categories.dtype)
+        elif str(df[column].dtype) in ("Int16", "Int64"):
+            df[column] = df[column].astype("float64") if df[column].isna().any() else df[column].astype("int64")
+    return df
+
+
+@functools.lru_cache(maxsize=1)
+def _in_memory_catalog():
+    reason = "pyarrow not installed" if pq is None else f"{CATALOG_PATH} missing or out of date"
+    print(f"⚠️ Building the catalog from source files ({reason}); run `python catalog.py`")
+    return build_frame()
+
+
+def load_catalog(columns=None, categorical=False, sources=None) -> pd.DataFrame:
+    """The catalog as a fresh DataFrame, reading only `columns` (all when None).
+
+    `sources` keeps only rows from those inputs ("catalog", "new_data",
+    "upcoming"). Text columns come back as plain strings unless `categorical`
+    is set, and integer columns with missing values as floats, like the
+    JSON/CSV loaders produced.
+    """
+    columns = list(columns) if columns is not None else None
+    if _parquet_is_current():
+        filters = [("source", "in", list(sources))] if sources is not None else None
+        df = pq.read_table(CATALOG_PATH, columns=columns, filters=filters).to_pandas()
+    else:
+        df = _in_memory_catalog()
+        if sources is not None:
+            df = df[df["source"].isin(sources)].reset_index(drop=True)
+        df = (df[columns] if columns is not None else df).copy()
+    return _decode(df, categorical)
+
+
+def main():
+    df = build_frame()
+    table = write_catalog(df)
+    size_kb = os.path.getsize(CATALOG_PATH) / 1024
+    counts = df["source"].value_counts().to_dict()
+    print(f"✅ Wrote {table.num_rows} items ({counts}) to {CATALOG_PATH} ({size_kb:.0f} KB)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
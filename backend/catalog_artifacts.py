@@ -0,0 +1,185 @@
+"""
+Static catalog files for the frontend, built from the Parquet catalog.
+
+    python catalog_artifacts.py     # or `python merge_data.py` from the repo root
+
+Writes frontend/public/data/catalog-manifest.json, small and unhashed: it
+lists the files below and is revalidated on every load. Kept outside the
+catalog directory so the hosting cache rules for the two cannot overlap.
+
+Writes to frontend/public/data/catalog/:
+  index-<source>.<hash>.json
+                         the fields lists and charts use (title, year, IMDb, type,
+                         genres, platforms), one part per source, so pages that
+                         leave out the upcoming titles never fetch them
+  <platform>-<decade>.<hash>.json
+                         the remaining columns, one shard per platform and decade
+
+Files are columnar (one array per column, repeated strings as indexes into a
+dictionary) and named by a hash of their content, so they can be cached
+forever (netlify.toml marks them immutable). The host compresses them on the
+fly; set CATALOG_ARTIFACTS_PRECOMPRESS=1 to also write .gz and (with the
+brotli package) .br siblings for servers that serve precompressed files
+(nginx gzip_static/brotli_static and the like). The manifest records the
+compressed sizes either way. Items are numbered across the index parts in
+manifest order (a part's "start" is its first item); shards refer to items by
+that position ("i"), and an item on several platforms is in each of their
+shards.
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from catalog import BASE_DIR, PLATFORMS, load_catalog
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ARTIFACTS_DIR = os.getenv("CATALOG_ARTIFACTS_DIR", os.path.join(BASE_DIR, "frontend", "public", "data", "catalog"))
+MANIFEST_PATH = os.getenv("CATALOG_MANIFEST_PATH", os.path.join(os.path.dirname(ARTIFACTS_DIR), "catalog-manifest.json"))
+PRECOMPRESS = os.getenv("CATALOG_ARTIFACTS_PRECOMPRESS", "0") == "1"
+FORMAT_VERSION = 1
+# 2: the index is split into one part per source
+MANIFEST_FORMAT = 2
+
+# The source is implied by the index part an item is in
+INDEX_COLUMNS = ["Title", "Year", "IMDb", "Type", "Genres"]
+DETAIL_COLUMNS = ["Age", "Rotten Tomatoes", "Directors", "Country", "Language", "Runtime"]
+# Columns sent as dictionary indexes
+DICTIONARY_COLUMNS = {"Type", "Genres", "source", "Age", "Directors", "Country", "Language"}
+
+
+def _encode_column(series: pd.Series):
+    """(values, dictionary or None); missing values become null"""
+    if series.name in DICTIONARY_COLUMNS:
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        return [None if code < 0 else int(code) for code in codes], [str(value) for value in uniques]
+    if pd.api.types.is_float_dtype(series):
+        # Floats keep the one decimal place the sources have; integral values are sent as ints
+        values = series.round(1).astype(object).where(series.notna(), None)
+        return [None if v is None else (int(v) if float(v).is_integer() else float(v)) for v in values], None
+    if pd.api.types.is_integer_dtype(series):
+        return [int(v) for v in series], None
+    return [None if pd.isna(v) else str(v) for v in series], None
+
+
+def encode_table(df: pd.DataFrame) -> bytes:
+    table = {"version": FORMAT_VERSION, "count": len(df), "columns": {}, "dictionaries": {}}
+    for column in df.columns:
+        values, dictionary = _encode_column(df[column])
+        table["columns"][column] = values
+        if dictionary is not None:
+            table["dictionaries"][column] = dictionary
+    return json.dumps(table, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def platform_mask(df: pd.DataFrame) -> np.ndarray:
+    """Platform flags packed into one int: bit n is PLATFORMS[n]"""
+    mask = np.zeros(len(df), dtype=np.int64)
+    for bit, platform in enumerate(PLATFORMS):
+        mask |= (df[platform].to_numpy() == 1).astype(np.int64) << bit
+    return mask
+
+
+def _slug(platform):
+    return platform.lower().replace(" ", "-").replace("+", "-plus")
+
+
+def _decade(year):
+    return "unknown" if pd.isna(year) else f"{int(year) // 10 * 10}s"
+
+
+def write_artifact(directory, stem, body: bytes, precompress=PRECOMPRESS):
+    """Writes <stem>.<hash>.json (plus compressed siblings with `precompress`); returns its manifest entry"""
+    digest = hashlib.sha256(body).hexdigest()[:12]
+    name = f"{stem}.{digest}.json"
+    variants = {"": body, ".gz": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(body, quality=11)
+    for suffix, data in variants.items():
+        if suffix and not precompress:
+            continue
+        path = os.path.join(directory, name + suffix)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(data)
+    entry = {"file": name, "bytes": len(body), "gzip_bytes": len(variants[".gz"])}
+    if ".br" in variants:
+        entry["br_bytes"] = len(variants[".br"])
+    return entry
+
+
+def build_artifacts(df: pd.DataFrame, directory: str = ARTIFACTS_DIR, manifest_path: str = MANIFEST_PATH):
+    os.makedirs(directory, exist_ok=True)
+    # Items of a source are contiguous, so each index part is a range of positions
+    df = df.sort_values("source", kind="stable").reset_index(drop=True)
+
+    index = df[INDEX_COLUMNS].copy()
+    index["platforms"] = platform_mask(df)
+    index_parts = []
+    for source in df["source"].unique():
+        rows = index[(df["source"] == source).to_numpy()]
+        entry = write_artifact(directory, f"index-{source}", encode_table(rows))
+        index_parts.append({"source": source, "start": int(rows.index[0]), "count": len(rows), **entry})
+
+    details = df[DETAIL_COLUMNS].copy()
+    details.insert(0, "i", np.arange(len(df)))
+    decades = df["Year"].map(_decade)
+    shards = []
+    for platform in [*PLATFORMS, None]:
+        on_platform = df[platform] == 1 if platform else df[PLATFORMS].sum(axis=1) == 0
+        for decade in sorted(decades[on_platform].unique()):
+            rows = details[on_platform & (decades == decade)]
+            stem = f"{_slug(platform) if platform else 'other'}-{decade}"
+            entry = write_artifact(directory, stem, encode_table(rows))
+            shards.append({"platform": platform, "decade": decade, "count": len(rows), **entry})
+
+    files = [part["file"] for part in index_parts] + [shard["file"] for shard in shards]
+    manifest = {
+        "version": hashlib.sha256("".join(files).encode()).hexdigest()[:12],
+        "format": MANIFEST_FORMAT,
+        "platforms": PLATFORMS,
+        "count": len(df),
+        "index": index_parts,
+        "shards": shards,
+    }
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, manifest_path)
+    _remove_stale(directory, set(files))
+    return manifest
+
+
+def _remove_stale(directory, current, precompress=PRECOMPRESS):
+    """Hashed files from earlier builds (and unwanted siblings); deleted after the new manifest is in place"""
+    for name in os.listdir(directory):
+        if not name.endswith((".json", ".json.gz", ".json.br")):
+            continue
+        sibling = not name.endswith(".json")
+        if name.split(".json")[0] + ".json" not in current or (sibling and not precompress):
+            os.remove(os.path.join(directory, name))
+
+
+def main():
+    if PRECOMPRESS and brotli is None:
+        print("⚠️ brotli not installed. Writing .gz files only.")
+    manifest = build_artifacts(load_catalog())
+    shards = manifest["shards"]
+    parts = manifest["index"]
+    total = sum(entry["bytes"] for entry in parts + shards)
+    for part in parts:
+        print(f"✅ Wrote index-{part['source']} ({part['count']} items, {part['bytes'] / 1024:.0f} KB, "
+              f"{part['gzip_bytes'] / 1024:.0f} KB gzip, {part.get('br_bytes', 0) / 1024:.0f} KB br)")
+    print(f"✅ Wrote {len(shards)} shards ({total / 1024:.0f} KB in all with the index) to {ARTIFACTS_DIR}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
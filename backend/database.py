@@ -1,58 +1,272 @@
+import asyncio
 import os
-from pymongo import MongoClient
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import pymongo
+from pymongo import AsyncMongoClient, MongoClient, monitoring
 from dotenv import load_dotenv
 
+from utils.metrics import METRICS_ENABLED, mongo_command_metrics
+
 load_dotenv()
 
-# --- MongoDB Connection ---
+# --- MongoDB Config ---
 MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB_NAME = "ott_database"
+
+if not MONGO_URI:
+    MONGO_URI = "mongodb://localhost:27017"
+
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 10))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000))
+MONGO_MAX_CONNECTING = int(os.getenv("MONGO_MAX_CONNECTING", 4))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+# Default deadline for a single operation, including the wait for a pooled connection
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", 10000))
+# Budget shared by all Mongo operations of one HTTP request (see RequestTimeoutMiddleware)
+MONGO_REQUEST_TIMEOUT_S = float(os.getenv("MONGO_REQUEST_TIMEOUT_S", 15))
+
+# --- Neon PostgreSQL Config (Netlify) ---
+# Netlify provides NETLIFY_DATABASE_URL for Neon integration
+PG_DATABASE_URL = os.getenv("NETLIFY_DATABASE_URL") or os.getenv("DATABASE_URL")
+PG_POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", 1))
+PG_POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", 10))
+PG_POOL_TIMEOUT_S = float(os.getenv("PG_POOL_TIMEOUT_S", 5))
+PG_STATEMENT_TIMEOUT_MS = int(os.getenv("PG_STATEMENT_TIMEOUT_MS", 10000))
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Tracks Mongo connection pool usage from CMAP events (all servers combined)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.peak_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def _add(self, field, amount):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+            if self.checked_out > self.peak_checked_out:
+                self.peak_checked_out = self.checked_out
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
 
+    def pool_cleared(self, event):
+        self._add("pool_clears", 1)
+
+    def connection_created(self, event):
+        self._add("open", 1)
+
+    def connection_closed(self, event):
+        self._add("open", -1)
+
+    def connection_check_out_started(self, event):
+        self._add("waiting", 1)
+
+    def connection_check_out_failed(self, event):
+        self._add("waiting", -1)
+        self._add("checkout_failures", 1)
+
+    def connection_checked_out(self, event):
+        self._add("waiting", -1)
+        self._add("checked_out", 1)
+        self._add("checkouts", 1)
+
+    def connection_checked_in(self, event):
+        self._add("checked_out", -1)
+
+    def snapshot(self):
+        return {
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "open": self.open,
+            "checked_out": self.checked_out,
+            "waiting": self.waiting,
+            "peak_checked_out": self.peak_checked_out,
+            "saturation": round(self.checked_out / MONGO_MAX_POOL_SIZE, 3) if MONGO_MAX_POOL_SIZE else 0.0,
+            "checkouts": self.checkouts,
+            "checkout_failures": self.checkout_failures,
+            "pool_clears": self.pool_clears,
+        }
+
+
+pool_stats = PoolStats()
+
+# Async clients and collections, set by connect() from the app lifespan
 client = None
 db = None
 
-# Initialize collections at module level
 user_collection = None
 content_collection = None
 history_collection = None
 admins_collection = None
 user_analytics_collection = None
+watch_events_collection = None
 
-if not MONGO_URI:
-    MONGO_URI = "mongodb://localhost:27017" 
-
-try:
-    client = MongoClient(MONGO_URI)
-    db = client.get_database("ott_database")
-    
-    # Update global collections
-    user_collection = db["users"]
-    content_collection = db["content"]
-    history_collection = db["history"]
-    admins_collection = db["admins"]
-    user_analytics_collection = db["user_analytics_data"]
-    
-    print("✅ Connected to MongoDB")
-except Exception as e:
-    print(f"❌ Failed to connect to MongoDB: {e}")
-
-# --- Neon PostgreSQL Connection (Netlify) ---
-# Netlify provides NETLIFY_DATABASE_URL for Neon integration
-PG_DATABASE_URL = os.getenv("NETLIFY_DATABASE_URL") or os.getenv("DATABASE_URL")
+pg_pool = None
 
-pg_conn = None
 
-if PG_DATABASE_URL:
+async def connect():
+    """Create the pooled Mongo/Postgres clients; called once from the app lifespan"""
+    global client, db, user_collection, content_collection, history_collection
+    global admins_collection, user_analytics_collection, watch_events_collection, pg_pool
+
     try:
-        import psycopg2
-        pg_conn = psycopg2.connect(PG_DATABASE_URL)
-        print("✅ Connected to Neon PostgreSQL")
-    except ImportError:
-        print("⚠️ psycopg2 not installed. PostgreSQL support limited.")
+        client = AsyncMongoClient(
+            MONGO_URI,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            maxConnecting=MONGO_MAX_CONNECTING,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            timeoutMS=MONGO_TIMEOUT_MS,
+            event_listeners=[pool_stats, mongo_command_metrics] if METRICS_ENABLED else [pool_stats],
+        )
+        db = client.get_database(MONGO_DB_NAME)
+
+        user_collection = db["users"]
+        content_collection = db["content"]
+        history_collection = db["history"]
+        admins_collection = db["admins"]
+        user_analytics_collection = db["user_analytics_data"]
+        watch_events_collection = db["watch_events"]
+
+        print("✅ Connected to MongoDB")
     except Exception as e:
-        print(f"❌ Failed to connect to Neon PostgreSQL: {e}")
+        print(f"❌ Failed to connect to MongoDB: {e}")
+
+    if PG_DATABASE_URL:
+        try:
+            from psycopg_pool import AsyncConnectionPool
+            pg_pool = AsyncConnectionPool(
+                PG_DATABASE_URL,
+                min_size=PG_POOL_MIN_SIZE,
+                max_size=PG_POOL_MAX_SIZE,
+                timeout=PG_POOL_TIMEOUT_S,
+                kwargs={"options": f"-c statement_timeout={PG_STATEMENT_TIMEOUT_MS}"},
+                open=False,
+            )
+            await pg_pool.open(wait=False)
+            print("✅ Connected to Neon PostgreSQL")
+        except ImportError:
+            print("⚠️ psycopg_pool not installed. PostgreSQL support limited.")
+        except Exception as e:
+            print(f"❌ Failed to connect to Neon PostgreSQL: {e}")
+
+
+async def close():
+    global client, pg_pool
+    if client is not None:
+        await client.close()
+        client = None
+    if pg_pool is not None:
+        await pg_pool.close()
+        pg_pool = None
+
+
+async def ensure_indexes():
+    """Indexes backing the hot read paths; create_index is a no-op when they exist"""
+    if db is None:
+        return
+    indexes = {
+        "users": [[("email", 1)], [("username", 1)]],
+        # (sort field, _id) pairs serve both the plain sorts and keyset pages (utils/pagination.py)
+        "content": [[("views", -1), ("_id", -1)], [("imdb", -1), ("_id", -1)], [("title", 1), ("_id", 1)],
+                    [("year", -1), ("_id", -1)], [("created_at", -1), ("_id", -1)], [("platform", 1)]],
+        "history": [[("user_email", 1), ("timestamp", -1)]],
+        "user_analytics_data": [[("joined_date", -1), ("_id", -1)], [("username", 1)], [("email", 1)]],
+        "llm_cache": [[("topic", 1), ("created_at", -1)]],
+        "watch_events": [[("timestamp", -1)], [("user_email", 1), ("timestamp", -1)]],
+    }
+    for collection, keys_list in indexes.items():
+        for keys in keys_list:
+            try:
+                await db[collection].create_index(keys)
+            except Exception as e:
+                print(f"⚠️ Could not create index {keys} on {collection}: {e}")
+
+
+async def ping(timeout=1.0):
+    """Quick Mongo round trip for readiness probes"""
+    if db is None:
+        return {"ok": False, "error": "not connected"}
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout)
+        return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+    except Exception as e:
+        return {"ok": False, "error": str(e) or type(e).__name__}
+
+
+async def health():
+    """Ping both databases and report pool usage"""
+    report = {"mongo": {"ok": False, "pool": pool_stats.snapshot()}}
+    if db is not None:
+        start = time.perf_counter()
+        try:
+            await db.command("ping")
+            report["mongo"]["ok"] = True
+        except Exception as e:
+            report["mongo"]["error"] = str(e)
+        report["mongo"]["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    if pg_pool is not None:
+        report["postgres"] = {"ok": False, "pool": pg_pool.get_stats()}
+        start = time.perf_counter()
+        try:
+            async with pg_pool.connection() as conn:
+                await conn.execute("SELECT 1")
+            report["postgres"]["ok"] = True
+        except Exception as e:
+            report["postgres"]["error"] = str(e)
+        report["postgres"]["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return report
+
 
 def get_db():
     return db
 
+
+@asynccontextmanager
+async def pg_connection():
+    """Borrow a pooled Postgres connection: `async with database.pg_connection() as conn:`"""
+    if pg_pool is None:
+        raise RuntimeError("PostgreSQL is not configured")
+    async with pg_pool.connection() as conn:
+        yield conn
+
+
 def get_pg_conn():
-    return pg_conn
+    # Kept for callers of the old helper; returns the pool rather than a single shared connection
+    return pg_pool
+
+
+def connect_sync():
+    """Blocking client for offline scripts (seeding, maintenance); the API uses connect()"""
+    sync_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS)
+    return sync_client.get_database(MONGO_DB_NAME)
+
+
+class RequestTimeoutMiddleware:
+    """Gives every HTTP request one shared deadline for all of its Mongo operations"""
+
+    def __init__(self, app, timeout: float = MONGO_REQUEST_TIMEOUT_S):
+        self.app = app
+        self.timeout = timeout
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with pymongo.timeout(self.timeout):
+            await self.app(scope, receive, send)
@@ -1,4 +1,8 @@
+from utils.readiness import readiness, PROCESS_STARTED_AT
+import asyncio
+import time
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from dotenv import load_dotenv
 import os
@@ -9,15 +13,90 @@ from routes.analytics import router as AnalyticsRouter
 from routes.trending import router as TrendingRouter
 from routes.recommend import router as RecommendRouter
 from routes.search import router as SearchRouter
-from routes.ai import router as AIRouter
+from routes.ai import router as AIRouter, chat_history_buffer
 from routes.dataset_analysis import router as AnalysisRouter
 from routes.admin import router as AdminRouter
-from routes.auth import router as AuthRouter
+from routes.auth import router as AuthRouter, password_hasher, get_current_user
+from routes.events import router as EventsRouter, watch_event_buffer
+from ml.trending import trending_engine
+from ml.sketches import sketches
+from ml.recommender import load_engine
+from ml.suggest import suggest_index
+from ml.llm import stream_pool
+from routes.analytics import load_dataset
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from utils.serialization import FastJSONResponse
+from utils.compression import HTTPCacheMiddleware
+from utils.metrics import METRICS_ENABLED, MetricsMiddleware, registry
+from utils.profiler import RequestProfilerMiddleware
+import database
 
-app = FastAPI(title="OTT Platform API")
+readiness.record_phase("imports", time.perf_counter() - PROCESS_STARTED_AT)
+
+
+async def warm_recommender():
+    engine = await load_engine()
+    if engine.df is None or engine.df.empty:
+        raise RuntimeError("recommendation dataset is empty")
+
+
+async def warm_suggestions():
+    # The typeahead index is built from the recommender's dataset
+    await suggest_index.rebuild((await load_engine()).df)
+
+
+async def warm_up():
+    """Heavy subsystems load here, after the server is already accepting connections"""
+    start = time.perf_counter()
+
+    async def recommender_then_suggest():
+        await readiness.track("recommender", warm_recommender)
+        await readiness.track("suggest", warm_suggestions, critical=False)
+
+    await asyncio.gather(
+        recommender_then_suggest(),
+        readiness.track("analytics", lambda: asyncio.to_thread(load_dataset)),
+        # Index builds can take a while on large collections
+        readiness.track("indexes", database.ensure_indexes, critical=False),
+    )
+    print(f"✅ Warm-up finished in {time.perf_counter() - start:.2f}s: "
+          + ", ".join(f"{name} {c['state']}" for name, c in readiness.components.items()))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with readiness.phase("connect"):
+        # Clients connect lazily; this does not wait for either database
+        await database.connect()
+    with readiness.phase("background_tasks"):
+        for name, critical in (("recommender", True), ("analytics", True), ("suggest", False),
+                               ("indexes", False), ("trending", False), ("sketches", False)):
+            readiness.register(name, critical)
+        watch_event_buffer.start()
+        chat_history_buffer.start()
+        trending_task = asyncio.create_task(trending_engine.run())
+        sketches_task = asyncio.create_task(sketches.run())
+        warm_up_task = asyncio.create_task(warm_up())
+    print("Backend Server Started - Routes Loaded")
+    readiness.listening()
+    yield
+    warm_up_task.cancel()
+    # Flush buffered events while the Mongo client is still open
+    await watch_event_buffer.stop()
+    await chat_history_buffer.stop()
+    for task, state in ((trending_task, trending_engine), (sketches_task, sketches)):
+        task.cancel()
+        try:
+            await state.checkpoint()
+        except Exception as e:
+            print(f"⚠️ Final checkpoint of {type(state).__name__} failed: {e}")
+    password_hasher.shutdown()
+    stream_pool.shutdown()
+    await database.close()
+
+app = FastAPI(title="OTT Platform API", default_response_class=FastJSONResponse, lifespan=lifespan)
 
 # Debugging 422 Errors
 @app.exception_handler(RequestValidationError)
@@ -36,6 +115,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(database.RequestTimeoutMiddleware)
+# ETags, 304s and gzip/br/zstd for complete JSON/text GET responses
+app.add_middleware(HTTPCacheMiddleware)
+# Admin-only per-request cProfile (X-Profile header); the admin routes use the same check
+app.add_middleware(RequestProfilerMiddleware, authorize=get_current_user)
+if METRICS_ENABLED:
+    # Outermost, so the latency includes the other middlewares
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(PlatformRouter, prefix="/platform")
 app.include_router(AnalyticsRouter, prefix="/analytics")
@@ -46,14 +133,51 @@ app.include_router(AIRouter, prefix="/ai")
 app.include_router(AnalysisRouter, prefix="/analysis-v2")
 app.include_router(AdminRouter, prefix="/admin")
 app.include_router(AuthRouter, prefix="/auth")
+app.include_router(EventsRouter, prefix="/events")
 
 @app.get("/")
 def home():
     return {"message": "OTT API running successfully!"}
 
-@app.on_event("startup")
-async def startup_event():
-    print("Backend Server Started - Routes Loaded")
+@app.get("/healthz")
+def liveness():
+    """Liveness: the process is up and serving; says nothing about dependencies"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readiness_probe():
+    """Readiness: 200 once every critical subsystem is warm and Mongo answers, else 503"""
+    report = readiness.snapshot()
+    report["mongo"] = await database.ping()
+    ready = report["ready"] and report["mongo"]["ok"]
+    return FastJSONResponse(report, status_code=200 if ready else 503)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition of request, stage and Mongo timings"""
+    if not METRICS_ENABLED:
+        return Response("# metrics disabled\n", media_type="text/plain")
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
+
+def _runtime_gauges():
+    pool = database.pool_stats.snapshot()
+    buffer = watch_event_buffer.snapshot()
+    return {
+        "mongo_pool_checked_out": pool["checked_out"],
+        "mongo_pool_waiting": pool["waiting"],
+        "watch_event_buffer_depth": buffer["depth"],
+        "chat_history_buffer_depth": chat_history_buffer.depth,
+        "chat_streams_pending": stream_pool.pending,
+        "chat_streams_rejected": stream_pool.stats["rejected"],
+        "app_ready": int(readiness.ready),
+    }
+
+registry.add_collector(_runtime_gauges)
+
+@app.get("/health/db")
+async def database_health():
+    """Database reachability and connection pool saturation"""
+    return await database.health()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
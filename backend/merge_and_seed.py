@@ -1,7 +1,7 @@
 import json
 import random
 from datetime import datetime
-from database import client, db, user_analytics_collection
+from database import connect_sync
 
 # --- Configuration ---
 # DB_NAME and MONGO_URI are handled by database.py
@@ -26,13 +26,9 @@ def transform_date(date_str):
         return datetime.now()
 
 def main():
-    # 1. Connect to MongoDB (Handled by import)
-    # db and user_analytics_collection are already available
-    collection = user_analytics_collection
-
-    if collection is None:
-        print("Error: Could not get collection from database.py")
-        return
+    # 1. Connect to MongoDB (blocking client, this is an offline script)
+    db = connect_sync()
+    collection = db[COLLECTION_NAME]
 
     # 2. Load Data
     try:
@@ -0,0 +1,158 @@
+import os
+from functools import lru_cache
+
+import database
+from utils.cache import LRUCache
+
+# Past turns (user message + reply) sent with each chat message
+CHAT_CONTEXT_TURNS = int(os.getenv("CHAT_CONTEXT_TURNS", 6))
+# Whole-prompt budget in estimated tokens; a single turn never takes more than CHAT_TURN_MAX_TOKENS
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", 1500))
+CHAT_TURN_MAX_TOKENS = int(os.getenv("CHAT_TURN_MAX_TOKENS", 200))
+CHAT_CANDIDATES = int(os.getenv("CHAT_CANDIDATES", 5))
+# Per-user turns and preferences are kept between messages for this long
+CHAT_CONTEXT_TTL = float(os.getenv("CHAT_CONTEXT_TTL", 600))
+CHAT_CONTEXT_MAX_USERS = int(os.getenv("CHAT_CONTEXT_MAX_USERS", 10000))
+
+SYSTEM_PROMPT = (
+    "You are a movie recommendation assistant for a streaming catalog (Netflix, Hulu, Prime Video, Disney+). "
+    "Prefer titles from the catalog matches below, with their platforms, and say so when something is not in the catalog."
+)
+
+
+@lru_cache(maxsize=8192)
+def estimate_tokens(text: str) -> int:
+    """Rough token count without a model tokenizer: the larger of ~4 chars and ~0.75 words per token.
+
+    The chat models (Gemini, Llama on Groq) use different tokenizers, so a
+    slightly pessimistic estimate is all the budget needs. Cached, since
+    the same turns are counted again on every message.
+    """
+    return max(len(text) // 4, int(len(text.split()) * 4 / 3)) + 1
+
+
+def clip(text: str, max_tokens: int) -> str:
+    """`text` cut at a word boundary to about `max_tokens`"""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    keep = text[:max(0, len(text) * max_tokens // tokens - 1)]
+    return keep.rsplit(" ", 1)[0] + "…"
+
+
+def render_turn(turn: dict) -> str:
+    # Each side gets half, so a long question cannot crowd out the answer
+    half = CHAT_TURN_MAX_TOKENS // 2
+    return f"User: {clip(turn['user_message'], half)}\nAssistant: {clip(turn['ai_response'], half)}"
+
+
+def render_candidate(item: dict) -> str:
+    year = f" ({item['year']})" if item.get("year") else ""
+    platforms = ", ".join(item["platforms"]) or "not streaming"
+    return f"- {item['title']}{year} | IMDb {item['imdb']} | {platforms} | {item['genres']}"
+
+
+class ChatContextBuilder:
+    """Builds the /ai/chat prompt from a user's recent turns, preferences and catalog matches.
+
+    A user's last CHAT_CONTEXT_TURNS turns and preferences are read once (one
+    indexed, projected history query and one preferences lookup), cached for
+    CHAT_CONTEXT_TTL, and extended in place by `record_turn` as the
+    conversation goes on, so neither the reads nor the prompt grow with the
+    length of the history. Turns still waiting in the chat history buffer
+    are merged in, since the database does not have them yet.
+    """
+
+    def __init__(self, history_buffer=None, max_turns=CHAT_CONTEXT_TURNS, token_budget=CHAT_CONTEXT_TOKEN_BUDGET):
+        self.history_buffer = history_buffer
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self._users = LRUCache(max_entries=CHAT_CONTEXT_MAX_USERS)
+        self.hits = 0
+        self.misses = 0
+
+    async def _load(self, user_email: str) -> dict:
+        turns = []
+        preferences = []
+        if database.history_collection is not None:
+            cursor = database.history_collection.find(
+                {"user_email": user_email},
+                {"_id": 1, "user_message": 1, "ai_response": 1, "timestamp": 1}
+            ).sort("timestamp", -1).limit(self.max_turns)
+            turns = await cursor.to_list(self.max_turns)
+        if self.history_buffer is not None:
+            stored = {turn["_id"] for turn in turns}
+            turns += self.history_buffer.pending(
+                lambda doc: doc["user_email"] == user_email and doc["_id"] not in stored)
+        turns = sorted(turns, key=lambda turn: turn["timestamp"])[-self.max_turns:]
+
+        if database.user_analytics_collection is not None:
+            profile = await database.user_analytics_collection.find_one(
+                {"email": user_email}, {"_id": 0, "preferences": 1})
+            preferences = [str(p) for p in (profile or {}).get("preferences") or []][:5]
+        return {
+            "turns": [{"user_message": t["user_message"], "ai_response": t["ai_response"]} for t in turns],
+            "preferences": preferences,
+        }
+
+    async def user_context(self, user_email: str) -> dict:
+        """{"turns": [oldest..newest], "preferences": [...]} for a user, from the cache when possible"""
+        context = self._users.get(user_email)
+        if context is not None:
+            self.hits += 1
+            return context
+        self.misses += 1
+        try:
+            context = await self._load(user_email)
+        except Exception as e:
+            print(f"⚠️ Could not load chat context for {user_email}: {e}")
+            return {"turns": [], "preferences": []}
+        self._users.set(user_email, context, ttl=CHAT_CONTEXT_TTL)
+        return context
+
+    def record_turn(self, user_email: str, user_message: str, ai_response: str):
+        """Append a finished turn to the cached context (nothing to do when it is not cached)"""
+        context = self._users.get(user_email)
+        if context is None:
+            return
+        turns = [*context["turns"], {"user_message": user_message, "ai_response": ai_response}][-self.max_turns:]
+        self._users.set(user_email, dict(context, turns=turns), ttl=CHAT_CONTEXT_TTL)
+
+    def build_prompt(self, message: str, context: dict, candidates=()) -> str:
+        """System prompt, preferences, catalog matches and as many recent turns as fit the budget.
+
+        The message is always sent (clipped to half the budget); the oldest turns are dropped first.
+        """
+        message = clip(message, self.token_budget // 2)
+        head = [SYSTEM_PROMPT]
+        if context["preferences"]:
+            head.append("User preferences: " + ", ".join(context["preferences"]))
+        if candidates:
+            head.append("Catalog matches:\n" + "\n".join(render_candidate(item) for item in candidates))
+        tail = f"User asked: {message}"
+
+        remaining = self.token_budget - estimate_tokens(tail)
+        sections = []
+        for section in head:
+            cost = estimate_tokens(section)
+            if cost > remaining:
+                break
+            sections.append(section)
+            remaining -= cost
+
+        turns = []
+        remaining -= estimate_tokens("Recent conversation:")
+        for turn in reversed(context["turns"]):
+            rendered = render_turn(turn)
+            cost = estimate_tokens(rendered)
+            if cost > remaining:
+                break
+            turns.append(rendered)
+            remaining -= cost
+        if turns:
+            sections.append("Recent conversation:\n" + "\n".join(reversed(turns)))
+        return "\n\n".join(sections + [tail])
+
+    def stats(self):
+        return {"users": len(self._users), "hits": self.hits, "misses": self.misses,
+                "token_estimates": estimate_tokens.cache_info()._asdict()}
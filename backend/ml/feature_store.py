@@ -0,0 +1,73 @@
+import numpy as np
+
+# Share of the similarity each block contributes by default
+DEFAULT_FEATURE_WEIGHTS = {"genre": 0.40, "imdb": 0.30, "platform": 0.20, "year": 0.10}
+
+
+class FeatureStore:
+    """Item features kept as separate blocks so block weights can change per request.
+
+    With block weights w_b, the weighted cosine between items a and x is
+
+        sum_b w_b <a_b, x_b> / (sqrt(sum_b w_b |a_b|^2) * sqrt(sum_b w_b |x_b|^2))
+
+    which equals the cosine over hstack(sqrt(w_b) * block_b), the matrix the
+    recommender used to bake. Per-block squared norms are precomputed, so a query
+    is one dot product per block plus a few vector ops.
+    """
+
+    def __init__(self, blocks: dict, default_weights: dict = None):
+        self.blocks = {name: np.ascontiguousarray(matrix, dtype=np.float32) for name, matrix in blocks.items()}
+        self.sq_norms = {name: np.einsum("ij,ij->i", matrix, matrix) for name, matrix in self.blocks.items()}
+        self.default_weights = dict(default_weights or DEFAULT_FEATURE_WEIGHTS)
+        self.n_items = next(iter(self.blocks.values())).shape[0] if self.blocks else 0
+
+    @property
+    def shape(self):
+        return self.n_items, sum(matrix.shape[1] for matrix in self.blocks.values())
+
+    def resolve_weights(self, overrides: dict = None) -> dict:
+        """Default weights with `overrides` applied; raises ValueError on unknown blocks or bad values"""
+        weights = dict(self.default_weights)
+        for name, value in (overrides or {}).items():
+            if value is None:
+                continue
+            if name not in self.blocks:
+                raise ValueError(f"Unknown feature block '{name}'")
+            if value < 0:
+                raise ValueError(f"Weight for '{name}' must be non-negative")
+            weights[name] = float(value)
+        if not any(weights.values()):
+            raise ValueError("At least one feature weight must be positive")
+        return weights
+
+    def similarity(self, idx: int, weights: dict = None) -> np.ndarray:
+        """Weighted cosine similarity of item `idx` to every item"""
+        weights = weights or self.default_weights
+        dots = np.zeros(self.n_items, dtype=np.float32)
+        norms = np.zeros(self.n_items, dtype=np.float32)
+        target_norm = 0.0
+        for name, matrix in self.blocks.items():
+            weight = weights.get(name, 0.0)
+            if not weight:
+                continue
+            target = matrix[idx]
+            dots += weight * (matrix @ target)
+            norms += weight * self.sq_norms[name]
+            target_norm += weight * float(self.sq_norms[name][idx])
+        denominator = np.sqrt(norms) * np.sqrt(target_norm)
+        return np.divide(dots, denominator, out=np.zeros_like(dots), where=denominator > 0)
+
+    def pairwise(self, indices, weights: dict = None) -> np.ndarray:
+        """Weighted cosine Gram matrix of a (small) set of items"""
+        weights = weights or self.default_weights
+        indices = np.asarray(indices)
+        # For a few hundred rows one matmul over sqrt-weighted blocks beats a product per block
+        rows = np.hstack([
+            np.sqrt(weights.get(name, 0.0), dtype=np.float32) * matrix[indices]
+            for name, matrix in self.blocks.items()
+        ])
+        gram = rows @ rows.T
+        norms = np.sqrt(np.diagonal(gram))
+        denominator = np.outer(norms, norms)
+        return np.divide(gram, denominator, out=np.zeros_like(gram), where=denominator > 0)
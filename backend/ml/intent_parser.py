@@ -0,0 +1,221 @@
+import re
+from datetime import datetime
+
+import pandas as pd
+
+PLATFORMS = ['Netflix', 'Hulu', 'Prime Video', 'Disney+']
+
+PLATFORM_ALIASES = {
+    "netflix": "Netflix",
+    "hulu": "Hulu",
+    "prime video": "Prime Video",
+    "amazon prime video": "Prime Video",
+    "amazon prime": "Prime Video",
+    "prime": "Prime Video",
+    "amazon": "Prime Video",
+    "disney+": "Disney+",
+    "disney plus": "Disney+",
+    "disney": "Disney+",
+}
+
+# Colloquial names on top of the catalog's own genre labels
+GENRE_ALIASES = {
+    "sci fi": "Sci-Fi",
+    "scifi": "Sci-Fi",
+    "science fiction": "Sci-Fi",
+    "romantic": "Romance",
+    "romcom": "Romance",
+    "funny": "Comedy",
+    "comedies": "Comedy",
+    "scary": "Horror",
+    "documentaries": "Documentary",
+    "docs": "Documentary",
+    "animated": "Animation",
+    "cartoon": "Animation",
+    "cartoons": "Animation",
+    "anime": "Animation",
+    "kids": "Family",
+    "biopic": "Biography",
+    "biopics": "Biography",
+    "noir": "Film-Noir",
+    "reality": "Reality-TV",
+}
+
+TYPE_ALIASES = {
+    "movie": "movie", "movies": "movie", "film": "movie", "films": "movie",
+    "tv show": "tv show", "tv shows": "tv show", "show": "tv show", "shows": "tv show",
+    "series": "tv show", "tv": "tv show",
+}
+
+RATING_CUES = {"best", "top", "highest rated", "high rated", "top rated", "popular", "acclaimed", "great", "good"}
+RECENT_CUES = {"recent", "new", "newest", "latest", "upcoming"}
+
+STOPWORDS = {
+    "a", "an", "the", "on", "in", "of", "from", "for", "with", "and", "or", "to", "by", "about",
+    "me", "my", "i", "some", "any", "find", "show me", "give", "want", "watch", "list",
+    "recommend", "suggest", "please", "like", "that", "are", "is", "available", "streaming",
+    "directed", "director", "year", "years", "rated", "rating", "imdb",
+}
+
+MAX_NGRAM = 4
+TOKEN_RE = re.compile(r"[a-z0-9+']+(?:-[a-z0-9+']+)*")
+
+
+def _decade(two_digits: str):
+    """'90' -> [1990, 1999], '10' -> [2010, 2019]"""
+    start = (1900 if int(two_digits) >= 30 else 2000) + int(two_digits)
+    return [start, start + 9]
+
+
+def normalise_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class IntentParser:
+    """Local search-intent parser built from the catalog's own vocabulary.
+
+    `parse` returns the same intent dict the Gemini extraction produces plus a
+    confidence in [0, 1]: the share of meaningful query tokens that were
+    recognised (platforms, genres, directors, years, titles, sort/type cues).
+    """
+
+    def __init__(self, genres, directors, titles, min_year, max_year):
+        self.min_year = min_year
+        self.max_year = max_year
+        self.titles = titles
+        self.title_vocab = {tok for title in titles for tok in title.split()}
+
+        # phrase -> (slot, value); longest phrases win during matching
+        self.lexicon = {}
+        for name, canonical in directors.items():
+            self.lexicon[name] = ("director", canonical)
+        for genre in genres:
+            key = genre.lower()
+            for variant in (key, key.replace("-", " "), key.replace("-", ""), key + "s"):
+                self.lexicon[variant] = ("genre", genre)
+        for alias, genre in GENRE_ALIASES.items():
+            if genre in genres:
+                self.lexicon[alias] = ("genre", genre)
+        for alias, kind in TYPE_ALIASES.items():
+            self.lexicon[alias] = ("type", kind)
+        for alias, platform in PLATFORM_ALIASES.items():
+            self.lexicon[alias] = ("platform", platform)
+        for cue in RATING_CUES:
+            self.lexicon[cue] = ("sort", "rating")
+        for cue in RECENT_CUES:
+            self.lexicon[cue] = ("sort", "year")
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame):
+        if df is None or df.empty:
+            return cls(set(), {}, set(), 1900, datetime.utcnow().year)
+
+        genres = set(
+            df['Genres'].fillna('').str.split(',').explode().str.strip().replace('', pd.NA).dropna().unique()
+        )
+        # Only multi-word director names: single words collide with title words too often
+        director_names = df['Directors'].fillna('').str.split(',').explode().str.strip()
+        directors = {
+            " ".join(name.lower().split()): name
+            for name in director_names.unique()
+            if isinstance(name, str) and len(name.split()) >= 2 and name != "Unknown"
+        }
+        titles = set(df['Title'].dropna().astype(str).map(normalise_query).unique())
+        years = pd.to_numeric(df['Year'], errors='coerce')
+        years = years[years > 0]
+        min_year = int(years.min()) if not years.empty else 1900
+        max_year = int(years.max()) if not years.empty else datetime.utcnow().year
+        return cls(genres, directors, titles, min_year, max_year)
+
+    def _extract_years(self, text, intent):
+        """Pulls year expressions out of `text`; returns the text with them removed"""
+        current_year = datetime.utcnow().year
+        patterns = [
+            (r"\b(?:between|from)\s+((?:19|20)\d{2})\s+(?:and|to|-)\s+((?:19|20)\d{2})\b",
+             lambda m: [int(m.group(1)), int(m.group(2))]),
+            (r"\b((?:19|20)\d{2})\s*-\s*((?:19|20)\d{2})\b", lambda m: [int(m.group(1)), int(m.group(2))]),
+            (r"\b(?:after|since)\s+((?:19|20)\d{2})\b",
+             lambda m: [int(m.group(1)) + (1 if "after" in m.group(0) else 0), max(self.max_year, current_year)]),
+            (r"\bbefore\s+((?:19|20)\d{2})\b", lambda m: [self.min_year, int(m.group(1)) - 1]),
+            (r"\b((?:19|20)\d0)'?s\b", lambda m: [int(m.group(1)), int(m.group(1)) + 9]),
+            (r"\b([0-9]0)'?s\b", lambda m: _decade(m.group(1))),
+            (r"\bthis year\b", lambda m: current_year),
+            (r"\blast year\b", lambda m: current_year - 1),
+            (r"\b((?:19|20)\d{2})\b", lambda m: int(m.group(1))),
+        ]
+        for pattern, build in patterns:
+            match = re.search(pattern, text)
+            if match:
+                intent["year"] = build(match)
+                return text[:match.start()] + " " + text[match.end():]
+        return text
+
+    def parse(self, query: str):
+        intent = {
+            "year": None,
+            "platform": None,
+            "genre": None,
+            "director": None,
+            "type": None,
+            "keyword": None,
+            "sort_by": "rating",
+            "limit": 10,
+        }
+        text = normalise_query(query)
+
+        limit_match = re.search(r"\btop\s+(\d{1,2})\b", text)
+        if limit_match:
+            intent["limit"] = max(1, min(50, int(limit_match.group(1))))
+            intent["min_rating"] = 7.0
+            text = text[:limit_match.start()] + " " + text[limit_match.end():]
+
+        stripped = self._extract_years(text, intent)
+        year_found = stripped != text
+        tokens = [tok.strip("'") for tok in TOKEN_RE.findall(stripped)]
+        tokens = [tok for tok in tokens if tok]
+
+        recognised = int(year_found) + int(limit_match is not None)
+        meaningful = recognised
+        leftover = []
+        i = 0
+        while i < len(tokens):
+            match = None
+            for n in range(min(MAX_NGRAM, len(tokens) - i), 0, -1):
+                phrase = " ".join(tokens[i:i + n])
+                if phrase in self.lexicon:
+                    match = (n, self.lexicon[phrase])
+                    break
+                if phrase in STOPWORDS:
+                    match = (n, None)
+                    break
+            if match is None:
+                leftover.append(tokens[i])
+                meaningful += 1
+                i += 1
+                continue
+
+            n, slot = match
+            i += n
+            if slot is None:
+                continue
+            meaningful += 1
+            recognised += 1
+            kind, value = slot
+            if kind == "sort":
+                intent["sort_by"] = value
+                if value == "rating":
+                    intent["min_rating"] = 7.0
+            elif intent.get(kind) is None:
+                intent[kind] = value
+
+        if leftover:
+            keyword = " ".join(leftover)
+            intent["keyword"] = keyword
+            if keyword in self.titles:
+                # The remainder is a known title: fully understood
+                recognised += len(leftover)
+            else:
+                recognised += 0.5 * sum(1 for tok in leftover if tok in self.title_vocab)
+
+        confidence = recognised / meaningful if meaningful else 0.0
+        return intent, round(min(confidence, 1.0), 3)
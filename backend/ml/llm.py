@@ -0,0 +1,422 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import database
+from dotenv import load_dotenv
+from utils.cache import LRUCache
+from utils.metrics import stage
+
+load_dotenv()
+
+# "fake" swaps every provider for FakeProvider (tests, benchmarks, offline dev)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "")
+LLM_CACHE_FRESH_SECONDS = float(os.getenv("LLM_CACHE_FRESH_SECONDS", 24 * 3600))
+LLM_CACHE_STALE_SECONDS = float(os.getenv("LLM_CACHE_STALE_SECONDS", 7 * 24 * 3600))
+# Streamed chat replies each hold a thread while the model writes; beyond workers + queue they are refused
+LLM_STREAM_WORKERS = int(os.getenv("LLM_STREAM_WORKERS", 32))
+LLM_STREAM_MAX_QUEUE = int(os.getenv("LLM_STREAM_MAX_QUEUE", 32))
+LLM_STREAM_RETRY_AFTER_SECONDS = int(os.getenv("LLM_STREAM_RETRY_AFTER_SECONDS", 2))
+
+
+# --- Providers ---
+class LLMProvider:
+    """Minimal interface every LLM backend implements"""
+    name = "base"
+
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str):
+        """Yields the response text in chunks as the backend produces them (blocking iterator)"""
+        yield self.generate(prompt)
+
+
+class GeminiProvider(LLMProvider):
+    def __init__(self, model_name: str, api_key: Optional[str]):
+        self.name = f"gemini:{model_name}"
+        self.model_name = model_name
+        self.api_key = api_key
+        self._model = None
+
+    def _get_model(self):
+        if self._model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, prompt: str) -> str:
+        return self._get_model().generate_content(prompt).text
+
+    def stream(self, prompt: str):
+        for chunk in self._get_model().generate_content(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+
+class GroqProvider(LLMProvider):
+    def __init__(self, model_name: str, api_key: Optional[str], json_mode: bool = False):
+        self.name = f"groq:{model_name}{':json' if json_mode else ''}"
+        self.model_name = model_name
+        self.api_key = api_key
+        self.json_mode = json_mode
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            from groq import Groq
+            self._client = Groq(api_key=self.api_key)
+        return self._client
+
+    def generate(self, prompt: str) -> str:
+        kwargs = {"response_format": {"type": "json_object"}} if self.json_mode else {}
+        completion = self._get_client().chat.completions.create(
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            **kwargs
+        )
+        return completion.choices[0].message.content
+
+    def stream(self, prompt: str):
+        chunks = self._get_client().chat.completions.create(
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+        )
+        for chunk in chunks:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                yield text
+
+
+class FakeProvider(LLMProvider):
+    """Deterministic local provider; counts calls so callers can assert on LLM spend"""
+
+    def __init__(self, name: str = "fake", json_mode: bool = False, delay: float = 0.0, chunk_delay: float = 0.0):
+        self.name = name
+        self.json_mode = json_mode
+        self.delay = delay
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+
+    def generate(self, prompt: str) -> str:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        if self.json_mode:
+            return json.dumps({"text": f"Fake analysis {digest}", "chartData": []})
+        return f"Fake response {digest}"
+
+    def stream(self, prompt: str):
+        """The `generate` text word by word: `delay` before the first chunk, `chunk_delay` between chunks"""
+        words = self.generate(prompt).split(" ")
+        for i, word in enumerate(words):
+            if i and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield word if i == 0 else " " + word
+
+
+def gemini_provider(model_name: str, api_key: Optional[str]) -> LLMProvider:
+    if LLM_PROVIDER == "fake":
+        return FakeProvider(name=f"fake:{model_name}")
+    return GeminiProvider(model_name, api_key)
+
+
+def groq_provider(model_name: str, api_key: Optional[str], json_mode: bool = False) -> LLMProvider:
+    if LLM_PROVIDER == "fake":
+        return FakeProvider(name=f"fake:{model_name}", json_mode=json_mode)
+    return GroqProvider(model_name, api_key, json_mode=json_mode)
+
+
+class StreamPoolFull(RuntimeError):
+    """Every stream worker is busy and the wait queue is full"""
+
+
+class StreamPool:
+    """Runs the blocking provider streams on a dedicated bounded thread pool.
+
+    A stream holds its thread for as long as the model writes, so streams are
+    kept off the default executor that `asyncio.to_thread` callers (LLM
+    generate, index rebuilds, engine loads) rely on. At most
+    `workers + max_queue` streams are admitted; beyond that `stream` raises
+    StreamPoolFull.
+    """
+
+    def __init__(self, workers=LLM_STREAM_WORKERS, max_queue=LLM_STREAM_MAX_QUEUE):
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-stream")
+        # Only touched from the event loop thread
+        self.pending = 0
+        self.stats = {"completed": 0, "rejected": 0}
+
+    def full(self) -> bool:
+        return self.pending >= self.max_pending
+
+    def _release(self):
+        self.pending -= 1
+
+    async def stream(self, provider: LLMProvider, prompt: str):
+        """`provider.stream(prompt)` as an async iterator.
+
+        A worker thread hands each chunk to the event loop as it arrives. If
+        the consumer stops early (the client went away), the thread stops
+        pulling chunks after the current one; its slot is freed when the
+        thread is done.
+        """
+        if self.full():
+            self.stats["rejected"] += 1
+            raise StreamPoolFull("Too many chat streams in progress")
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stopped = threading.Event()
+        done = object()
+
+        def produce():
+            try:
+                if stopped.is_set():
+                    return
+                for chunk in provider.stream(prompt):
+                    if stopped.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(self._release)
+
+        self.pending += 1
+        loop.run_in_executor(self._executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    self.stats["completed"] += 1
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+
+    def snapshot(self):
+        return dict(self.stats, workers=self.workers, max_pending=self.max_pending, pending=self.pending)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+stream_pool = StreamPool()
+
+
+def astream(provider: LLMProvider, prompt: str):
+    """`provider.stream(prompt)` as an async iterator, run on the shared stream pool"""
+    return stream_pool.stream(provider, prompt)
+
+
+# --- Persistence ---
+class MemoryLLMStore:
+    def __init__(self):
+        self._records = {}
+        self._latest = {}
+
+    async def get(self, key):
+        return self._records.get(key)
+
+    async def latest(self, topic):
+        return self._latest.get(topic)
+
+    async def put(self, record):
+        self._records[record["_id"]] = record
+        if record.get("topic"):
+            self._latest[record["topic"]] = record
+
+
+class MongoLLMStore:
+    """Persists generations in the `llm_cache` collection so restarts keep them.
+
+    Falls back to memory while Mongo is not connected (e.g. before the app lifespan ran).
+    """
+
+    def __init__(self, collection_name="llm_cache"):
+        self.collection_name = collection_name
+        self.fallback = MemoryLLMStore()
+
+    def _collection(self):
+        return database.db[self.collection_name] if database.db is not None else None
+
+    async def get(self, key):
+        collection = self._collection()
+        if collection is None:
+            return await self.fallback.get(key)
+        return await collection.find_one({"_id": key})
+
+    async def latest(self, topic):
+        collection = self._collection()
+        if collection is None:
+            return await self.fallback.latest(topic)
+        return await collection.find_one({"topic": topic}, sort=[("created_at", -1)])
+
+    async def put(self, record):
+        collection = self._collection()
+        if collection is None:
+            return await self.fallback.put(record)
+        await collection.replace_one({"_id": record["_id"]}, record, upsert=True)
+
+
+# --- Memoisation ---
+class LLMCache:
+    """Memoises LLM generations keyed on sha256(provider, snapshot, prompt).
+
+    - concurrent identical requests share a single provider call
+    - stale entries are served immediately and refreshed in the background
+    - `topic` names a slot (e.g. one report page); when the data snapshot changes
+      the previous answer for that topic is served while the new one is generated
+    - with `parse`, only output it accepts is cached; `generate` returns the parsed
+      value, and cached text it rejects is regenerated instead of served
+    """
+
+    def __init__(self, store, fresh_seconds=LLM_CACHE_FRESH_SECONDS, stale_seconds=LLM_CACHE_STALE_SECONDS):
+        self.store = store
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self._memory = LRUCache(max_entries=1024)
+        self._inflight = {}
+        self._background = set()
+        self.stats = {"fresh_hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "provider_calls": 0,
+                      "rejected": 0}
+
+    @staticmethod
+    def make_key(provider: LLMProvider, prompt: str, snapshot="") -> str:
+        raw = f"{provider.name}\0{snapshot}\0{prompt}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    async def _store_call(self, method, *args):
+        try:
+            return await method(*args)
+        except Exception as e:
+            print(f"LLM cache store error: {e}")
+            return None
+
+    async def _lookup(self, key, topic):
+        record = self._memory.get(key)
+        if record is None:
+            record = await self._store_call(self.store.get, key)
+            if record is not None:
+                self._memory.set(key, record)
+        if record is None and topic:
+            record = self._memory.get(("topic", topic))
+            if record is None:
+                record = await self._store_call(self.store.latest, topic)
+        return record
+
+    @staticmethod
+    def _parsed(record, parse):
+        """(True, value) when the cached text is usable, else (False, None)"""
+        if parse is None:
+            return True, record["text"]
+        try:
+            return True, parse(record["text"])
+        except Exception:
+            return False, None
+
+    async def generate(self, provider: LLMProvider, prompt: str, snapshot="", topic: Optional[str] = None,
+                       parse=None):
+        key = self.make_key(provider, prompt, snapshot)
+        record = await self._lookup(key, topic)
+
+        if record is not None:
+            age = time.time() - record["created_at"]
+            usable, value = self._parsed(record, parse)
+            if not usable:
+                # Written before `parse` was enforced (or by a looser caller); never serve it again
+                self.stats["rejected"] += 1
+                self._memory.pop(record["_id"])
+                if topic:
+                    self._memory.pop(("topic", topic))
+            elif record["_id"] == key and age < self.fresh_seconds:
+                self.stats["fresh_hits"] += 1
+                return value
+            elif age < self.fresh_seconds + self.stale_seconds:
+                # Stale-while-revalidate: answer now, regenerate once in the background
+                self.stats["stale_hits"] += 1
+                self._refresh(key, provider, prompt, snapshot, topic, parse)
+                return value
+
+        self.stats["misses"] += 1
+        text = await self._coalesced(key, provider, prompt, snapshot, topic, parse)
+        return text if parse is None else parse(text)
+
+    def _refresh(self, key, provider, prompt, snapshot, topic, parse=None):
+        if key in self._inflight:
+            return
+
+        async def run():
+            try:
+                await self._coalesced(key, provider, prompt, snapshot, topic, parse)
+            except Exception as e:
+                print(f"Background LLM refresh failed: {e}")
+
+        # Fresh context: the refresh must not inherit the triggering request's DB deadline
+        task = asyncio.create_task(run(), context=contextvars.Context())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _coalesced(self, key, provider, prompt, snapshot, topic, parse=None):
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self.stats["provider_calls"] += 1
+            with stage(f"llm.{provider.name.split(':')[0]}"):
+                text = await asyncio.to_thread(provider.generate, prompt)
+            if parse is not None:
+                try:
+                    parse(text)
+                except Exception:
+                    self.stats["rejected"] += 1
+                    raise
+            record = {
+                "_id": key,
+                "text": text,
+                "provider": provider.name,
+                "snapshot": str(snapshot),
+                "topic": topic,
+                "created_at": time.time(),
+            }
+            self._memory.set(key, record)
+            if topic:
+                self._memory.set(("topic", topic), record)
+            await self._store_call(self.store.put, record)
+            future.set_result(text)
+            return text
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+
+def _default_store():
+    if LLM_PROVIDER == "fake":
+        return MemoryLLMStore()
+    return MongoLLMStore()
+
+
+# Singleton instance
+llm_cache = LLMCache(_default_store())
@@ -1,189 +1,282 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from datetime import datetime
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import MinMaxScaler, normalize
 import database
-import google.generativeai as genai
-import os
-import json
-import re
+from .feature_store import FeatureStore, DEFAULT_FEATURE_WEIGHTS
+from .intent_parser import IntentParser, PLATFORM_ALIASES, TYPE_ALIASES
+from utils.cache import LRUCache
+from utils.metrics import stage
 from .serpapi_service import serp_api_service
+from catalog import PLATFORMS, load_catalog
+
+RECOMMENDER_COLUMNS = ["Title", "Year", "Type", "IMDb", "Genres", "Directors", "source", *PLATFORMS]
+# Candidates re-ranked by MMR when a diversified list is requested
+MMR_POOL_SIZE = 300
+# "something like <title>", "similar to <title>"; quoted titles are always looked up
+TITLE_CUE_RE = re.compile(r"\b(?:like|similar to|such as|same as|reminds? me of)\s+(.+)")
+QUOTED_RE = re.compile(r"[\"“]([^\"”]+)[\"”]")
+# Chat messages that ask for something to watch; only these fall back to the user's preferred genres
+REQUEST_CUE_RE = re.compile(r"\b(?:recommend\w*|suggest\w*|watch|something|anything|what should)\b")
+MAX_TITLE_WORDS = 8
+# After a failed load, callers get the empty engine for this long before the next attempt
+RECOMMENDER_RETRY_SECONDS = float(os.getenv("RECOMMENDER_RETRY_SECONDS", 10))
+
+
+def mmr_select(relevance, gram, k, mmr_lambda):
+    """Greedy Maximal Marginal Relevance over a candidate pool.
+
+    Picks k positions maximising mmr_lambda * relevance - (1 - mmr_lambda) * (max
+    similarity to anything already picked); 1.0 keeps the relevance order.
+    """
+    chosen = np.zeros(len(relevance), dtype=bool)
+    max_sim = np.zeros(len(relevance), dtype=np.float32)
+    selected = []
+    for _ in range(min(k, len(relevance))):
+        scores = mmr_lambda * relevance - (1.0 - mmr_lambda) * max_sim
+        scores[chosen] = -np.inf
+        j = int(np.argmax(scores))
+        selected.append(j)
+        chosen[j] = True
+        np.maximum(max_sim, gram[j], out=max_sim)
+    return selected
+
 
 class Recommender:
     def __init__(self):
         self.df = None
         self.df = None
-        self.combined_features = None
-        self.load_data()
-
-    def load_data(self):
-        """Load movie dataset from multiple JSON sources and build similarity matrix"""
-        try:
-            import os
-            import json
-            
-            # Resolve paths
-            BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-            FINAL_DF_PATH = os.path.join(BASE_DIR, "final_df_cleaned.json")
-            NEW_DATA_PATH = os.path.join(BASE_DIR, "new_data.json")
-            UPCOMING_DATA_PATH = os.path.join(BASE_DIR, "movies_2025_2026_500.json")
-            
-            # 1. Load Main Dataset
-            if not os.path.exists(FINAL_DF_PATH):
-                print(f"Warning: Dataset file not found at {FINAL_DF_PATH}")
-                self.df = pd.DataFrame()
+        self.features = None
+        self.title_index = {}
+        self._constraint_masks = LRUCache(max_entries=256)
+        self.intent_parser = IntentParser.from_dataframe(None)
+        # Built on first use (or by the startup warm-up), not at import
+        self.loaded = False
+        self._load_lock = threading.Lock()
+        self._failed_at = None
+
+    def ensure_loaded(self):
+        """Load the dataset and feature matrices once; blocks until they are built.
+
+        A failed or empty load is not final: it is retried on a later call,
+        at most every RECOMMENDER_RETRY_SECONDS.
+        """
+        if self.loaded:
+            return
+        with self._load_lock:
+            if self.loaded:
                 return
-
-            with open(FINAL_DF_PATH, 'r', encoding='utf-8') as f:
-                data_main = json.load(f)
-            
-            df_main = pd.DataFrame(data_main)
-
-            # 2. Load New Data (2021-2025)
-            df_new = pd.DataFrame()
-            if os.path.exists(NEW_DATA_PATH):
-                with open(NEW_DATA_PATH, 'r', encoding='utf-8') as f:
-                    data_new = json.load(f)
-                
-                # Normalize new data structure to match main df
-                normalized_new = []
-                for item in data_new:
-                    entry = {
-                        "Title": item.get("title"),
-                        "Year": item.get("year"),
-                        "Type": item.get("type", "Movie").lower(),
-                        "IMDb": item.get("imdb_rating", 0),
-                        "Genres": "Drama", # Default genre if missing
-                        "Directors": "Unknown",
-                        "Country": "Unknown",
-                        "Language": "English",
-                        "Runtime": 0,
-                        "Netflix": 1 if item.get("platform") == "Netflix" else 0,
-                        "Hulu": 1 if item.get("platform") == "Hulu" else 0,
-                        "Prime Video": 1 if item.get("platform") == "Prime Video" else 0,
-                        "Disney+": 1 if item.get("platform") == "Disney+" else 0,
-                        "Rotten Tomatoes": None
-                    }
-                    normalized_new.append(entry)
-                
-                df_new = pd.DataFrame(normalized_new)
-                print(f"Loaded {len(df_new)} new items from new_data.json")
-
-            # 2.5 Load Upcoming Data (2025-2026)
-            df_upcoming = pd.DataFrame()
-            if os.path.exists(UPCOMING_DATA_PATH):
-                with open(UPCOMING_DATA_PATH, 'r', encoding='utf-8') as f:
-                    data_upcoming = json.load(f)
-                
-                normalized_upcoming = []
-                for item in data_upcoming:
-                    entry = {
-                        "Title": item.get("title"),
-                        "Year": item.get("release_year"),
-                        "Type": "movie",
-                        "IMDb": item.get("imdb_rating") if item.get("imdb_rating") else 0,
-                        "Genres": item.get("category", "Drama"),
-                        "Directors": item.get("director", "Unknown"),
-                        "Country": "Unknown",
-                        "Language": "Multiple",
-                        "Runtime": 0,
-                        "Netflix": 1 if item.get("platform") == "Netflix" else 0,
-                        "Hulu": 1 if item.get("platform") == "Hulu" else 0,
-                        "Prime Video": 1 if item.get("platform") == "Prime Video" else 0,
-                        "Disney+": 1 if item.get("platform") == "Disney+" else 0,
-                        "Rotten Tomatoes": None
-                    }
-                    normalized_upcoming.append(entry)
-                df_upcoming = pd.DataFrame(normalized_upcoming)
-                print(f"Loaded {len(df_upcoming)} upcoming items from movies_2025_2026_500.json")
-
-            # 3. Merge Datasets
-            self.df = pd.concat([df_main, df_new, df_upcoming], ignore_index=True)
-            
-            if self.df.empty:
-                print("Warning: Combined dataset is empty.")
+            if self._failed_at is not None and time.monotonic() - self._failed_at < RECOMMENDER_RETRY_SECONDS:
                 return
+            self.load_data()
+            if self.df is None or self.df.empty:
+                self._failed_at = time.monotonic()
+            else:
+                self.loaded = True
+                self._failed_at = None
 
-            # Preprocessing fields into vectors
-            # 1. Genre similarity (40%) - Multi-hot encoding
-            self.df['Genres'] = self.df['Genres'].fillna('')
-            print("Processing Genres...")
-            genre_matrix = self.df['Genres'].str.get_dummies(sep=',')
-            print("Genres processed.")
-            genre_matrix_norm = normalize(genre_matrix)
-            
-            # 2. IMDb similarity (30%) - Scaling scores
-            print("Processing IMDb...")
-            scaler = MinMaxScaler()
-            self.df['IMDb'] = pd.to_numeric(self.df['IMDb'], errors='coerce').fillna(0)
-            imdb_scaled = scaler.fit_transform(self.df['IMDb'].values.reshape(-1, 1))
-            
-            # 3. Platform similarity (20%) - Multi-hot
-            platforms = ['Netflix', 'Hulu', 'Prime Video', 'Disney+']
-            for p in platforms:
-                if p not in self.df.columns:
-                    self.df[p] = 0
-                self.df[p] = pd.to_numeric(self.df[p], errors='coerce').fillna(0).astype(int)
-            
-            platform_matrix = self.df[platforms].values
-            platform_matrix_norm = normalize(platform_matrix) if platform_matrix.any() else platform_matrix
-            
-            # 4. Year proximity (10%) - Scaling release year
-            self.df['Year'] = pd.to_numeric(self.df['Year'], errors='coerce').fillna(0)
-            year_scaled = scaler.fit_transform(self.df['Year'].values.reshape(-1, 1))
-            
-            # Combine weighted features
-            v_genre = genre_matrix_norm * np.sqrt(0.40)
-            v_imdb = imdb_scaled * np.sqrt(0.30)
-            v_platform = platform_matrix_norm * np.sqrt(0.20)
-            v_year = year_scaled * np.sqrt(0.10)
-            
-            self.combined_features = np.hstack([v_genre, v_imdb, v_platform, v_year]).astype(np.float32)
-            print("Successfully loaded recommendation engine with {len(self.df)} total items.")
-            print("Feature matrix shape:", self.combined_features.shape)
-            
+    def load_data(self):
+        """Load the movie catalog (only the columns used here) and build similarity matrix"""
+        try:
+            self.build(load_catalog(RECOMMENDER_COLUMNS))
         except Exception as e:
             print(f"Error initializing recommender: {str(e)}")
             self.df = pd.DataFrame()
 
-    def get_recommendations(self, title: str, limit: int = 10):
-        """Return top N recommended movies based on similarity score"""
-        if self.df is None or self.df.empty or self.combined_features is None:
-            return []
+    def build(self, df: pd.DataFrame):
+        """Build the feature blocks and lookup indexes from a merged catalog DataFrame"""
+        # sklearn takes most of a second to import; only the build needs it
+        from sklearn.preprocessing import MinMaxScaler, normalize
+
+        self.df = df
+        if self.df.empty:
+            print("Warning: Combined dataset is empty.")
+            return
+
+        # Preprocessing fields into vectors
+        # 1. Genre similarity (40%) - Multi-hot encoding
+        self.df['Genres'] = self.df['Genres'].fillna('')
+        print("Processing Genres...")
+        genre_matrix = self.df['Genres'].str.get_dummies(sep=',')
+        print("Genres processed.")
+        genre_matrix_norm = normalize(genre_matrix)
         
-        # Primary search: Exact match (case-insensitive)
-        indices = self.df.index[self.df['Title'].str.lower() == title.lower()].tolist()
+        # 2. IMDb similarity (30%) - Scaling scores
+        print("Processing IMDb...")
+        scaler = MinMaxScaler()
+        self.df['IMDb'] = pd.to_numeric(self.df['IMDb'], errors='coerce').fillna(0)
+        imdb_scaled = scaler.fit_transform(self.df['IMDb'].values.reshape(-1, 1))
         
-        # Fallback: Substring match
-        if not indices:
-            indices = self.df.index[self.df['Title'].str.contains(title, case=False, na=False)].tolist()
-        
-        if not indices:
-            return [] # Title not found
-            
-        # Use only the first match found
-        idx = indices[0]
+        # 3. Platform similarity (20%) - Multi-hot
+        platforms = ['Netflix', 'Hulu', 'Prime Video', 'Disney+']
+        for p in platforms:
+            if p not in self.df.columns:
+                self.df[p] = 0
+            self.df[p] = pd.to_numeric(self.df[p], errors='coerce').fillna(0).astype(int)
         
-        # Compute similarity on the fly for memory efficiency
-        # Reshape target vector to (1, n_features)
-        target_vector = self.combined_features[idx].reshape(1, -1)
+        platform_matrix = self.df[platforms].values
+        platform_matrix_norm = normalize(platform_matrix) if platform_matrix.any() else platform_matrix
         
-        # Calculate cosine similarity between target and all items
-        # Returns (1, n_items) matrix
-        sim_scores_row = cosine_similarity(target_vector, self.combined_features)[0]
+        # 4. Year proximity (10%) - Scaling release year
+        self.df['Year'] = pd.to_numeric(self.df['Year'], errors='coerce').fillna(0)
+        year_scaled = scaler.fit_transform(self.df['Year'].values.reshape(-1, 1))
         
-        # Enumerate to keep index
-        sim_scores = list(enumerate(sim_scores_row))
+        # Blocks stay separate; weights (DEFAULT_FEATURE_WEIGHTS or per request) apply at query time
+        self.features = FeatureStore({
+            "genre": genre_matrix_norm,
+            "imdb": imdb_scaled,
+            "platform": platform_matrix_norm,
+            "year": year_scaled,
+        }, DEFAULT_FEATURE_WEIGHTS)
+
+        # Lower-cased title -> first row, for the exact-match lookup
+        titles = self.df['Title'].astype(str).str.lower()
+        self.title_index = {title: idx for idx, title in reversed(list(enumerate(titles)))}
+
+        # Columns behind the constraint masks of get_recommendations
+        self._years = self.df['Year'].to_numpy(dtype=np.float32)
+        self._imdb = self.df['IMDb'].to_numpy(dtype=np.float32)
+        types = self.df['Type'].fillna('').astype(str).str.lower().map(lambda t: TYPE_ALIASES.get(t, t))
+        self._type_codes, type_names = pd.factorize(types)
+        self._type_lookup = {name: code for code, name in enumerate(type_names)}
+        self._platform_masks = {p: self.df[p].to_numpy() == 1 for p in platforms}
+        # Out: placeholder rows of the upcoming-releases source and anything dated after this year
+        self._released = self._years <= datetime.utcnow().year
+        if 'source' in self.df.columns:
+            self._released &= (self.df['source'] != 'upcoming').to_numpy()
+        self._genre_masks = {}
+        for name in genre_matrix.columns:
+            key = name.strip().lower()
+            column = genre_matrix[name].to_numpy() == 1
+            self._genre_masks[key] = self._genre_masks[key] | column if key in self._genre_masks else column
+        self._constraint_masks.clear()
+
+        self.intent_parser = IntentParser.from_dataframe(self.df)
+        print("Successfully loaded recommendation engine with {len(self.df)} total items.")
+        print("Feature matrix shape:", self.features.shape)
+
+    def find_title(self, title: str):
+        """Row of the exact (case-insensitive) title, else of the first substring match, else None"""
+        if self.df is None or self.df.empty:
+            return None
+        idx = self.title_index.get(title.lower())
+        if idx is None:
+            indices = self.df.index[self.df['Title'].str.contains(title, case=False, na=False, regex=False)].tolist()
+            # Use only the first match found
+            idx = indices[0] if indices else None
+        return idx
+
+    def constraint_mask(self, platform=None, year_from=None, year_to=None, content_type=None, min_imdb=None,
+                        released_only=False):
+        """Boolean mask of the items meeting every constraint, None when unconstrained.
+
+        `platform` may list several platforms separated by commas (any of them).
+        `released_only` drops unreleased and upcoming-source items.
+        Masks are cached per constraint set and must not be modified.
+        """
+        platforms = None
+        if platform:
+            platforms = []
+            for name in str(platform).split(","):
+                canonical = PLATFORM_ALIASES.get(name.strip().lower())
+                if canonical is None:
+                    raise ValueError(f"Unknown platform '{name.strip()}'")
+                platforms.append(canonical)
+            platforms = tuple(sorted(set(platforms)))
+        if content_type:
+            canonical_type = TYPE_ALIASES.get(content_type.strip().lower())
+            if canonical_type is None:
+                raise ValueError(f"Unknown type '{content_type}'")
+            content_type = canonical_type
+
+        key = (platforms, year_from, year_to, content_type, min_imdb, bool(released_only))
+        if key == (None, None, None, None, None, False):
+            return None
+        mask = self._constraint_masks.get(key)
+        if mask is not None:
+            return mask
+
+        mask = np.ones(len(self.df), dtype=bool)
+        if platforms:
+            mask &= np.logical_or.reduce([self._platform_masks[p] for p in platforms])
+        if year_from is not None:
+            mask &= self._years >= year_from
+        if year_to is not None:
+            mask &= self._years <= year_to
+        if content_type:
+            code = self._type_lookup.get(content_type)
+            mask &= (self._type_codes == code) if code is not None else False
+        if min_imdb is not None:
+            mask &= self._imdb >= min_imdb
+        if released_only:
+            mask &= self._released
+        mask.flags.writeable = False
+        self._constraint_masks.set(key, mask)
+        return mask
+
+    def get_recommendations(self, title: str, limit: int = 10, weights: dict = None,
+                            constraints: dict = None, exclude=None, mmr_lambda: float = None):
+        """Return top N recommended movies based on similarity score.
+
+        `weights` overrides the per-block feature weights (genre/imdb/platform/year)
+        for this call. `constraints` takes the keyword arguments of
+        `constraint_mask`; matching items are masked before the top-N, so the list
+        is always filled when enough items qualify. `exclude` lists titles to leave
+        out. `mmr_lambda` (0-1) re-ranks the best MMR_POOL_SIZE candidates for
+        diversity. Raises ValueError for invalid weights or constraints.
+        """
+        if self.df is None or self.df.empty or self.features is None:
+            return []
+        with stage("recommend.lookup"):
+            weights = self.features.resolve_weights(weights)
+            mask = self.constraint_mask(**(constraints or {}))
+            idx = self.find_title(title)
+        if idx is None:
+            return [] # Title not found
+        top, sim_scores_row = self._top_similar(idx, limit, weights, mask, exclude, mmr_lambda)
+        if len(top) == 0:
+            return []
         
-        # Sort by similarity score descending
-        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
+        with stage("recommend.materialise"):
+            return self._format_recommendations(top, sim_scores_row)
+
+    def _top_similar(self, idx, limit, weights, mask=None, exclude=None, mmr_lambda=None):
+        """(rows of the `limit` items most similar to row `idx`, best first; the score row)"""
+        # Weighted cosine similarity between target and all items
+        with stage("recommend.scoring"):
+            sim_scores_row = self.features.similarity(idx, weights)
+            if mask is not None:
+                sim_scores_row[~mask] = -np.inf
+            sim_scores_row[idx] = -np.inf  # never recommend the title itself
+            for excluded in exclude or []:
+                excluded_idx = self.title_index.get(str(excluded).lower())
+                if excluded_idx is not None:
+                    sim_scores_row[excluded_idx] = -np.inf
         
-        # Filter out the title itself and take top 'limit' results
+        # Top `limit` among the eligible items, without sorting the whole catalog
+        with stage("recommend.topk"):
+            eligible = int(np.count_nonzero(sim_scores_row > -np.inf))
+            limit = max(0, min(limit, eligible))
+            if limit == 0:
+                return np.empty(0, dtype=np.intp), sim_scores_row
+            if mmr_lambda is None:
+                top = np.argpartition(-sim_scores_row, limit - 1)[:limit]
+                top = top[np.argsort(-sim_scores_row[top], kind="stable")]
+            else:
+                pool_size = min(max(MMR_POOL_SIZE, limit), eligible)
+                pool = np.argpartition(-sim_scores_row, pool_size - 1)[:pool_size]
+                gram = self.features.pairwise(pool, weights)
+                top = pool[mmr_select(sim_scores_row[pool], gram, limit, mmr_lambda)]
+        return top, sim_scores_row
+
+    def _format_recommendations(self, top, sim_scores_row):
         recommendations = []
-        for i, score in sim_scores:
-            if i == idx: continue
-            if len(recommendations) >= limit: break
-            
+        for i in top:
+            score = sim_scores_row[i]
             row = self.df.iloc[i]
             # Consolidate platform availability
             available_platforms = [p for p in ['Netflix', 'Hulu', 'Prime Video', 'Disney+'] if row.get(p) == 1]
@@ -250,54 +343,141 @@ class Recommender:
             "netflix_new": format_list(netflix)
         }
 
-    def search_by_ai_intent(self, intent: dict):
-        """Filter dataset based on extracted AI intent"""
-        if self.df is None or self.df.empty:
+    def mentioned_title(self, message: str):
+        """Row of a catalog title the message names ("like Inception", or in quotes), else None"""
+        text = " ".join(message.lower().split())
+        quoted = QUOTED_RE.search(message)
+        if quoted:
+            idx = self.find_title(quoted.group(1).strip())
+            if idx is not None:
+                return idx
+        cue = TITLE_CUE_RE.search(text)
+        if cue is None:
+            return None
+        # Longest run of words after the cue that is exactly a title
+        words = cue.group(1).split()
+        for n in range(min(MAX_TITLE_WORDS, len(words)), 0, -1):
+            idx = self.title_index.get(" ".join(words[:n]).strip(".,!?;:"))
+            if idx is not None:
+                return idx
+        return None
+
+    def chat_candidates(self, message: str, preferred_genres=(), limit: int = 5):
+        """Released catalog items that fit a chat message, as short dicts for a prompt.
+
+        A title the message names ("something like Inception") gives its most
+        similar items. Otherwise the locally parsed intent (genre, platform,
+        year, type, director) selects the top rated matches; the user's
+        preferred genres stand in for the genre only when the message asks for
+        something to watch. Messages with neither give no candidates. Nothing
+        is fetched from SerpApi.
+        """
+        if self.df is None or self.df.empty or self.features is None or limit <= 0:
+            return []
+        intent, _ = self.intent_parser.parse(message)
+        year = intent.get("year")
+        year_from, year_to = (year, year) if isinstance(year, int) else (year or (None, None))
+        constraints = {"platform": intent.get("platform"), "year_from": year_from, "year_to": year_to,
+                       "content_type": intent.get("type"), "released_only": True}
+        try:
+            mask = self.constraint_mask(**constraints)
+        except ValueError:
+            mask = self.constraint_mask(released_only=True)
+
+        idx = self.mentioned_title(message)
+        if idx is not None:
+            top, _ = self._top_similar(idx, limit, self.features.resolve_weights(None), mask)
+            return self._candidate_dicts(top)
+
+        genres = [intent["genre"]] if intent.get("genre") else []
+        if not genres and REQUEST_CUE_RE.search(message.lower()):
+            genres = list(preferred_genres)
+        genre_masks = [self._genre_masks[g.lower()] for g in genres if g and g.lower() in self._genre_masks]
+        constrained = genre_masks or intent.get("director") or any(
+            constraints[name] is not None for name in ("platform", "year_from", "content_type"))
+        if not constrained:
+            # A global top list would only steer the answer away from the question
             return []
 
-        filtered_df = self.df.copy()
-
-        # 1. Year Filter
-        if intent.get("year"):
-            year = intent["year"]
-            if isinstance(year, int):
-                filtered_df = filtered_df[filtered_df['Year'] == year]
-            elif isinstance(year, list) and len(year) == 2:
-                filtered_df = filtered_df[(filtered_df['Year'] >= year[0]) & (filtered_df['Year'] <= year[1])]
-
-        # 2. Platform Filter
-        if intent.get("platform"):
-            platform = intent["platform"].title()
-            if platform in ['Netflix', 'Hulu', 'Prime Video', 'Disney+']:
-                filtered_df = filtered_df[filtered_df[platform] == 1]
-
-        # 3. Genre Filter
-        if intent.get("genre"):
-            genre = intent["genre"].lower()
-            filtered_df = filtered_df[filtered_df['Genres'].str.lower().str.contains(genre, na=False)]
-
-        # 4. Keyword Search (Title/Director)
-        if intent.get("keyword"):
-            kw = intent["keyword"].lower()
-            filtered_df = filtered_df[
-                filtered_df['Title'].str.lower().str.contains(kw, na=False) |
-                filtered_df['Directors'].str.lower().str.contains(kw, na=False)
-            ]
-
-        # 5. Rating Threshold
+        mask = mask.copy()
+        if genre_masks:
+            mask &= np.logical_or.reduce(genre_masks)
         if intent.get("min_rating"):
-            filtered_df = filtered_df[filtered_df['IMDb'] >= intent["min_rating"]]
+            mask &= self._imdb >= intent["min_rating"]
+        if intent.get("director"):
+            mask &= self.df['Directors'].str.contains(intent["director"], case=False, na=False, regex=False).to_numpy()
+
+        rows = np.flatnonzero(mask)
+        if len(rows) > limit:
+            rows = rows[np.argpartition(-self._imdb[rows], limit - 1)[:limit]]
+        return self._candidate_dicts(rows[np.argsort(-self._imdb[rows], kind="stable")])
+
+    def _candidate_dicts(self, rows):
+        return [{
+            "title": str(self.df['Title'].iat[i]),
+            "year": int(self._years[i]) or None,
+            "imdb": round(float(self._imdb[i]), 1),
+            "platforms": [p for p, platform_mask in self._platform_masks.items() if platform_mask[i]],
+            "genres": self.df['Genres'].iat[i],
+        } for i in rows]
 
-        # Sorting
-        sort_by = intent.get("sort_by", "rating")
-        if sort_by == "rating":
-            filtered_df = filtered_df.sort_values(by='IMDb', ascending=False)
-        elif sort_by == "year":
-            filtered_df = filtered_df.sort_values(by='Year', ascending=False)
+    def search_by_ai_intent(self, intent: dict):
+        """Filter dataset based on extracted AI intent"""
+        if self.df is None or self.df.empty:
+            return []
 
-        # Limit
-        limit = intent.get("limit", 10)
-        results = filtered_df.head(limit)
+        with stage("ai_search.filter"):
+            filtered_df = self.df.copy()
+
+            # 1. Year Filter
+            if intent.get("year"):
+                year = intent["year"]
+                if isinstance(year, int):
+                    filtered_df = filtered_df[filtered_df['Year'] == year]
+                elif isinstance(year, list) and len(year) == 2:
+                    filtered_df = filtered_df[(filtered_df['Year'] >= year[0]) & (filtered_df['Year'] <= year[1])]
+
+            # 2. Platform Filter
+            if intent.get("platform"):
+                platform = intent["platform"].title()
+                if platform in ['Netflix', 'Hulu', 'Prime Video', 'Disney+']:
+                    filtered_df = filtered_df[filtered_df[platform] == 1]
+
+            # 3. Genre Filter
+            if intent.get("genre"):
+                genre = intent["genre"].lower()
+                filtered_df = filtered_df[filtered_df['Genres'].str.lower().str.contains(genre, na=False, regex=False)]
+
+            # 4. Director / Type Filters (local intent parser)
+            if intent.get("director"):
+                director = intent["director"].lower()
+                filtered_df = filtered_df[filtered_df['Directors'].str.lower().str.contains(director, na=False, regex=False)]
+
+            if intent.get("type"):
+                filtered_df = filtered_df[filtered_df['Type'].str.lower() == intent["type"].lower()]
+
+            # 5. Keyword Search (Title/Director)
+            if intent.get("keyword"):
+                kw = intent["keyword"].lower()
+                filtered_df = filtered_df[
+                    filtered_df['Title'].str.lower().str.contains(kw, na=False, regex=False) |
+                    filtered_df['Directors'].str.lower().str.contains(kw, na=False, regex=False)
+                ]
+
+            # 6. Rating Threshold
+            if intent.get("min_rating"):
+                filtered_df = filtered_df[filtered_df['IMDb'] >= intent["min_rating"]]
+
+            # Sorting
+            sort_by = intent.get("sort_by", "rating")
+            if sort_by == "rating":
+                filtered_df = filtered_df.sort_values(by='IMDb', ascending=False)
+            elif sort_by == "year":
+                filtered_df = filtered_df.sort_values(by='Year', ascending=False)
+
+            # Limit
+            limit = intent.get("limit", 10)
+            results = filtered_df.head(limit)
 
         # Parallelize SerpApi enrichment for top 5 results to reduce latency
         from concurrent.futures import ThreadPoolExecutor
@@ -329,7 +509,7 @@ class Recommender:
         formatted_results = []
         
         # Execute parallel fetching
-        with ThreadPoolExecutor(max_workers=5) as executor:
+        with stage("ai_search.enrich"), ThreadPoolExecutor(max_workers=5) as executor:
             enriched_data = list(executor.map(fetch_enrichment, top_5_rows))
             formatted_results.extend(enriched_data)
 
@@ -350,55 +530,35 @@ class Recommender:
         return formatted_results
 
     def extract_intent_with_ai(self, query: str):
-        """Uses simple logic to Parse query into structured intent (AI logic can be injected from route)"""
-        intent = {
-            "year": None,
-            "platform": None,
-            "genre": None,
-            "keyword": None,
-            "sort_by": "rating",
-            "limit": 10
-        }
-
-        # 1. Try to extract year (4 digits)
-        year_match = re.search(r'\b(19|20)\d{2}\b', query)
-        if year_match:
-            intent["year"] = int(year_match.group(0))
-
-        # 2. Try to extract platform
-        platforms = ["netflix", "hulu", "prime video", "disney"]
-        for p in platforms:
-            if p in query.lower():
-                intent["platform"] = p if p != "prime video" else "Prime Video"
-                if p == "disney": intent["platform"] = "Disney+"
-                break
-        
-        # 3. Handle "best" or "top" keyword (sorting)
-        if any(w in query.lower() for w in ["best", "top", "high rated", "popular"]):
-            intent["sort_by"] = "rating"
-            intent["min_rating"] = 7.0
-        
-        # 4. Handle "recent" or "new" (sorting)
-        if any(w in query.lower() for w in ["recent", "new", "upcoming"]):
-            intent["sort_by"] = "year"
-
-        # 5. Remaining words as keywords if no year found
-        if not intent["year"]:
-            # Basic cleanup: remove common stop words for better search
-            intent["keyword"] = query
-
+        """Parse query into structured intent with the local catalog-backed parser (AI logic can be injected from route)"""
+        intent, _ = self.intent_parser.parse(query)
         return intent
 
+    def parse_intent(self, query: str):
+        """Returns (intent, confidence) so callers can decide whether to consult the LLM"""
+        return self.intent_parser.parse(query)
+
 # Initialize once into memory (Singleton pattern as requested)
 engine = Recommender()
 
-def get_recommendations(title: str, limit: int = 10):
-    return engine.get_recommendations(title, limit)
+async def load_engine():
+    """Wait for the recommender without blocking the event loop (no-op once loaded)"""
+    if not engine.loaded:
+        await asyncio.to_thread(engine.ensure_loaded)
+    return engine
+
+def get_recommendations(title: str, limit: int = 10, weights: dict = None, constraints: dict = None, exclude=None,
+                        mmr_lambda: float = None):
+    engine.ensure_loaded()
+    return engine.get_recommendations(title, limit, weights=weights, constraints=constraints, exclude=exclude,
+                                      mmr_lambda=mmr_lambda)
 
 def get_ai_curated():
+    engine.ensure_loaded()
     return engine.get_curated_content()
 
 def search_movies_with_ai(query: str, intent: dict = None):
+    engine.ensure_loaded()
     if not intent:
         intent = engine.extract_intent_with_ai(query)
     return engine.search_by_ai_intent(intent)
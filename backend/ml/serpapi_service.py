@@ -2,6 +2,7 @@
 import os
 from serpapi import GoogleSearch
 from dotenv import load_dotenv
+from utils.metrics import stage
 
 load_dotenv()
 
@@ -31,7 +32,8 @@ class SerpApiService:
 
         try:
             search = GoogleSearch(search_params)
-            results = search.get_dict()
+            with stage("serpapi.search"):
+                results = search.get_dict()
             
             info = {
                 "title": movie_title,
@@ -0,0 +1,349 @@
+import asyncio
+import hashlib
+import math
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+from pymongo import UpdateOne
+
+import database
+from ml.trending import TopK
+from utils.readiness import readiness
+
+SKETCH_CHECKPOINT_SECONDS = float(os.getenv("SKETCH_CHECKPOINT_SECONDS", 60))
+SKETCH_RETENTION_DAYS = int(os.getenv("SKETCH_RETENTION_DAYS", 35))
+TITLE_HLL_PRECISION = 10  # 1 KiB per title, ~3.3% standard error
+AGGREGATE_HLL_PRECISION = 14  # 16 KiB per day / platform-day, ~0.8% standard error
+CMS_WIDTH = 2048
+CMS_DEPTH = 4
+HEAVY_HITTERS_K = 100
+
+COLLECTION = "analytics_sketches"
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Distinct-count sketch with 2^p one-byte registers; merge is a register-wise max"""
+
+    def __init__(self, p=TITLE_HLL_PRECISION, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, value: str):
+        """Returns the index of the register this raised, or None"""
+        x = _hash64(value)
+        index = x >> (64 - self.p)
+        rest = (x << self.p) & 0xFFFFFFFFFFFFFFFF
+        rank = min(64 - rest.bit_length() + 1, 64 - self.p + 1)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return index
+        return None
+
+    def merge(self, other: "HyperLogLog"):
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        np.maximum(registers, np.frombuffer(other.registers, dtype=np.uint8), out=registers)
+        return self
+
+    def count(self) -> int:
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / float(np.sum(np.exp2(-registers.astype(np.float64))))
+        zeros = int(self.m - np.count_nonzero(registers))
+        if estimate <= 2.5 * self.m and zeros:
+            # Small-range correction: linear counting
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def copy(self):
+        return HyperLogLog(self.p, self.registers)
+
+    @property
+    def standard_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+
+class CountMinSketch:
+    """Frequency sketch: estimates never undercount, overcount by at most e/width of the total"""
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH, counts=None):
+        self.width = width
+        self.depth = depth
+        self.counts = counts if counts is not None else np.zeros((depth, width), dtype=np.int64)
+        self.total = int(self.counts[0].sum())
+
+    def _indexes(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=4 * self.depth).digest()
+        return [int.from_bytes(digest[4 * row:4 * row + 4], "big") % self.width for row in range(self.depth)]
+
+    def add(self, key: str, count=1) -> int:
+        """Add `count` occurrences of `key` and return its new estimate"""
+        estimate = None
+        for row, column in enumerate(self._indexes(key)):
+            self.counts[row, column] += count
+            value = self.counts[row, column]
+            estimate = value if estimate is None or value < estimate else estimate
+        self.total += count
+        return int(estimate)
+
+    def estimate(self, key: str) -> int:
+        return int(min(self.counts[row, column] for row, column in enumerate(self._indexes(key))))
+
+    def merge(self, other: "CountMinSketch"):
+        self.counts += other.counts
+        self.total += other.total
+        return self
+
+
+class HeavyHitters:
+    """Count-Min counts plus a top-k of candidate keys by their estimate.
+
+    CMS estimates only grow, so TopK's monotonic-score invariant holds.
+    """
+
+    def __init__(self, k=HEAVY_HITTERS_K, width=CMS_WIDTH, depth=CMS_DEPTH):
+        self.k = k
+        self.cms = CountMinSketch(width, depth)
+        self.candidates = TopK(k)
+
+    def add(self, key: str, count=1):
+        self.candidates.offer(key, self.cms.add(key, count))
+
+    def top(self, n=10):
+        return self.candidates.top(n)
+
+    def reseed(self, keys):
+        """Rebuild the candidate set from `keys` against the current counts"""
+        self.candidates = TopK(self.k)
+        for key in keys:
+            self.candidates.offer(key, self.cms.estimate(key))
+
+
+class SketchStore:
+    """Watch/search analytics kept as sketches instead of scans of raw data.
+
+    - distinct viewers: HyperLogLog per title, per day and per platform-day
+    - most watched titles / most searched queries: HeavyHitters
+
+    Checkpoints to `analytics_sketches` so several workers share one view:
+    HyperLogLog registers are stored as an int array and only the cells a
+    worker raised are pushed, as `$max` (idempotent, and concurrent pushes
+    cannot undo each other); Count-Min counters are pushed as `$inc` deltas so
+    no increment is applied twice.
+    """
+
+    def __init__(self):
+        self.viewers = {}  # sketch id -> HyperLogLog
+        self.titles = HeavyHitters()
+        self.queries = HeavyHitters()
+        self._changed = {}  # sketch id -> indexes of registers raised since the last checkpoint
+        # Local increments since the last checkpoint, pushed to the shared Count-Min as $inc
+        self._pending = {"titles": Counter(), "queries": Counter()}
+        self.events_seen = 0
+        self.last_checkpoint_at = None
+
+    # --- Updates ---
+    def _add_viewer(self, sketch_id, p, viewer):
+        hll = self.viewers.get(sketch_id)
+        if hll is None:
+            hll = self.viewers[sketch_id] = HyperLogLog(p)
+        index = hll.add(viewer)
+        if index is not None:
+            self._changed.setdefault(sketch_id, set()).add(index)
+
+    def record_view(self, title, platform=None, viewer=None, day=None):
+        day = day or datetime.utcnow().strftime("%Y-%m-%d")
+        self.titles.add(title)
+        self._pending["titles"][title] += 1
+        if viewer:
+            self._add_viewer(f"title:{title}", TITLE_HLL_PRECISION, viewer)
+            self._add_viewer(f"day:{day}", AGGREGATE_HLL_PRECISION, viewer)
+            if platform:
+                self._add_viewer(f"platform-day:{platform}:{day}", AGGREGATE_HLL_PRECISION, viewer)
+        self.events_seen += 1
+
+    def record_events(self, docs):
+        """Listener for the watch-event buffer"""
+        for doc in docs:
+            timestamp = doc.get("timestamp")
+            day = timestamp.strftime("%Y-%m-%d") if isinstance(timestamp, datetime) else None
+            self.record_view(doc["title"], doc.get("platform"), doc.get("user_email"), day)
+
+    def record_query(self, query: str):
+        query = " ".join(query.lower().split())
+        if query:
+            self.queries.add(query)
+            self._pending["queries"][query] += 1
+
+    # --- Queries ---
+    def distinct_viewers(self, days=1, platform=None, today=None):
+        """Distinct viewers over the last `days` days (union of the daily sketches)"""
+        today = today or datetime.utcnow().date()
+        union = None
+        for offset in range(days):
+            day = (today - timedelta(days=offset)).strftime("%Y-%m-%d")
+            hll = self.viewers.get(f"platform-day:{platform}:{day}" if platform else f"day:{day}")
+            if hll is not None:
+                union = hll.copy() if union is None else union.merge(hll)
+        return union.count() if union is not None else 0
+
+    def title_viewers(self, title):
+        hll = self.viewers.get(f"title:{title}")
+        return hll.count() if hll is not None else 0
+
+    def top_titles(self, n=10):
+        return [{"title": title, "views": views, "distinct_viewers": self.title_viewers(title)}
+                for title, views in self.titles.top(n)]
+
+    def top_queries(self, n=10):
+        return [{"query": query, "count": count} for query, count in self.queries.top(n)]
+
+    def memory_bytes(self):
+        hll_bytes = sum(len(hll.registers) for hll in self.viewers.values())
+        cms_bytes = sum(hh.cms.counts.nbytes for hh in (self.titles, self.queries))
+        return {"hyperloglog": hll_bytes, "count_min": cms_bytes, "total": hll_bytes + cms_bytes}
+
+    def stats(self):
+        return {
+            "events_seen": self.events_seen,
+            "hyperloglogs": len(self.viewers),
+            "memory_bytes": self.memory_bytes(),
+            "last_checkpoint_at": self.last_checkpoint_at,
+        }
+
+    # --- Persistence ---
+    def _prune(self):
+        """Forget day sketches past the retention window"""
+        cutoff = (datetime.utcnow() - timedelta(days=SKETCH_RETENTION_DAYS)).strftime("%Y-%m-%d")
+        for sketch_id in list(self.viewers):
+            if sketch_id.startswith(("day:", "platform-day:")) and sketch_id.rsplit(":", 1)[1] < cutoff:
+                del self.viewers[sketch_id]
+                self._changed.pop(sketch_id, None)
+
+    async def _sync_heavy_hitters(self, collection, name):
+        heavy = getattr(self, name)
+        pending, self._pending[name] = self._pending[name], Counter()
+        delta = CountMinSketch(heavy.cms.width, heavy.cms.depth)
+        for key, count in pending.items():
+            delta.add(key, count)
+        doc_id = f"cms:{name}"
+
+        try:
+            # Create the zeroed counter array once, then only ever $inc cells of it
+            await collection.update_one(
+                {"_id": doc_id},
+                {"$setOnInsert": {"width": delta.width, "depth": delta.depth, "counts": [0] * (delta.width * delta.depth)}},
+                upsert=True
+            )
+            cells = np.flatnonzero(delta.counts)
+            if cells.size:
+                flat = delta.counts.ravel()
+                await collection.update_one(
+                    {"_id": doc_id},
+                    {"$inc": {f"counts.{cell}": int(flat[cell]) for cell in cells}}
+                )
+        except Exception:
+            # Not applied: push it again next time
+            self._pending[name].update(pending)
+            raise
+
+        stored = await collection.find_one({"_id": doc_id})
+        counts = np.array(stored["counts"], dtype=np.int64).reshape(stored["depth"], stored["width"])
+        # Everyone's counts plus whatever arrived locally while we were awaiting
+        heavy.cms = CountMinSketch(stored["width"], stored["depth"], counts)
+        for key, count in self._pending[name].items():
+            heavy.cms.add(key, count)
+        keys = set(stored.get("candidates", [])) | set(heavy.candidates.members)
+        heavy.reseed(keys)
+        await collection.update_one(
+            {"_id": doc_id},
+            {"$set": {"candidates": [key for key, _ in heavy.top(2 * heavy.k)], "updated_at": datetime.utcnow()}}
+        )
+
+    async def _sync_viewers(self, collection, changed):
+        sketch_ids = [sketch_id for sketch_id in sorted(changed) if sketch_id in self.viewers]
+        if not sketch_ids:
+            return
+        # Create each zeroed register array once, then only ever $max cells of it
+        await collection.bulk_write([
+            UpdateOne({"_id": f"hll:{sketch_id}"},
+                      {"$setOnInsert": {"p": self.viewers[sketch_id].p,
+                                        "registers": [0] * self.viewers[sketch_id].m}},
+                      upsert=True)
+            for sketch_id in sketch_ids
+        ], ordered=False)
+        now = datetime.utcnow()
+        await collection.bulk_write([
+            UpdateOne({"_id": f"hll:{sketch_id}", "p": self.viewers[sketch_id].p},
+                      {"$max": {f"registers.{i}": self.viewers[sketch_id].registers[i] for i in sorted(changed[sketch_id])},
+                       "$set": {"updated_at": now}})
+            for sketch_id in sketch_ids
+        ], ordered=False)
+
+        # Pick up the registers other workers raised in these sketches
+        async for doc in collection.find({"_id": {"$in": [f"hll:{s}" for s in sketch_ids]}}):
+            hll = self.viewers.get(doc["_id"][len("hll:"):])
+            if hll is not None and doc["p"] == hll.p:
+                hll.merge(HyperLogLog(doc["p"], doc["registers"]))
+
+    async def checkpoint(self):
+        if database.db is None:
+            return
+        collection = database.db[COLLECTION]
+        self._prune()
+        changed, self._changed = self._changed, {}
+        try:
+            await self._sync_viewers(collection, changed)
+        except Exception:
+            # Not (all) applied: push them again next time; $max makes a repeat harmless
+            for sketch_id, cells in changed.items():
+                self._changed.setdefault(sketch_id, set()).update(cells)
+            raise
+        for name in ("titles", "queries"):
+            await self._sync_heavy_hitters(collection, name)
+        self.last_checkpoint_at = time.time()
+
+    async def restore(self):
+        """Load the shared state; local updates made before this are kept"""
+        if database.db is None:
+            return
+        collection = database.db[COLLECTION]
+        cutoff = (datetime.utcnow() - timedelta(days=SKETCH_RETENTION_DAYS)).strftime("%Y-%m-%d")
+        async for doc in collection.find({"_id": {"$regex": "^hll:"}}):
+            sketch_id = doc["_id"][len("hll:"):]
+            if sketch_id.startswith(("day:", "platform-day:")) and sketch_id.rsplit(":", 1)[1] < cutoff:
+                continue
+            if isinstance(doc["registers"], bytes):
+                # Saved as one binary blob by older versions; convert once so cells can be $max-ed
+                await collection.update_one({"_id": doc["_id"], "registers": doc["registers"]},
+                                            {"$set": {"registers": list(doc["registers"])}})
+            stored = HyperLogLog(doc["p"], doc["registers"])
+            if sketch_id in self.viewers:
+                self.viewers[sketch_id].merge(stored)
+            else:
+                self.viewers[sketch_id] = stored
+        for name in ("titles", "queries"):
+            await self._sync_heavy_hitters(collection, name)
+
+    async def run(self, interval=SKETCH_CHECKPOINT_SECONDS):
+        """Background loop for the app lifespan"""
+        await readiness.track("sketches", self.restore, critical=False)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.checkpoint()
+            except Exception as e:
+                print(f"⚠️ Sketch checkpoint failed: {e}")
+
+
+# Singleton instance
+sketches = SketchStore()
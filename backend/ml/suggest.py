@@ -0,0 +1,226 @@
+import asyncio
+import contextvars
+import math
+import re
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+import database
+
+SUGGEST_TOP_K = 10
+# Prefixes up to this length have their top-k stored; longer ones scan their (small) key range
+PRECOMPUTED_PREFIX_LEN = 3
+# Index a title under each of its first few word starts ("dark knight" for "The Dark Knight")
+MAX_WORD_STARTS = 6
+# Backoff between rebuilds while the content collection cannot be read
+SUGGEST_RETRY_MIN_SECONDS = 2.0
+SUGGEST_RETRY_MAX_SECONDS = 120.0
+NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def normalise(text) -> str:
+    """Lower-case, strip accents and punctuation ("Amélie: Spider-Man" -> "amelie spider man")"""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(NON_WORD_RE.sub(" ", text).split())
+
+
+class SuggestSnapshot:
+    """Immutable prefix index: sorted keys plus, per key, the entry it completes to"""
+
+    def __init__(self, entries):
+        self.texts = [text for text, _, _ in entries]
+        self.kinds = [kind for _, kind, _ in entries]
+        self.popularity = np.array([score for _, _, score in entries], dtype=np.float64)
+
+        pairs = []
+        for entry_id, text in enumerate(self.texts):
+            words = normalise(text).split(" ")
+            for start in range(min(len(words), MAX_WORD_STARTS)):
+                if words[start]:
+                    pairs.append((" ".join(words[start:]), entry_id))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.ids = np.array([entry_id for _, entry_id in pairs], dtype=np.int32)
+
+        # prefix -> entry ids, most popular first
+        self.top_prefix = {}
+        for length in range(1, PRECOMPUTED_PREFIX_LEN + 1):
+            lo = 0
+            while lo < len(self.keys):
+                prefix = self.keys[lo][:length]
+                if len(prefix) < length:
+                    # Shorter key: already covered by a shorter prefix
+                    lo += 1
+                    continue
+                hi = bisect_right(self.keys, prefix + "\U0010ffff", lo)
+                self.top_prefix[prefix] = self._rank(self.ids[lo:hi], SUGGEST_TOP_K)
+                lo = hi
+
+    def _rank(self, ids, limit):
+        unique = np.unique(ids)
+        if len(unique) > limit:
+            unique = unique[np.argpartition(-self.popularity[unique], limit - 1)[:limit]]
+        return unique[np.argsort(-self.popularity[unique], kind="stable")].tolist()
+
+    def lookup(self, prefix: str, limit=SUGGEST_TOP_K):
+        if len(prefix) <= PRECOMPUTED_PREFIX_LEN and limit <= SUGGEST_TOP_K:
+            ids = self.top_prefix.get(prefix, [])[:limit]
+        else:
+            lo = bisect_left(self.keys, prefix)
+            hi = bisect_right(self.keys, prefix + "\U0010ffff", lo)
+            ids = self._rank(self.ids[lo:hi], limit) if hi > lo else []
+        return [{"text": self.texts[i], "type": self.kinds[i]} for i in ids]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def build_entries(df, content_docs):
+    """(display text, kind, popularity) for titles, directors and genres.
+
+    Title popularity blends IMDb with log views; directors take their best
+    title's score and genres rank above any single title.
+    """
+    titles = {}  # normalised title -> [display, imdb, views]
+    if df is not None and not df.empty:
+        imdb = df['IMDb'].fillna(0).tolist() if 'IMDb' in df else [0] * len(df)
+        for title, rating in zip(df['Title'].tolist(), imdb):
+            key = normalise(title) if isinstance(title, str) else ""
+            if key and key not in titles:
+                titles[key] = [title, float(rating or 0), 0]
+    for doc in content_docs:
+        title = doc.get("title")
+        key = normalise(title) if isinstance(title, str) else ""
+        if not key:
+            continue
+        entry = titles.setdefault(key, [title, 0.0, 0])
+        try:
+            entry[1] = max(entry[1], float(doc.get("imdb") or 0))
+            entry[2] += int(doc.get("views") or 0)
+        except (TypeError, ValueError):
+            pass
+
+    max_views = max((views for _, _, views in titles.values()), default=0)
+    view_scale = math.log1p(max_views) or 1.0
+    title_scores = {
+        key: 0.6 * min(rating, 10.0) / 10.0 + 0.4 * math.log1p(views) / view_scale
+        for key, (_, rating, views) in titles.items()
+    }
+    entries = [(display, "title", title_scores[key]) for key, (display, _, _) in titles.items()]
+
+    if df is not None and not df.empty:
+        directors = {}
+        genres = {}
+        for title, names, labels in zip(df['Title'].tolist(), df['Directors'].fillna('').tolist(),
+                                        df['Genres'].fillna('').tolist()):
+            score = title_scores.get(normalise(title) if isinstance(title, str) else "", 0.0)
+            for name in str(names).split(","):
+                name = name.strip()
+                if name and name != "Unknown":
+                    directors[name] = max(directors.get(name, 0.0), score)
+            for label in str(labels).split(","):
+                label = label.strip()
+                if label:
+                    genres[label] = genres.get(label, 0) + 1
+        entries.extend((name, "director", score) for name, score in directors.items())
+        total = sum(genres.values()) or 1
+        entries.extend((label, "genre", 1.0 + count / total) for label, count in genres.items())
+    return entries
+
+
+class SuggestIndex:
+    """Typeahead over titles, directors and genres, rebuilt off the request path.
+
+    Lookups read `snapshot` once, so a rebuild swaps in the new index atomically.
+    When Mongo cannot be read the index is built from the catalog alone and
+    rebuilt with backoff until the content collection is back.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self.built_at = None
+        self.build_ms = None
+        self.complete = False
+        self._task = None
+        self._pending = False
+        self._retry_task = None
+        self._retry_delay = SUGGEST_RETRY_MIN_SECONDS
+
+    @property
+    def ready(self):
+        return self.snapshot is not None
+
+    def suggest(self, query: str, limit=SUGGEST_TOP_K):
+        prefix = normalise(query)
+        if not prefix or self.snapshot is None:
+            return []
+        return self.snapshot.lookup(prefix, limit)
+
+    async def rebuild(self, df):
+        content_docs = []
+        complete = True
+        if database.content_collection is not None:
+            try:
+                content_docs = await database.content_collection.find(
+                    {}, {"title": 1, "imdb": 1, "views": 1, "_id": 0}
+                ).to_list()
+            except Exception as e:
+                complete = False
+                print(f"⚠️ Suggest index: could not read content ({e}). Building from the catalog alone.")
+        start = time.perf_counter()
+        # Sorting ~100k keys takes a while; keep it off the event loop
+        self.snapshot = await asyncio.to_thread(lambda: SuggestSnapshot(build_entries(df, content_docs)))
+        self.build_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.built_at = time.time()
+        self.complete = complete
+        print(f"Suggest index built: {len(self.snapshot)} keys in {self.build_ms} ms")
+        if complete:
+            self._retry_delay = SUGGEST_RETRY_MIN_SECONDS
+        else:
+            self._schedule_retry(df)
+
+    def _schedule_retry(self, df):
+        """Rebuild once Mongo answers a ping again, probing with exponential backoff"""
+        if self._retry_task is not None and not self._retry_task.done():
+            return
+
+        async def retry():
+            while True:
+                await asyncio.sleep(self._retry_delay)
+                self._retry_delay = min(self._retry_delay * 2, SUGGEST_RETRY_MAX_SECONDS)
+                if (await database.ping())["ok"]:
+                    self.schedule_rebuild(df)
+                    return
+
+        self._retry_task = asyncio.get_running_loop().create_task(retry(), context=contextvars.Context())
+
+    def schedule_rebuild(self, df):
+        """Rebuild in the background; bursts of catalog changes collapse into one extra rebuild"""
+        if self._task is not None and not self._task.done():
+            self._pending = True
+            return
+
+        async def run():
+            while True:
+                self._pending = False
+                try:
+                    await self.rebuild(df)
+                except Exception as e:
+                    print(f"⚠️ Suggest index rebuild failed: {e}")
+                if not self._pending:
+                    return
+
+        # Fresh context: must not inherit the triggering request's DB deadline
+        self._task = asyncio.get_running_loop().create_task(run(), context=contextvars.Context())
+
+    def stats(self):
+        return {"ready": self.ready, "complete": self.complete, "keys": len(self.snapshot) if self.ready else 0,
+                "built_at": self.built_at, "build_ms": self.build_ms}
+
+
+# Singleton instance
+suggest_index = SuggestIndex()
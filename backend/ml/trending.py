@@ -0,0 +1,271 @@
+import asyncio
+import heapq
+import math
+import os
+import time
+from datetime import datetime, timezone
+
+import database
+from utils.cache import catalog_generation
+from utils.readiness import readiness
+
+# window name -> decay time constant in seconds
+TRENDING_WINDOWS = {"1h": 3600, "24h": 24 * 3600, "7d": 7 * 24 * 3600}
+TRENDING_TOP_K = int(os.getenv("TRENDING_TOP_K", 200))
+TRENDING_CHECKPOINT_SECONDS = float(os.getenv("TRENDING_CHECKPOINT_SECONDS", 60))
+TRENDING_CHECKPOINT_MAX_TITLES = int(os.getenv("TRENDING_CHECKPOINT_MAX_TITLES", 50000))
+# Titles whose decayed score falls below this are forgotten
+TRENDING_MIN_SCORE = 0.01
+# Move the landmark forward before exp() of the oldest window gets large
+REBASE_AFTER_LIFETIMES = 10
+
+
+class TopK:
+    """Top-k keys by score, for scores that only ever increase.
+
+    A min-heap with lazy deletion: a key's heap entry is current only while it
+    matches `members[key]`. Since scores never decrease, a key outside the
+    top-k can only get in by being offered a higher score, so this is exact.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.members = {}
+        self._heap = []
+        self._sorted = None
+
+    def offer(self, key, score):
+        members = self.members
+        if key not in members and len(members) >= self.k:
+            heap = self._heap
+            while members.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)
+            if score <= heap[0][0]:
+                return
+            _, evicted = heapq.heappop(heap)
+            del members[evicted]
+        members[key] = score
+        heapq.heappush(self._heap, (score, key))
+        self._sorted = None
+        if len(self._heap) > 4 * self.k + 64:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._heap = [(score, key) for key, score in self.members.items()]
+        heapq.heapify(self._heap)
+
+    def scale(self, factor, min_score=0.0):
+        """Multiply every score by `factor`, dropping members that end up below `min_score`"""
+        self.members = {key: score * factor for key, score in self.members.items() if score * factor >= min_score}
+        self._rebuild()
+        self._sorted = None
+
+    def top(self, n):
+        if self._sorted is None:
+            self._sorted = sorted(self.members.items(), key=lambda item: item[1], reverse=True)
+        return self._sorted[:n]
+
+    def __len__(self):
+        return len(self.members)
+
+
+class TrendingEngine:
+    """Exponentially decayed view counts per title over several windows.
+
+    Uses forward decay: an event at time t adds exp((t - landmark) / tau) to the
+    title's score, so scores only grow and the ranking never has to be re-sorted
+    as time passes; the current decayed value is score * exp(-(now - landmark) / tau).
+    Each (window, facet) keeps a TopK board, facets being "all", "platform:<name>"
+    and "genre:<name>".
+    """
+
+    def __init__(self, windows=TRENDING_WINDOWS, k=TRENDING_TOP_K):
+        self.windows = windows
+        self.k = k
+        self.landmark = time.time()
+        self.scores = {window: {} for window in windows}  # window -> title -> forward-decayed score
+        self.boards = {window: {} for window in windows}  # window -> facet -> TopK
+        self.platforms = {}  # title -> platforms seen in events
+        self.catalog = {}  # title -> content document
+        self.catalog_generation = None
+        self.events_seen = 0
+        self.last_checkpoint_at = None
+        # Checkpoints replace the saved scores, so none are written until the saved ones were read back
+        self.restored = False
+        self._rebase_after = REBASE_AFTER_LIFETIMES * min(windows.values())
+
+    # --- Updates ---
+    def _facets(self, title):
+        facets = ["all"]
+        doc = self.catalog.get(title)
+        platforms = set(self.platforms.get(title, ()))
+        if doc is not None:
+            if doc.get("platform"):
+                platforms.add(doc["platform"])
+            for genre in str(doc.get("genres") or "").split(","):
+                if genre.strip():
+                    facets.append(f"genre:{genre.strip()}")
+        facets.extend(f"platform:{platform}" for platform in platforms)
+        return facets
+
+    def _add(self, title, window, amount, facets):
+        scores = self.scores[window]
+        score = scores.get(title, 0.0) + amount
+        scores[title] = score
+        boards = self.boards[window]
+        for facet in facets:
+            board = boards.get(facet)
+            if board is None:
+                board = boards[facet] = TopK(self.k)
+            board.offer(title, score)
+
+    def record(self, title, platform=None, timestamp=None, weight=1.0):
+        """Count one view of `title`; `timestamp` is epoch seconds (defaults to now)"""
+        now = time.time()
+        if now - self.landmark > self._rebase_after:
+            self.rebase(now)
+        # Future timestamps would outrank everything for a long time
+        timestamp = now if timestamp is None else min(timestamp, now)
+        if platform and platform not in self.platforms.get(title, ()):
+            self.platforms.setdefault(title, set()).add(platform)
+        facets = self._facets(title)
+        for window, tau in self.windows.items():
+            self._add(title, window, weight * math.exp((timestamp - self.landmark) / tau), facets)
+        self.events_seen += 1
+
+    def record_events(self, docs):
+        """Listener for the watch-event buffer; timestamps are naive UTC datetimes"""
+        for doc in docs:
+            timestamp = doc.get("timestamp")
+            if isinstance(timestamp, datetime):
+                timestamp = timestamp.replace(tzinfo=timezone.utc).timestamp()
+            self.record(doc["title"], doc.get("platform"), timestamp)
+
+    def rebase(self, now=None):
+        """Move the landmark to `now`, rescaling scores and dropping negligible titles"""
+        now = time.time() if now is None else now
+        for window, tau in self.windows.items():
+            factor = math.exp(-(now - self.landmark) / tau)
+            self.scores[window] = {
+                title: score * factor for title, score in self.scores[window].items()
+                if score * factor >= TRENDING_MIN_SCORE
+            }
+            for board in self.boards[window].values():
+                board.scale(factor, TRENDING_MIN_SCORE)
+        self.landmark = now
+
+    def _rebuild_boards(self):
+        self.boards = {window: {} for window in self.windows}
+        for window in self.windows:
+            for title, score in self.scores[window].items():
+                facets = self._facets(title)
+                boards = self.boards[window]
+                for facet in facets:
+                    board = boards.get(facet)
+                    if board is None:
+                        board = boards[facet] = TopK(self.k)
+                    board.offer(title, score)
+
+    # --- Queries ---
+    def top(self, window="24h", platform=None, genre=None, limit=10):
+        """[(title, decayed score)] best first; empty when the window has no activity"""
+        tau = self.windows[window]
+        facet = f"genre:{genre}" if genre else f"platform:{platform}" if platform else "all"
+        board = self.boards[window].get(facet)
+        if board is None:
+            return []
+        decay = math.exp(-(time.time() - self.landmark) / tau)
+        # Both facets requested: walk the genre board and keep the platform's titles
+        candidates = board.top(self.k if genre and platform else limit)
+        results = []
+        for title, score in candidates:
+            value = score * decay
+            if value < TRENDING_MIN_SCORE:
+                break
+            if genre and platform and f"platform:{platform}" not in self._facets(title):
+                continue
+            results.append((title, value))
+            if len(results) == limit:
+                break
+        return results
+
+    def stats(self):
+        return {
+            "events_seen": self.events_seen,
+            "titles": {window: len(scores) for window, scores in self.scores.items()},
+            "boards": {window: len(boards) for window, boards in self.boards.items()},
+            "catalog_titles": len(self.catalog),
+            "last_checkpoint_at": self.last_checkpoint_at,
+        }
+
+    # --- Catalog & persistence ---
+    async def load_catalog(self):
+        if database.content_collection is None:
+            return
+        generation = catalog_generation.current()
+        catalog = {}
+        async for doc in database.content_collection.find():
+            catalog.setdefault(doc.get("title"), doc)
+        self.catalog = catalog
+        self.catalog_generation = generation
+        # Genres/platforms may have changed
+        self._rebuild_boards()
+
+    async def checkpoint(self):
+        if database.db is None or not self.restored:
+            return
+        now = time.time()
+        collection = database.db["trending_state"]
+        for window, tau in self.windows.items():
+            decay = math.exp(-(now - self.landmark) / tau)
+            entries = [(title, score * decay) for title, score in self.scores[window].items()
+                       if score * decay >= TRENDING_MIN_SCORE]
+            if len(entries) > TRENDING_CHECKPOINT_MAX_TITLES:
+                entries = heapq.nlargest(TRENDING_CHECKPOINT_MAX_TITLES, entries, key=lambda entry: entry[1])
+            # A list rather than a sub-document: titles may contain '.' or '$'
+            await collection.replace_one(
+                {"_id": window},
+                {"_id": window, "saved_at": now, "scores": [[title, value] for title, value in entries]},
+                upsert=True
+            )
+        self.last_checkpoint_at = now
+
+    async def restore(self):
+        """Add the last checkpoint (decayed to now) on top of any events already recorded"""
+        if database.db is None:
+            return
+        now = time.time()
+        docs = await database.db["trending_state"].find({"_id": {"$in": list(self.windows)}}).to_list()
+        for doc in docs:
+            window = doc["_id"]
+            tau = self.windows[window]
+            # Checkpointed values are as of saved_at; bring them into the current landmark's frame
+            shift = math.exp((doc["saved_at"] - self.landmark) / tau)
+            for title, value in doc["scores"]:
+                self._add(title, window, value * shift, self._facets(title))
+        self.restored = True
+        if docs:
+            print(f"Trending state restored from checkpoint ({sum(len(d['scores']) for d in docs)} scores).")
+
+    async def warm_up(self):
+        await self.load_catalog()
+        await self.restore()
+
+    async def run(self, interval=TRENDING_CHECKPOINT_SECONDS):
+        """Background loop for the app lifespan: load, restore, then checkpoint periodically (retrying a failed restore first)"""
+        await readiness.track("trending", self.warm_up, critical=False)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not self.restored:
+                    # The boot-time restore failed (Mongo unreachable); checkpoint only once it succeeded
+                    await self.restore()
+                if self.catalog_generation != catalog_generation.current():
+                    await self.load_catalog()
+                await self.checkpoint()
+            except Exception as e:
+                print(f"⚠️ Trending checkpoint failed: {e}")
+
+
+# Singleton instance
+trending_engine = TrendingEngine()
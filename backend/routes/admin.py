@@ -1,18 +1,38 @@
+import asyncio
+import functools
 import os
 import random
+import re
 from datetime import datetime, timedelta
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, status, Body, Header
+from fastapi import APIRouter, HTTPException, Depends, status, Body, Header, Query
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 import database
+from catalog import PLATFORMS, load_catalog
+from utils.cache import cached_response, catalog_generation, response_cache
+from utils.compression import compressed_bodies
+from utils.pagination import InvalidCursor, KeysetPaginator
+from utils.serialization import FastJSONResponse
+from utils.profiler import (PROFILE_HEADER, PROFILER_MAX_SECONDS, PROFILER_MIN_INTERVAL_MS, ProfilerBusy,
+                            request_profiles, sampling_profiler)
 
 import numpy as np
 import pandas as pd # Kept for stats if available
 import math
-from routes.auth import get_current_user # Use same auth as users for now, or separate if needed
+from ml.sketches import sketches, AGGREGATE_HLL_PRECISION, TITLE_HLL_PRECISION
+from routes.ai import chat_context
+from routes.auth import get_current_user, principal_cache # Use same auth as users for now, or separate if needed
 
 router = APIRouter()
 
+STATS_COLUMNS = ["Title", "Year", "IMDb", "Genres", "Type", *PLATFORMS]
+# Sort names -> fields; database.ensure_indexes creates a (field, _id) index for each
+content_pages = KeysetPaginator("content", {
+    "year": "year", "imdb": "imdb", "views": "views", "title": "title", "created_at": "created_at",
+}, catalog=True)
+user_analytics_pages = KeysetPaginator("user_analytics", {"joined_date": "joined_date"})
+
 # Use shared user logic or custom logic
 get_current_admin = get_current_user
 class ContentItem(BaseModel):
@@ -26,7 +46,8 @@ class ContentItem(BaseModel):
 
 # --- Helper ---
 def serialize_doc(doc, doc_id):
-    data = doc.to_dict()
+    # pymongo returns plain dicts; BSON values are encoded by FastJSONResponse
+    data = dict(doc)
     data["_id"] = doc_id
     return data
 
@@ -48,14 +69,15 @@ async def login_admin_mock():
 async def get_all_content(admin: dict = Depends(get_current_admin)):
     if database.content_collection is None: return []
     cursor = database.content_collection.find()
-    return [serialize_doc(doc, str(doc["_id"])) for doc in cursor]
+    return FastJSONResponse([serialize_doc(doc, str(doc["_id"])) async for doc in cursor])
 
 @router.post("/content", status_code=status.HTTP_201_CREATED)
 async def create_content(item: ContentItem, admin: dict = Depends(get_current_admin)):
     if database.content_collection is None: return
     new_item = item.dict()
     new_item["created_at"] = datetime.utcnow()
-    result = database.content_collection.insert_one(new_item)
+    result = await database.content_collection.insert_one(new_item)
+    catalog_generation.bump()
     return {"message": "Content created", "id": str(result.inserted_id)}
 
 @router.put("/content/{item_id}")
@@ -63,9 +85,10 @@ async def update_content(item_id: str, item: ContentItem, admin: dict = Depends(
     if database.content_collection is None: return
     try:
         from bson.objectid import ObjectId
-        database.content_collection.update_one({"_id": ObjectId(item_id)}, {"$set": item.dict()})
+        await database.content_collection.update_one({"_id": ObjectId(item_id)}, {"$set": item.dict()})
     except Exception:
         raise HTTPException(status_code=404, detail="Content not found or update failed")
+    catalog_generation.bump()
     return {"message": "Content updated successfully"}
 
 @router.delete("/content/{item_id}")
@@ -73,7 +96,8 @@ async def delete_content(item_id: str, admin: dict = Depends(get_current_admin))
     if database.content_collection is None: return
     try:
         from bson.objectid import ObjectId
-        database.content_collection.delete_one({"_id": ObjectId(item_id)})
+        await database.content_collection.delete_one({"_id": ObjectId(item_id)})
+        catalog_generation.bump()
     except Exception:
         pass 
     return {"message": "Content deleted successfully"}
@@ -84,16 +108,17 @@ async def delete_content(item_id: str, admin: dict = Depends(get_current_admin))
 async def get_all_users(admin: dict = Depends(get_current_admin)):
     if database.user_collection is None: return []
     cursor = database.user_collection.find().limit(100)
-    return [serialize_doc(doc, str(doc["_id"])) for doc in cursor]
+    return FastJSONResponse([serialize_doc(doc, str(doc["_id"])) async for doc in cursor])
 
 @router.delete("/user/{user_id}")
 async def delete_user(user_id: str, admin: dict = Depends(get_current_admin)):
     if database.user_collection is None: return
     try:
         from bson.objectid import ObjectId
-        database.user_collection.delete_one({"_id": ObjectId(user_id)})
+        await database.user_collection.delete_one({"_id": ObjectId(user_id)})
     except Exception:
         pass
+    principal_cache.invalidate(user_id=user_id)
     return {"message": "User deleted successfully"}
 
 @router.put("/user/{user_id}")
@@ -111,47 +136,50 @@ async def update_user(user_id: str, data: dict = Body(...), admin: dict = Depend
         if not update_data:
             return {"message": "No data to update"}
 
-        result = database.user_analytics_collection.update_one(
+        result = await database.user_analytics_collection.find_one_and_update(
             {"_id": ObjectId(user_id)},
-            {"$set": update_data}
+            {"$set": update_data},
+            projection={"email": 1}
         )
         
-        if result.matched_count == 0:
+        if result is None:
             raise HTTPException(status_code=404, detail="User not found")
+
+        # Status/tier changes must apply to already-issued tokens immediately
+        principal_cache.invalidate(user_id=user_id, email=result.get("email"))
             
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     return {"message": "User updated successfully"}
 
 # --- Dashboard Stats ---
-@router.get("/stats")
-async def get_dashboard_stats(admin: dict = Depends(get_current_admin)):
-    import os
-    import json
-    
-    # Try to use JSON file for heavy stats to avoid costly DB reads on raw data
-    JSON_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "final_df_cleaned.json")
-    
-    df = pd.DataFrame()
-    if os.path.exists(JSON_PATH):
-        try:
-            with open(JSON_PATH, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            df = pd.DataFrame(data)
-        except: pass
-
-    # Sanitize dataframe
+@functools.lru_cache(maxsize=1)
+def _stats_frame():
+    """The main catalog's columns the dashboard uses, loaded once and sanitized"""
+    df = load_catalog(STATS_COLUMNS, sources=["catalog"])
     if not df.empty:
         df['IMDb'] = pd.to_numeric(df['IMDb'], errors='coerce').fillna(0)
         df['Title'] = df['Title'].fillna('Unknown Title')
         df['Genres'] = df['Genres'].fillna('Unknown')
         df['Year'] = pd.to_numeric(df['Year'], errors='coerce').fillna(0)
+    return df
+
+@router.get("/stats")
+async def get_dashboard_stats(admin: dict = Depends(get_current_admin)):
+    # The catalog file covers the heavy stats, avoiding costly DB reads on raw data
+    try:
+        df = await asyncio.to_thread(_stats_frame)
+    except Exception as e:
+        print(f"⚠️ Catalog unavailable for stats: {e}")
+        df = pd.DataFrame()
+
+    if not df.empty:
         total_movies = int(len(df))
     else:
         # Fallback to DB count
         total_movies = 0
         if database.content_collection is not None:
-             total_movies = database.content_collection.count_documents({})
+             total_movies = await database.content_collection.count_documents({})
 
     # Platform counts
     platforms = ["Netflix", "Hulu", "Prime Video", "Disney+"]
@@ -171,35 +199,55 @@ async def get_dashboard_stats(admin: dict = Depends(get_current_admin)):
     else:
         for p in platforms: platform_counts[p] = 0
 
-    # Total Users
+    # Total Users (collection metadata, no scan)
     total_users = 0
     if database.user_collection is not None:
-         total_users = database.user_collection.count_documents({})
+         total_users = await database.user_collection.estimated_document_count()
 
-    userData = [
-        {"name": "New Customer", "value": int(total_users * 0.25)},
-        {"name": "Existing Subscriber's", "value": int(total_users * 0.45)},
-        {"name": "Daily Visitor's", "value": int(total_users * 0.2)},
-        {"name": "Extended Subscriber's", "value": int(total_users * 0.1)}
-    ]
-    
-    # Timeline (Mocked for visual)
+    # Viewer activity from the HyperLogLog sketches fed by /events/watch
+    daily_viewers = sketches.distinct_viewers(days=1)
+    weekly_viewers = sketches.distinct_viewers(days=7)
+    monthly_viewers = sketches.distinct_viewers(days=30)
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=30)
     platform_traffic_timeline = []
-    current_date = start_date
-    total_content_count = sum(platform_counts.values()) or 1
-    factors = {k: v/total_content_count for k, v in platform_counts.items()}
-    
-    while current_date <= end_date:
-        daily_base = np.random.randint(2000, 5000)
-        day_data = {"date": current_date.strftime("%b %d")}
-        for p in platforms:
-            share = factors.get(p, 0.25)
-            noise = np.random.uniform(0.9, 1.1)
-            day_data[p] = int(daily_base * share * noise)
-        platform_traffic_timeline.append(day_data)
-        current_date += timedelta(days=1)
+
+    if monthly_viewers:
+        # Buckets partition the user base: HLL unions are estimates, so clamp at zero
+        userData = [
+            {"name": "Daily Viewers", "value": daily_viewers},
+            {"name": "Weekly Viewers", "value": max(weekly_viewers - daily_viewers, 0)},
+            {"name": "Monthly Viewers", "value": max(monthly_viewers - weekly_viewers, 0)},
+            {"name": "Inactive", "value": max(int(total_users) - monthly_viewers, 0)}
+        ]
+        current_date = start_date
+        while current_date <= end_date:
+            day_data = {"date": current_date.strftime("%b %d")}
+            for p in platforms:
+                day_data[p] = sketches.distinct_viewers(days=1, platform=p, today=current_date.date())
+            platform_traffic_timeline.append(day_data)
+            current_date += timedelta(days=1)
+    else:
+        # No live watch events yet: keep the illustrative split and timeline
+        userData = [
+            {"name": "New Customer", "value": int(total_users * 0.25)},
+            {"name": "Existing Subscriber's", "value": int(total_users * 0.45)},
+            {"name": "Daily Visitor's", "value": int(total_users * 0.2)},
+            {"name": "Extended Subscriber's", "value": int(total_users * 0.1)}
+        ]
+        current_date = start_date
+        total_content_count = sum(platform_counts.values()) or 1
+        factors = {k: v/total_content_count for k, v in platform_counts.items()}
+
+        while current_date <= end_date:
+            daily_base = np.random.randint(2000, 5000)
+            day_data = {"date": current_date.strftime("%b %d")}
+            for p in platforms:
+                share = factors.get(p, 0.25)
+                noise = np.random.uniform(0.9, 1.1)
+                day_data[p] = int(daily_base * share * noise)
+            platform_traffic_timeline.append(day_data)
+            current_date += timedelta(days=1)
 
     # Categories
     categoryData = []
@@ -224,11 +272,22 @@ async def get_dashboard_stats(admin: dict = Depends(get_current_admin)):
                 "trend": trends[i % len(trends)]
             })
 
-    # Top Viewed (From DB or DF)
+    # Top Viewed: Count-Min heavy hitters, else all-time views from the DB
     top_viewed = []
-    if database.content_collection is not None:
+    top_titles = sketches.top_titles(5)
+    if top_titles and database.content_collection is not None:
+        docs = {}
+        async for doc in database.content_collection.find({"title": {"$in": [t["title"] for t in top_titles]}}):
+            docs.setdefault(doc["title"], doc)
+        for entry in top_titles:
+            doc = docs.get(entry["title"])
+            item = serialize_doc(doc, str(doc["_id"])) if doc is not None else {"title": entry["title"]}
+            item["views"] = entry["views"]
+            item["distinct_viewers"] = entry["distinct_viewers"]
+            top_viewed.append(item)
+    elif database.content_collection is not None:
         cursor = database.content_collection.find().sort("views", -1).limit(5)
-        for doc in cursor:
+        async for doc in cursor:
             top_viewed.append(serialize_doc(doc, str(doc["_id"])))
             
     if not top_viewed and not df.empty:
@@ -260,11 +319,12 @@ async def get_dashboard_stats(admin: dict = Depends(get_current_admin)):
     }
 
 @router.get("/ratings")
+@cached_response("admin-ratings", ttl=300)
 async def get_ratings(admin: dict = Depends(get_current_admin)):
     top_rated = []
     if database.content_collection is not None:
         cursor = database.content_collection.find({"imdb": {"$gt": 8.0}}).sort("imdb", -1).limit(10)
-        for doc in cursor:
+        async for doc in cursor:
             item = serialize_doc(doc, str(doc["_id"]))
             if "votes" not in item: item["votes"] = np.random.randint(10000, 2000000)
             top_rated.append(item)
@@ -275,6 +335,64 @@ async def get_ratings(admin: dict = Depends(get_current_admin)):
     ]
     return {"top_rated": top_rated, "upcoming_2025": fake_movies}
 
+@router.get("/cache-stats")
+async def get_cache_stats(admin: dict = Depends(get_current_admin)):
+    """Hit rates and memory usage of the response caches"""
+    return dict(response_cache.stats(), compression=compressed_bodies.stats(), chat_context=chat_context.stats())
+
+@router.get("/sketch-stats")
+async def get_sketch_stats(admin: dict = Depends(get_current_admin)):
+    """Sketch-based viewer cardinalities and heavy hitters, with their error bounds"""
+    platforms = ["Netflix", "Prime Video", "Hulu", "Disney+"]
+    return {
+        "distinct_viewers": {
+            "today": sketches.distinct_viewers(days=1),
+            "7d": sketches.distinct_viewers(days=7),
+            "30d": sketches.distinct_viewers(days=30),
+        },
+        "distinct_viewers_today_by_platform": {p: sketches.distinct_viewers(days=1, platform=p) for p in platforms},
+        "top_titles": sketches.top_titles(10),
+        "top_queries": sketches.top_queries(10),
+        "error": {
+            "viewers_relative_std": round(1.04 / math.sqrt(1 << AGGREGATE_HLL_PRECISION), 4),
+            "title_viewers_relative_std": round(1.04 / math.sqrt(1 << TITLE_HLL_PRECISION), 4),
+            "title_views_overcount_max": int(math.e * sketches.titles.cms.total / sketches.titles.cms.width),
+        },
+        **sketches.stats(),
+    }
+
+@router.get("/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(10, ge=PROFILER_MIN_INTERVAL_MS, le=1000),
+    format: str = Query("collapsed", pattern="^(collapsed|json)$"),
+    include_idle: bool = False,
+    admin: dict = Depends(get_current_admin)
+):
+    """Sample every thread of this worker for `seconds`; collapsed stacks feed flamegraph.pl or speedscope"""
+    try:
+        stacks, samples = await asyncio.to_thread(sampling_profiler.sample, seconds, interval_ms / 1000, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if format == "json":
+        return {"pid": os.getpid(), "seconds": seconds, "samples": samples,
+                "stacks": [{"stack": stack, "count": count} for stack, count in stacks.most_common()]}
+    return PlainTextResponse(sampling_profiler.collapsed(stacks))
+
+@router.get("/profile/requests")
+async def list_request_profiles(admin: dict = Depends(get_current_admin)):
+    """Requests recently profiled through the profile header, newest first"""
+    return {"header": PROFILE_HEADER, "profiles": request_profiles.recent()}
+
+@router.get("/profile/requests/{profile_id}")
+async def get_request_profile(profile_id: str, sort: str = Query("cumulative", pattern="^(cumulative|tottime|ncalls)$"),
+                              admin: dict = Depends(get_current_admin)):
+    """pstats report of one profiled request"""
+    report = request_profiles.report(profile_id, sort)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired")
+    return PlainTextResponse(report)
+
 @router.get("/comments")
 async def get_comments(admin: dict = Depends(get_current_admin)):
     platforms = ["Netflix", "Prime Video", "Hulu", "Disney+"]
@@ -282,7 +400,7 @@ async def get_comments(admin: dict = Depends(get_current_admin)):
     movie_titles = []
     if database.content_collection is not None:
         cursor = database.content_collection.find().limit(20)
-        movie_titles = [doc.get("title") for doc in cursor if doc.get("title")]
+        movie_titles = [doc.get("title") async for doc in cursor if doc.get("title")]
     if not movie_titles: movie_titles = ["Inception", "The Matrix"]
 
     generated = []
@@ -303,7 +421,7 @@ async def get_auth_users(admin: dict = Depends(get_current_admin)):
     users = []
     if database.user_collection is not None:
         cursor = database.user_collection.find().limit(50)
-        for doc in cursor:
+        async for doc in cursor:
             data = serialize_doc(doc, str(doc["_id"]))
             users.append({
                 "id": str(data["_id"]),
@@ -317,6 +435,10 @@ async def get_auth_users(admin: dict = Depends(get_current_admin)):
             })
     return users
 
+def _page_response(result):
+    result["data"] = [serialize_doc(doc, str(doc["_id"])) for doc in result["data"]]
+    return FastJSONResponse(result)
+
 @router.get("/content-list")
 async def get_advanced_content_list(
     sort_by: str = "year", 
@@ -326,35 +448,31 @@ async def get_advanced_content_list(
     page: int = 1,
     limit: int = 20,
     search: str = "",
+    cursor: Optional[str] = None,
     admin: dict = Depends(get_current_admin)
 ):
     if database.content_collection is None: return {"data": [], "total": 0, "page": 1, "pages": 1}
+    if sort_by not in content_pages.sort_fields:
+        raise HTTPException(status_code=400, detail=f"Unknown sort_by '{sort_by}'; use one of {list(content_pages.sort_fields)}")
     
     query = {}
     if type_filter != "all": 
         query["type"] = type_filter
     
     if platform_filter != "all": 
-        query[platform_filter] = 1
+        if platform_filter not in PLATFORMS:
+            raise HTTPException(status_code=400, detail=f"Unknown platform '{platform_filter}'")
+        query["platform"] = platform_filter
         
     if search:
-        # Basic regex search
-        query["title"] = {"$regex": search, "$options": "i"}
-    
-    sort_order = -1 if order == "desc" else 1
-    
-    total = database.content_collection.count_documents(query)
-    
-    cursor = database.content_collection.find(query).sort(sort_by, sort_order).skip((page - 1) * limit).limit(limit)
-    
-    data = [serialize_doc(doc, str(doc["_id"])) for doc in cursor]
+        # Basic regex search (escaped: the term is matched literally)
+        query["title"] = {"$regex": re.escape(search), "$options": "i"}
     
-    return {
-        "data": data,
-        "total": total,
-        "page": page,
-        "pages": math.ceil(total / limit)
-    }
+    try:
+        result = await content_pages.page(database.content_collection, query, sort_by, order, limit, cursor, page)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _page_response(result)
 
 @router.get("/user-analytics")
 async def get_user_analytics(
@@ -363,6 +481,7 @@ async def get_user_analytics(
     category_filter: str = "All Categories",
     page: int = 1,
     limit: int = 20,
+    cursor: Optional[str] = None,
     admin: dict = Depends(get_current_admin)
 ):
     if database.user_analytics_collection is None:
@@ -370,7 +489,7 @@ async def get_user_analytics(
 
     query = {}
     if username:
-        query["username"] = {"$regex": username, "$options": "i"}
+        query["username"] = {"$regex": re.escape(username), "$options": "i"}
     
     if platform_filter != "All Platforms":
         # Check if platform exists in any history item
@@ -380,23 +499,13 @@ async def get_user_analytics(
         # Check if category exists in preferences or history
         query["preferences"] = category_filter
 
-    total = database.user_analytics_collection.count_documents(query)
-    # Sort by joined_date desc by default
-    cursor = database.user_analytics_collection.find(query).sort("joined_date", -1).skip((page - 1) * limit).limit(limit)
-    
-    users = []
-    for doc in cursor:
-        # Custom serialization to be safe
-        user_data = dict(doc)
-        user_data["_id"] = str(user_data["_id"])
-        users.append(user_data)
-        
-    return {
-        "data": users,
-        "total": total,
-        "page": page,
-        "pages": math.ceil(total / limit)
-    }
+    # Sort by joined_date desc
+    try:
+        result = await user_analytics_pages.page(
+            database.user_analytics_collection, query, "joined_date", "desc", limit, cursor, page)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _page_response(result)
 
 @router.get("/platform-traffic")
 async def get_platform_traffic(admin: dict = Depends(get_current_admin)):
@@ -422,12 +531,12 @@ async def get_platform_traffic(admin: dict = Depends(get_current_admin)):
         {"$sort": {"_id.date": 1}}
     ]
 
-    results = database.user_analytics_collection.aggregate(pipeline)
+    results = await database.user_analytics_collection.aggregate(pipeline)
 
     raw_map = {}
     global_max = 0
 
-    for entry in results:
+    async for entry in results:
         date_key = entry["_id"]["date"]
         # Make readable: "2023-11" -> "Nov 23"
         try:
@@ -1,14 +1,26 @@
 import os
 import json
+import time
 from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from pymongo.errors import BulkWriteError
 import database
 from routes.auth import get_current_user
-from groq import Groq
 from dotenv import load_dotenv
-from ml.recommender import get_ai_curated, search_movies_with_ai
+from ml.chat_context import CHAT_CANDIDATES, ChatContextBuilder
+from ml.intent_parser import normalise_query
+from ml.llm import (LLM_PROVIDER, LLM_STREAM_RETRY_AFTER_SECONDS, StreamPoolFull, astream, gemini_provider,
+                    groq_provider, llm_cache, stream_pool)
+from ml.sketches import sketches
+from ml.recommender import engine, get_ai_curated, load_engine, search_movies_with_ai
+from catalog import catalog_version
+from utils.metrics import METRICS_ENABLED, stage, stage_seconds
+from utils.serialization import FastJSONResponse, dumps, preencoded_response
+from utils.write_behind import WriteBehindBuffer
 
 load_dotenv()
 
@@ -17,28 +29,44 @@ router = APIRouter()
 @router.get("/curated")
 async def get_curated_lists():
     """Get AI-curated lists based on data analysis"""
+    await load_engine()
     try:
-        data = get_ai_curated()
-        return data
+        # The curated lists only depend on the in-memory dataset, so encode them once
+        return preencoded_response(("curated",), _curated_lists)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-import google.generativeai as genai
+def _curated_lists():
+    curated = get_ai_curated()
+    if not curated:
+        # Raising keeps the empty result out of the pre-encoded cache, so the next request asks again
+        raise HTTPException(status_code=503, detail="Curated lists are not available yet, try again shortly")
+    return curated
 
 # Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-client = Groq(api_key=GROQ_API_KEY)
-genai.configure(api_key=GOOGLE_API_KEY)
-gemini_model = genai.GenerativeModel("gemini-2.0-flash-exp")
+# Providers create their SDK clients on first use, not at import
+chat_model = gemini_provider("gemini-2.0-flash-exp", GOOGLE_API_KEY)
+recommendations_model = groq_provider("llama3-70b-8192", GROQ_API_KEY, json_mode=True)
+intent_model = gemini_provider("gemini-2.0-flash-exp", GOOGLE_API_KEY)
+
+DUPLICATE_KEY = 11000
+# Keep proxies (nginx and the like) from buffering the event stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Below this local-parser confidence the query is sent to Gemini for intent extraction
+INTENT_MIN_CONFIDENCE = float(os.getenv("INTENT_MIN_CONFIDENCE", 0.6))
 
 class ChatMessage(BaseModel):
     user_email: str
     message: str
     category: Optional[str] = "general"
 
-def get_platform_data():
+async def get_platform_data():
     """Helper to get platform stats for the AI to analyze"""
     if database.content_collection is None: return []
     platforms = ["Netflix", "Hulu", "Prime Video", "Disney+"]
@@ -46,7 +74,7 @@ def get_platform_data():
     for platform in platforms:
         try:
             # MongoDB count_documents
-            count = database.content_collection.count_documents({platform: 1})
+            count = await database.content_collection.count_documents({platform: 1})
         except:
              count = 0 
         stats.append({"name": platform, "value": count})
@@ -62,6 +90,15 @@ def get_trending_shows():
         {"title": "Arcane", "popularity": 94, "interest": 96, "rating": 9.0},
     ]
 
+def parse_json_reply(text: str) -> dict:
+    """The JSON object in a model reply (markdown code fences allowed); raises ValueError otherwise"""
+    # Extract JSON from potential markdown code blocks
+    clean_text = text.replace("```json", "").replace("```", "").strip()
+    value = json.loads(clean_text)
+    if not isinstance(value, dict):
+        raise ValueError("Expected a JSON object")
+    return value
+
 def sanitize_response(text: str) -> str:
     """Removes any mention of AI providers for a white-labeled experience"""
     replacements = {
@@ -78,42 +115,133 @@ def sanitize_response(text: str) -> str:
         text = text.replace(old.lower(), new)
     return text
 
+# --- Chat history write-behind ---
+async def write_chat_history(batch):
+    """Flushes one batch of finished conversations; a retried batch skips docs already stored"""
+    if database.history_collection is None:
+        raise RuntimeError("Database not connected")
+    try:
+        await database.history_collection.insert_many(batch, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if e.details.get("writeConcernErrors") or any(err.get("code") != DUPLICATE_KEY for err in errors):
+            raise
+
+
+# Singleton instance, started and drained by the app lifespan
+chat_history_buffer = WriteBehindBuffer("chat-history", write_chat_history)
+# Singleton instance
+chat_context = ChatContextBuilder(chat_history_buffer)
+
+
+def _wants_stream(http_request: Request, stream: Optional[bool]) -> bool:
+    if stream is not None:
+        return stream
+    return "text/event-stream" in http_request.headers.get("accept", "")
+
+
+def _sse(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+async def _chat_tokens(prompt: str):
+    """Model chunks as they arrive; records time to first token and total generation time"""
+    start = time.perf_counter()
+    first = True
+    async for chunk in astream(chat_model, prompt):
+        if first and METRICS_ENABLED:
+            stage_seconds.observe(("chat.first_token",), time.perf_counter() - start)
+        first = False
+        yield chunk
+    if METRICS_ENABLED:
+        stage_seconds.observe((f"llm.{chat_model.name.split(':')[0]}",), time.perf_counter() - start)
+
+
+def _streams_busy() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many chats in progress, please retry shortly",
+        headers={"Retry-After": str(LLM_STREAM_RETRY_AFTER_SECONDS)},
+    )
+
+
+def _save_chat(user_email: str, message: str, ai_response: str):
+    doc = {
+        "_id": ObjectId(),
+        "user_email": user_email,
+        "user_message": message,
+        "ai_response": ai_response,
+        "timestamp": datetime.utcnow()
+    }
+    if not chat_history_buffer.submit([doc]):
+        print(f"⚠️ Chat history buffer full. Conversation for {user_email} not saved.")
+    chat_context.record_turn(user_email, message, ai_response)
+
+
 @router.post("/chat")
-async def chat_with_ai(request: ChatMessage, current_user: dict = Depends(get_current_user)):
+async def chat_with_ai(
+    request: ChatMessage,
+    http_request: Request,
+    stream: Optional[bool] = Query(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Chat with the assistant.
+
+    With `Accept: text/event-stream` (or `?stream=true`) the reply is sent as
+    server-sent events while the model writes it: `token` events carry each
+    chunk, then `done` the full response (or `error`). Otherwise the whole
+    reply is returned as JSON. The exchange is saved in the background once
+    the reply is complete.
+    """
     user_email = current_user.get("email") or current_user.get("sub")
     
     # The original code used GOOGLE_API_KEY for Gemini.
     # The new code snippet implies GEMINI_API_KEY.
     # For consistency with the provided snippet, we'll use GOOGLE_API_KEY here.
-    if not GOOGLE_API_KEY:
+    if not GOOGLE_API_KEY and LLM_PROVIDER != "fake":
          raise HTTPException(status_code=500, detail="Gemini API Key not configured")
 
-    try:
-        # Construct context
-        context_prompt = ""
-        # Could fetch user preferences from user_collection if needed
-        
-        full_prompt = f"User asked: {request.message}\nContext: You are a movie recommendation assistant..."
-        
-        response = gemini_model.generate_content(full_prompt) # Using gemini_model as defined globally
-        ai_response = response.text
-        
-        # Save to MongoDB
-        if database.history_collection is not None:
-             history_doc = {
-                 "user_email": user_email,
-                 "user_message": request.message,
-                 "ai_response": ai_response,
-                 "timestamp": datetime.utcnow()
-             }
-             database.history_collection.insert_one(history_doc)
-        
-        return {"response": ai_response}
+    # Refuse up front, before any SSE headers are sent, when every stream worker is taken
+    if stream_pool.full():
+        stream_pool.stats["rejected"] += 1
+        raise _streams_busy()
 
+    # Recent turns, preferences and catalog matches, trimmed to the token budget
+    with stage("chat.context"):
+        context = await chat_context.user_context(user_email)
+        await load_engine()
+        candidates = engine.chat_candidates(request.message, context["preferences"], CHAT_CANDIDATES)
+        full_prompt = chat_context.build_prompt(request.message, context, candidates)
+
+    if _wants_stream(http_request, stream):
+        async def events():
+            chunks = []
+            try:
+                async for chunk in _chat_tokens(full_prompt):
+                    chunks.append(chunk)
+                    yield _sse("token", {"text": chunk})
+            except Exception as e:
+                print(f"AI Error: {e}")
+                yield _sse("error", {"detail": str(e)})
+                return
+            ai_response = "".join(chunks)
+            # Only complete replies are saved; a client that disconnects cancels the stream before this
+            _save_chat(user_email, request.message, ai_response)
+            yield _sse("done", {"response": ai_response})
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+    try:
+        ai_response = "".join([chunk async for chunk in _chat_tokens(full_prompt)])
+    except StreamPoolFull:
+        raise _streams_busy()
     except Exception as e:
         print(f"AI Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    _save_chat(user_email, request.message, ai_response)
+    return {"response": ai_response}
+
 @router.get("/history")
 async def get_chat_history(current_user: dict = Depends(get_current_user)):
     user_email = current_user.get("email") # or username, depending on auth.py token
@@ -126,36 +254,46 @@ async def get_chat_history(current_user: dict = Depends(get_current_user)):
 
     # MongoDB Query
     history_cursor = database.history_collection.find({"user_email": user_email}).sort("timestamp", -1).limit(50)
-    history = []
-    for doc in history_cursor:
-        doc["_id"] = str(doc["_id"])
-        history.append(doc)
-    
-    return history
+    history = await history_cursor.to_list()
+
+    # Conversations still waiting in the write-behind buffer; a doc can be both
+    # buffered and stored while its batch is being flushed
+    stored = {doc["_id"] for doc in history}
+    pending = chat_history_buffer.pending(lambda doc: doc["user_email"] == user_email and doc["_id"] not in stored)
+    if pending:
+        history = sorted(pending + history, key=lambda doc: doc["timestamp"], reverse=True)[:50]
+    return FastJSONResponse(history)
 
 @router.get("/recommendations")
 async def get_special_recommendations(category: str = Query(...)):
+    # Normalise so "Sci-Fi", " sci-fi " etc. share one cached generation
+    category = " ".join(category.split()).lower()
     prompt = f"Give me the top analysis and recommendations for category: {category}. Include IMDb ratings and popularity trends. Return as a structured JSON object with text and chartData."
     
     try:
-        completion = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
+        # Keyed on the catalog's content hash: unlike the generation counter it survives restarts
+        return await llm_cache.generate(
+            recommendations_model, prompt,
+            snapshot=f"catalog-{catalog_version()}", topic=f"ai-recommendations:{category}",
+            parse=parse_json_reply
         )
-        return json.loads(completion.choices[0].message.content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/search")
 async def ai_movie_search(q: str = Query(...)):
     """AI-powered movie search with natural language intent extraction"""
+    sketches.record_query(q)
+    await load_engine()
     try:
-        # 1. Use Gemini to extract intent if query is complex
-        intent = None
-        if len(q.split()) > 2: # Only use Gemini for longer queries to save tokens/time
+        # 1. Local parser first; Gemini only for longer queries it could not understand
+        with stage("ai_search.parse_intent"):
+            intent, confidence = engine.parse_intent(q)
+        intent_source = "local"
+        if confidence < INTENT_MIN_CONFIDENCE and len(q.split()) > 2:
+            # Prompt is built from the normalised query, so llm_cache keys on it
             prompt = f"""
-            Analyze this movie search query: "{q}"
+            Analyze this movie search query: "{normalise_query(q)}"
             Extract filters as a JSON object with these keys:
             - year: integer or null
             - platform: string (Netflix, Hulu, Prime Video, Disney+) or null
@@ -167,17 +305,15 @@ async def ai_movie_search(q: str = Query(...)):
             Return ONLY the JSON object.
             """
             try:
-                response = gemini_model.generate_content(prompt)
-                # Extract JSON from potential markdown code blocks
-                clean_text = response.text.replace("```json", "").replace("```", "").strip()
-                intent = json.loads(clean_text)
+                intent = await llm_cache.generate(intent_model, prompt, snapshot="intent-v1", parse=parse_json_reply)
+                intent_source = "llm"
             except Exception as ai_err:
                 print(f"Gemini Intent Extraction Failed: {ai_err}")
-                intent = None # Fallback to regex in recommender
+                # Keep the local intent
         
         # 2. Call recommender logic
         results = search_movies_with_ai(q, intent)
-        return {"query": q, "intent": intent, "results": results}
+        return {"query": q, "intent": intent, "intent_source": intent_source, "confidence": confidence, "results": results}
         
     except Exception as e:
         print(f"Search Error: {e}")
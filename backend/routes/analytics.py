@@ -1,17 +1,27 @@
-import pandas as pd
-import os
+import functools
 from fastapi import APIRouter, Query
 from typing import Optional
 import database
+from utils.serialization import preencoded_response
+from catalog import PLATFORMS, load_catalog
 
 router = APIRouter()
 
-# Load the dataset
-CSV_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "dataset", "final_df_cleaned.csv")
-df = pd.read_csv(CSV_PATH)
+ANALYTICS_COLUMNS = ["Title", "Year", "IMDb", "Genres", *PLATFORMS]
+
+# The dataset is loaded once and never mutated, so every response below is a pure
+# function of its query params and is served from pre-encoded bytes.
+@functools.lru_cache(maxsize=1)
+def load_dataset():
+    """The main catalog's rows, read on first use (or by the startup warm-up)"""
+    return load_catalog(ANALYTICS_COLUMNS, sources=["catalog"])
 
 @router.get('/platform-distribution')
 def get_platform_distribution():
+    return preencoded_response(("analytics", "platform-distribution"), _platform_distribution)
+
+def _platform_distribution():
+    df = load_dataset()
     platforms = ["Netflix", "Hulu", "Prime Video", "Disney+"]
     stats = []
     for platform in platforms:
@@ -21,6 +31,13 @@ def get_platform_distribution():
 
 @router.get('/year-distribution')
 def get_year_distribution(platform: Optional[str] = Query(None)):
+    # Unknown platforms fall back to the full dataset, so they share one cache entry
+    if platform not in ["Netflix", "Hulu", "Prime Video", "Disney+"]:
+        platform = None
+    return preencoded_response(("analytics", "year-distribution", platform), lambda: _year_distribution(platform))
+
+def _year_distribution(platform: Optional[str]):
+    df = load_dataset()
     filtered_df = df
     if platform and platform in ["Netflix", "Hulu", "Prime Video", "Disney+"]:
         filtered_df = df[df[platform] == 1]
@@ -36,6 +53,10 @@ def get_year_distribution(platform: Optional[str] = Query(None)):
 
 @router.get('/genre-popularity')
 def get_genre_popularity():
+    return preencoded_response(("analytics", "genre-popularity"), _genre_popularity)
+
+def _genre_popularity():
+    df = load_dataset()
     # Split genres and explode to count correctly
     genre_df = df.copy()
     genre_df['Genres'] = genre_df['Genres'].fillna('Unknown').str.split(',')
@@ -64,6 +85,10 @@ def get_genre_popularity():
 
 @router.get('/filters')
 def get_filter_options():
+    return preencoded_response(("analytics", "filters"), _filter_options)
+
+def _filter_options():
+    df = load_dataset()
     years = sorted(df['Year'].unique().tolist(), reverse=True)
     platforms = ["Netflix", "Hulu", "Prime Video", "Disney+"]
     return {
@@ -73,6 +98,10 @@ def get_filter_options():
 
 @router.get('/platform-count') # Keep for backward compatibility if needed, but updated
 def platform_count():
+    return preencoded_response(("analytics", "platform-count"), _platform_count)
+
+def _platform_count():
+    df = load_dataset()
     platforms = ["Netflix", "Hulu", "Prime Video", "Disney+"]
     results = []
     for p in platforms:
@@ -6,8 +6,14 @@ import database
 import bcrypt
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+import asyncio
+import contextvars
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from utils.cache import LRUCache
 
 load_dotenv()
 
@@ -20,6 +26,16 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 24 hours
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 300))
+
+# Cost factor for new hashes; stored hashes below it are upgraded on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+# Hashing jobs allowed to wait for a worker before requests are turned away with 429
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 32))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", 1))
+
 # --- Models ---
 class UserSignup(BaseModel):
     username: str
@@ -49,10 +65,87 @@ def get_password_hash(password: str):
     # Hash password using bcrypt
     # bcrypt.gensalt() generates a salt
     # hashpw requires bytes
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8') # Return as string for storage
 
+def needs_rehash(hashed_password: str):
+    # "$2b$12$..." -> cost factor 12
+    try:
+        return int(hashed_password.split("$")[2]) < BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated bounded thread pool instead of the event loop.
+
+    bcrypt releases the GIL while hashing, so the workers run in parallel with the
+    loop. At most `workers + max_queue` jobs are admitted; beyond that callers get
+    a 429 with Retry-After rather than an ever-growing queue.
+    """
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._background = set()
+        # Only touched from the event loop thread
+        self.pending = 0
+        self.stats = {"completed": 0, "rejected": 0, "rehashed": 0}
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many authentication requests, please retry shortly",
+                headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+            )
+        self.pending += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+            self.stats["completed"] += 1
+            return result
+        finally:
+            self.pending -= 1
+
+    async def verify(self, plain_password: str, hashed_password: str):
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str):
+        return await self._run(get_password_hash, password)
+
+    def schedule_rehash(self, user, plain_password: str):
+        """Upgrade a verified user's hash to BCRYPT_ROUNDS without delaying the login"""
+        async def run():
+            try:
+                new_hash = await self.hash(plain_password)
+                # Guarded on the old hash so a concurrent password change wins
+                result = await database.user_collection.update_one(
+                    {"_id": user["_id"], "password": user["password"]},
+                    {"$set": {"password": new_hash}}
+                )
+                if result.modified_count:
+                    self.stats["rehashed"] += 1
+            except HTTPException:
+                pass  # Saturated: try again on a later login
+            except Exception as e:
+                print(f"Password rehash failed: {e}")
+
+        # Fresh context: the update must not inherit the login request's DB deadline
+        task = asyncio.create_task(run(), context=contextvars.Context())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def snapshot(self):
+        return dict(self.stats, workers=self.workers, pending=self.pending, max_pending=self.max_pending)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -63,7 +156,66 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+class PrincipalCache:
+    """Verified token -> resolved user, so warm tokens skip the JWT decode and the Mongo lookup.
+
+    Entries live for at most PRINCIPAL_CACHE_TTL_SECONDS and never past the token's `exp`.
+    Role/status changes call `invalidate`, which rejects every entry for that user
+    resolved before the invalidation.
+    """
+
+    def __init__(self, max_entries=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries = LRUCache(max_entries=max_entries)
+        self._invalidated = {}  # user id / email -> monotonic time of the last invalidation
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        user, exp, resolved_at = entry
+        if exp <= time.time() or self._is_invalidated(user, resolved_at):
+            self._entries.pop(token)
+            return None
+        # Callers may mutate the principal, hand out a copy
+        return dict(user)
+
+    def put(self, token, user, exp, resolved_at):
+        """`resolved_at` is when the DB lookup started, so a concurrent invalidation wins"""
+        ttl = min(self.ttl, exp - time.time())
+        if ttl > 0 and not self._is_invalidated(user, resolved_at):
+            self._entries.set(token, (dict(user), exp, resolved_at), ttl=ttl)
+
+    def _is_invalidated(self, user, resolved_at):
+        for ident in (user.get("_id"), user.get("email")):
+            invalidated_at = self._invalidated.get(ident)
+            if invalidated_at is not None and invalidated_at >= resolved_at:
+                return True
+        return False
+
+    def invalidate(self, user_id=None, email=None):
+        now = time.monotonic()
+        with self._lock:
+            # Markers older than the TTL can no longer match a live entry
+            for ident, invalidated_at in list(self._invalidated.items()):
+                if now - invalidated_at > self.ttl:
+                    del self._invalidated[ident]
+            for ident in (user_id, email):
+                if ident:
+                    self._invalidated[ident] = now
+
+    def clear(self):
+        self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
+    user = principal_cache.get(token)
+    if user is not None:
+        return user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -75,17 +227,21 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         if email is None:
             raise credentials_exception
         token_data = TokenData(email=email)
+        exp = payload.get("exp")
     except JWTError:
         raise credentials_exception
     
     if database.user_collection is None:
          raise HTTPException(status_code=500, detail="Database not connected")
 
-    user = database.user_collection.find_one({"email": token_data.email})
+    resolved_at = time.monotonic()
+    user = await database.user_collection.find_one({"email": token_data.email})
     if user is None:
         raise credentials_exception
     
     user["_id"] = str(user["_id"])
+    if exp is not None:
+        principal_cache.put(token, user, float(exp), resolved_at)
     return user
 
 # --- Routes ---
@@ -96,15 +252,17 @@ async def signup(user: UserSignup):
         raise HTTPException(status_code=500, detail="Database connection error")
 
     # Check if user exists
-    if database.user_collection.find_one({"email": user.email}):
+    if await database.user_collection.find_one({"email": user.email}):
         raise HTTPException(status_code=400, detail="Email already registered")
         
-    if database.user_collection.find_one({"username": user.username}):
+    if await database.user_collection.find_one({"username": user.username}):
         raise HTTPException(status_code=400, detail="Username already taken")
     
     # Hash password
     try:
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await password_hasher.hash(user.password)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error hashing password: {e}")
         raise HTTPException(status_code=500, detail="Internal server error processing password")
@@ -117,7 +275,7 @@ async def signup(user: UserSignup):
         "role": "user"
     }
     
-    result = database.user_collection.insert_one(new_user)
+    result = await database.user_collection.insert_one(new_user)
     
     # Create Token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -134,18 +292,21 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         raise HTTPException(status_code=500, detail="Database connection error")
 
     # Allow login with either email or username
-    user = database.user_collection.find_one({
+    user = await database.user_collection.find_one({
         "$or": [
             {"email": form_data.username},
             {"username": form_data.username}
         ]
     })
-    if not user or not verify_password(form_data.password, user["password"]):
+    if not user or not await password_hasher.verify(form_data.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    if needs_rehash(user["password"]):
+        password_hasher.schedule_rehash(user, form_data.password)
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -1,7 +1,9 @@
 import os
-import google.generativeai as genai
 from fastapi import APIRouter, HTTPException
 import database
+from ml.llm import gemini_provider, llm_cache
+from catalog import catalog_version
+from utils.cache import cached_response
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,17 +12,19 @@ router = APIRouter()
 
 # Configure Gemini
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-pro")
+model = gemini_provider("gemini-pro", GEMINI_API_KEY)
 
 @router.get("/overview")
+# Short TTL: the expensive part (the report text) is memoised per data snapshot
+# by llm_cache, this only bounds how often the Mongo summary is recomputed.
+@cached_response("analysis-overview", ttl=60)
 async def get_dataset_analytics():
     try:
         if database.content_collection is None:
              raise Exception("Database connection not established")
 
         # 1. Total Count
-        total_count = database.content_collection.count_documents({})
+        total_count = await database.content_collection.count_documents({})
         
         # 2. Platform Distribution (Aggregation)
         pipeline = [
@@ -36,7 +40,7 @@ async def get_dataset_analytics():
         
         platforms = []
         try:
-            agg_result = list(database.content_collection.aggregate(pipeline))
+            agg_result = await (await database.content_collection.aggregate(pipeline)).to_list()
             if agg_result:
                 res = agg_result[0]
                 for key in ["Netflix", "Hulu", "Prime Video", "Disney+"]:
@@ -46,27 +50,23 @@ async def get_dataset_analytics():
              pass
 
         # 3. Top Genres
-        # Assuming genres is a string "Action, Drama" -> split and count
-        # In Mongo 4.2+ we can use $split, but python side on sample is safer if schema varies
-        
-        # Efficient Sample for Text Analysis
-        cursor = database.content_collection.aggregate([{"$sample": {"size": 500}}])
-        data_sample = list(cursor)
-        
-        genre_counts = {}
-        for item in data_sample:
-            g_str = item.get("genres", "")
-            if g_str and isinstance(g_str, str):
-                g_list = [x.strip() for x in g_str.split(",")]
-                for g in g_list:
-                     genre_counts[g] = genre_counts.get(g, 0) + 1
-        
-        sorted_genres = sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        genres = [{"_id": k, "count": v} for k, v in sorted_genres]
+        # Genres are stored as "Action, Drama"; only string values are split so mixed schemas are skipped.
+        # Exact counts (instead of a $sample) keep the prompt deterministic, so its cache key only
+        # changes when the data does.
+        genre_pipeline = [
+            {"$match": {"genres": {"$type": "string"}}},
+            {"$project": {"genre": {"$split": ["$genres", ","]}}},
+            {"$unwind": "$genre"},
+            {"$group": {"_id": {"$trim": {"input": "$genre"}}, "count": {"$sum": 1}}},
+            {"$match": {"_id": {"$ne": ""}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": 10}
+        ]
+        genres = await (await database.content_collection.aggregate(genre_pipeline)).to_list()
 
         # 4. Top Rated
-        top_rated_cursor = database.content_collection.find().sort("imdb", -1).limit(10)
-        top_rated_clean = [{"title": x.get("title"), "imdb": x.get("imdb"), "platform": x.get("platform")} for x in top_rated_cursor]
+        top_rated_cursor = database.content_collection.find().sort([("imdb", -1), ("_id", 1)]).limit(10)
+        top_rated_clean = [{"title": x.get("title"), "imdb": x.get("imdb"), "platform": x.get("platform")} async for x in top_rated_cursor]
 
         # Build prompt for Gemini
         prompt = f"""
@@ -74,7 +74,7 @@ async def get_dataset_analytics():
         
         - Total Movies: {total_count}
         - Platform Distribution: {platforms}
-        - Top 10 Genres (Sampled): {genres}
+        - Top 10 Genres: {genres}
         - Top 10 Rated Movies: {top_rated_clean}
         
         Provide a comprehensive analysis including:
@@ -86,7 +86,10 @@ async def get_dataset_analytics():
         Keep the analysis professional, insightful, and formatted for a report.
         """
         
-        response = model.generate_content(prompt)
+        # Keyed on the catalog's content hash like /ai/recommendations: unlike the generation counter it survives restarts
+        analysis = await llm_cache.generate(
+            model, prompt, snapshot=f"catalog-{catalog_version()}", topic="analysis-overview"
+        )
         
         return {
             "metadata": {
@@ -94,7 +97,7 @@ async def get_dataset_analytics():
                 "platforms": platforms,
                 "top_rated_sample": top_rated_clean
             },
-            "analysis": response.text
+            "analysis": analysis
         }
     except Exception as e:
         print(f"Analysis Error: {e}")
@@ -0,0 +1,196 @@
+import hmac
+import math
+import os
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Optional, Union
+
+from bson import ObjectId
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer
+from pydantic import BaseModel, Field
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from dotenv import load_dotenv
+
+import database
+from ml.sketches import sketches
+from ml.trending import trending_engine
+from routes.auth import get_current_user
+from utils.rate_limit import RateLimiter
+from utils.write_behind import WriteBehindBuffer
+
+load_dotenv()
+
+router = APIRouter()
+
+# --- Config ---
+# Trusted ingesters (other services) send it as X-Ingest-Key; they are not rate limited
+EVENTS_INGEST_KEY = os.getenv("EVENTS_INGEST_KEY", "")
+# Everyone else needs a user token, unless anonymous ingest is explicitly turned on
+EVENTS_ALLOW_ANONYMOUS = os.getenv("EVENTS_ALLOW_ANONYMOUS", "0") == "1"
+EVENTS_MAX_REQUEST_BATCH = int(os.getenv("EVENTS_MAX_REQUEST_BATCH", 1000))
+EVENTS_RETRY_AFTER_SECONDS = int(os.getenv("EVENTS_RETRY_AFTER_SECONDS", 1))
+# Per-client token bucket, counted in events: sustained rate and burst
+EVENTS_RATE_PER_SECOND = float(os.getenv("EVENTS_RATE_PER_SECOND", 20))
+EVENTS_RATE_BURST = int(os.getenv("EVENTS_RATE_BURST", 1000))
+
+DUPLICATE_KEY = 11000
+
+
+# --- Models ---
+class WatchEvent(BaseModel):
+    title: str
+    platform: Optional[str] = None
+    user_email: Optional[str] = None
+    duration_mins: float = Field(0, ge=0, le=24 * 60)
+    timestamp: Optional[datetime] = None
+
+
+def _as_utc(timestamp: Optional[datetime], default: datetime):
+    # Stored naive-UTC like the rest of the collections
+    if timestamp is None:
+        return default
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+# --- Write-behind ---
+async def write_watch_events(batch):
+    """Flushes one batch: raw events, per-title view counters and per-user summaries.
+
+    Event ids are assigned at ingest, so a retried batch skips events the failed
+    attempt already stored. Counters are at-least-once.
+    """
+    if database.watch_events_collection is None:
+        raise RuntimeError("Database not connected")
+
+    try:
+        await database.watch_events_collection.insert_many(batch, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if e.details.get("writeConcernErrors") or any(err.get("code") != DUPLICATE_KEY for err in errors):
+            raise
+
+    # Aggregate in memory so each title/user costs one update per batch
+    views = Counter((doc["title"], doc["platform"]) for doc in batch)
+    summaries = {}
+    for doc in batch:
+        if not doc["user_email"]:
+            continue
+        summary = summaries.setdefault(doc["user_email"], {"mins": 0.0, "events": 0, "last": doc["timestamp"]})
+        summary["mins"] += doc["duration_mins"]
+        summary["events"] += 1
+        summary["last"] = max(summary["last"], doc["timestamp"])
+
+    content_ops = [
+        UpdateOne({"title": title, **({"platform": platform} if platform else {})}, {"$inc": {"views": count}})
+        for (title, platform), count in views.items()
+    ]
+    await database.content_collection.bulk_write(content_ops, ordered=False)
+
+    if summaries:
+        user_ops = [
+            UpdateOne(
+                {"email": email},
+                {
+                    "$inc": {"total_watch_time_mins": summary["mins"], "watch_event_count": summary["events"]},
+                    "$max": {"last_watched_at": summary["last"]},
+                }
+            )
+            for email, summary in summaries.items()
+        ]
+        await database.user_analytics_collection.bulk_write(user_ops, ordered=False)
+
+
+# Singleton instance, started and drained by the app lifespan
+watch_event_buffer = WriteBehindBuffer("watch-events", write_watch_events)
+watch_event_buffer.subscribe(trending_engine.record_events)
+watch_event_buffer.subscribe(sketches.record_events)
+
+
+# --- Auth & rate limiting ---
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+
+# Singleton instance
+ingest_rate_limiter = RateLimiter(EVENTS_RATE_PER_SECOND, EVENTS_RATE_BURST)
+
+
+class IngestClient(BaseModel):
+    id: str
+    # Set for user-token callers: their events are recorded as theirs
+    user_email: Optional[str] = None
+    trusted: bool = False
+
+
+async def get_ingest_client(
+    request: Request,
+    x_ingest_key: Optional[str] = Header(None),
+    token: Optional[str] = Depends(optional_oauth2_scheme)
+) -> IngestClient:
+    """Who is sending events: the ingest key, a signed-in user, or (when allowed) an anonymous address"""
+    if x_ingest_key is not None:
+        if not EVENTS_INGEST_KEY or not hmac.compare_digest(x_ingest_key, EVENTS_INGEST_KEY):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid ingest key")
+        return IngestClient(id="ingest-key", trusted=True)
+    if token:
+        user = await get_current_user(token)
+        email = user.get("email") or user.get("sub")
+        return IngestClient(id=f"user:{email}", user_email=email)
+    if EVENTS_ALLOW_ANONYMOUS:
+        return IngestClient(id=f"ip:{request.client.host if request.client else 'unknown'}")
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Sign in or send X-Ingest-Key to record watch events",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+# --- Routes ---
+@router.post("/watch", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_watch_events(
+    payload: Union[List[WatchEvent], WatchEvent] = Body(...),
+    client: IngestClient = Depends(get_ingest_client)
+):
+    """Accepts one event or a list of events; they are written to Mongo in the background"""
+    events = payload if isinstance(payload, list) else [payload]
+    if len(events) > EVENTS_MAX_REQUEST_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {EVENTS_MAX_REQUEST_BATCH} events per request"
+        )
+
+    if not client.trusted:
+        wait = ingest_rate_limiter.acquire(client.id, min(len(events), ingest_rate_limiter.burst))
+        if wait:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many watch events, please slow down",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+    now = datetime.utcnow()
+    docs = [{
+        "_id": ObjectId(),
+        "title": event.title,
+        "platform": event.platform,
+        "user_email": client.user_email or event.user_email,
+        "duration_mins": event.duration_mins,
+        "timestamp": _as_utc(event.timestamp, now),
+        "received_at": now,
+    } for event in events]
+
+    if not watch_event_buffer.submit(docs):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Event buffer is full, please retry shortly",
+            headers={"Retry-After": str(EVENTS_RETRY_AFTER_SECONDS)},
+        )
+    return {"accepted": len(docs)}
+
+
+@router.get("/stats")
+async def get_event_stats(current_user: dict = Depends(get_current_user)):
+    """Buffer depth and flush counters of the ingestion pipeline"""
+    return dict(watch_event_buffer.snapshot(), rate_limit=ingest_rate_limiter.stats())
@@ -1,25 +1,51 @@
+from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Query
-from ml.recommender import get_recommendations
+from ml.recommender import get_recommendations, load_engine
 import database
+from utils.cache import cached_response
 
 router = APIRouter()
 
 @router.get("/")
+@cached_response("recommend", ttl=3600)
 async def recommend_movies(
     title: str = Query(..., description="The title of the movie to get recommendations for"),
-    limit: int = Query(10, description="Number of recommendations to return")
+    limit: int = Query(10, description="Number of recommendations to return"),
+    w_genre: Optional[float] = Query(None, ge=0, description="Override the genre feature weight (default 0.40)"),
+    w_imdb: Optional[float] = Query(None, ge=0, description="Override the IMDb feature weight (default 0.30)"),
+    w_platform: Optional[float] = Query(None, ge=0, description="Override the platform feature weight (default 0.20)"),
+    w_year: Optional[float] = Query(None, ge=0, description="Override the year feature weight (default 0.10)"),
+    platform: Optional[str] = Query(None, description="Only titles on this platform (comma-separated for any of several)"),
+    year_from: Optional[int] = Query(None, description="Only titles released in or after this year"),
+    year_to: Optional[int] = Query(None, description="Only titles released in or before this year"),
+    content_type: Optional[str] = Query(None, alias="type", description="movie or tv show"),
+    min_imdb: Optional[float] = Query(None, ge=0, le=10, description="Minimum IMDb rating"),
+    exclude: Optional[List[str]] = Query(None, description="Titles to leave out (repeatable)"),
+    mmr_lambda: Optional[float] = Query(None, ge=0, le=1, description="Diversify with MMR: 1 = pure similarity, lower = more varied")
 ):
     """
     Endpoint to get movie recommendations based on a given title.
     """
+    weights = {"genre": w_genre, "imdb": w_imdb, "platform": w_platform, "year": w_year}
+    # Requests that arrive during the startup warm-up wait for it off the event loop
+    await load_engine()
     try:
-        results = get_recommendations(title, limit=limit)
+        constraints = {
+            "platform": platform, "year_from": year_from, "year_to": year_to,
+            "content_type": content_type, "min_imdb": min_imdb,
+        }
+        results = get_recommendations(title, limit=limit, weights=weights, constraints=constraints, exclude=exclude,
+                                      mmr_lambda=mmr_lambda)
         
         if not results:
             # Check if dataset is loaded at all
             from ml.recommender import engine
             if engine.df is None or engine.df.empty:
                 return {"error": "Dataset is not loaded. No recommendations possible."}
+
+            # Known title, but nothing meets the constraints
+            if engine.find_title(title) is not None:
+                return []
             
             # Fallback if title not found
             raise HTTPException(status_code=404, detail=f"Title '{title}' not found in our dataset.")
@@ -28,5 +54,7 @@ async def recommend_movies(
 
     except HTTPException as he:
         raise he
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
@@ -1,13 +1,30 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 import database
+from ml.recommender import engine
+from ml.sketches import sketches
+from ml.suggest import suggest_index, SUGGEST_TOP_K
+from utils.cache import catalog_generation
+from utils.serialization import FastJSONResponse
 
 router = APIRouter()
 
+def rebuild_suggestions(generation=None):
+    """Catalog-generation listener (and startup hook): refresh the typeahead index"""
+    suggest_index.schedule_rebuild(engine.df)
+
+catalog_generation.subscribe(rebuild_suggestions)
+
 @router.get('/')
-def search_item(query: str):
+async def search_item(query: str):
+    sketches.record_query(query)
     if database.content_collection is None:
         return {"results": [], "error": "Database not connected"}
-    results = list(database.content_collection.find({
+    results = await database.content_collection.find({
         "title": {"$regex": query, "$options": "i"}
-    }))
-    return {"results": results}
+    }).to_list()
+    return FastJSONResponse({"results": results})
+
+@router.get('/suggest')
+async def suggest(q: str = Query(..., max_length=100), limit: int = Query(SUGGEST_TOP_K, ge=1, le=25)):
+    """Typeahead completions over titles, directors and genres, most popular first"""
+    return {"query": q, "suggestions": suggest_index.suggest(q, limit), "ready": suggest_index.ready}
@@ -1,11 +1,43 @@
-from fastapi import APIRouter
+import re
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
 import database
+from ml.trending import trending_engine, TRENDING_WINDOWS
+from utils.cache import cached_response
+from utils.serialization import FastJSONResponse
 
 router = APIRouter()
 
 @router.get('/')
-def trending_items():
+async def trending_items(
+    window: str = Query("24h", description="Decay window: 1h, 24h or 7d"),
+    platform: Optional[str] = None,
+    genre: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100)
+):
+    if window not in TRENDING_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {', '.join(TRENDING_WINDOWS)}")
+
+    ranked = trending_engine.top(window, platform=platform, genre=genre, limit=limit)
+    if ranked:
+        items = [
+            dict(trending_engine.catalog.get(title) or {"title": title}, trend_score=round(score, 3))
+            for title, score in ranked
+        ]
+        return FastJSONResponse({"trending": items, "window": window, "source": "live"})
+
+    # No recent watch events (e.g. fresh deployment): fall back to all-time views
+    return await all_time_trending(platform=platform, genre=genre, limit=limit)
+
+@cached_response("trending", ttl=60)
+async def all_time_trending(platform: Optional[str] = None, genre: Optional[str] = None, limit: int = 10):
     if database.content_collection is None:
         return {"trending": [], "error": "Database not connected"}
-    items = list(database.content_collection.find().sort("views", -1).limit(10))
-    return {"trending": items}
+    query = {}
+    if platform:
+        query["platform"] = platform
+    if genre:
+        query["genres"] = {"$regex": re.escape(genre), "$options": "i"}
+    items = await database.content_collection.find(query).sort("views", -1).limit(limit).to_list()
+    return FastJSONResponse({"trending": items, "source": "all-time"})
@@ -1,4 +1,4 @@
-from database import user_collection
+from database import connect_sync
 from routes.auth import get_password_hash
 from datetime import datetime
 import pymongo
@@ -14,9 +14,7 @@ def seed_admin():
     admin_email = "admin@example.com"
     admin_password = "admin@123"
     
-    if user_collection is None:
-        print("❌ Database connection failed.")
-        return
+    user_collection = connect_sync()["users"]
 
     # Check if exists
     if user_collection.find_one({"username": admin_username}):
@@ -1,7 +1,9 @@
 import json
-from database import user_analytics_collection, client
+from database import connect_sync
 
 def seed_data():
+    db = connect_sync()
+    user_analytics_collection = db["user_analytics_data"]
     try:
         with open("new_data.json", "r") as f:
             data = json.load(f)
@@ -18,8 +20,7 @@ def seed_data():
     except Exception as e:
         print(f"❌ Error seeding data: {e}")
     finally:
-        if client:
-            client.close()
+        db.client.close()
 
 if __name__ == "__main__":
     seed_data()
@@ -0,0 +1,308 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from fastapi.responses import Response
+
+from utils.serialization import dumps, preencoded_cache
+
+# --- Config ---
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", 4 * 1024 * 1024))
+# "local" enables the in-process stand-in for the shared tier
+RESPONSE_CACHE_SHARED = os.getenv("RESPONSE_CACHE_SHARED", "")
+GENERATION_REFRESH_SECONDS = 1.0
+
+
+class LRUCache:
+    """Thread-safe LRU with optional per-entry TTL, bounded by entry count and/or total size"""
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (value, expires_at, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.bytes -= size
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None, size=1):
+        """Store value; returns False when a single entry is larger than the whole cache"""
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._data[key] = (value, expires_at, size)
+            self.bytes += size
+            while self._data and (
+                (self.max_entries is not None and len(self._data) > self.max_entries) or
+                (self.max_bytes is not None and self.bytes > self.max_bytes)
+            ):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+        return True
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            self.bytes -= entry[2]
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+# --- Shared tier ---
+class SharedCacheBackend(ABC):
+    """Interface for a cache shared between workers (Redis, memcached, ...)"""
+
+    @abstractmethod
+    def get(self, key):
+        ...
+
+    @abstractmethod
+    def set(self, key, value: bytes, ttl=None):
+        ...
+
+    @abstractmethod
+    def incr(self, key, amount=1) -> int:
+        ...
+
+
+class LocalSharedBackend(SharedCacheBackend):
+    """In-process stand-in for the shared tier, used for local runs and benchmarks"""
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self._values = LRUCache(max_bytes=max_bytes)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._values.get(key)
+
+    def set(self, key, value, ttl=None):
+        self._values.set(key, value, ttl=ttl, size=len(value))
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            return self._counters[key]
+
+
+# --- Catalog generation ---
+class CatalogGeneration:
+    """Monotonic counter bumped by admin writes; part of every response cache key.
+
+    Bumping makes all previously cached responses unreachable, they then age out of the LRU.
+    """
+    KEY = "catalog:generation"
+
+    def __init__(self):
+        self._value = 0
+        self._checked_at = 0.0
+        self._listeners = []
+        self.backend = None
+
+    def current(self) -> int:
+        if self.backend is not None and time.monotonic() - self._checked_at > GENERATION_REFRESH_SECONDS:
+            # Pick up bumps made by other workers
+            self._value = self.backend.incr(self.KEY, 0)
+            self._checked_at = time.monotonic()
+        return self._value
+
+    def bump(self) -> int:
+        if self.backend is not None:
+            self._value = self.backend.incr(self.KEY)
+            self._checked_at = time.monotonic()
+        else:
+            self._value += 1
+        for listener in self._listeners:
+            try:
+                listener(self._value)
+            except Exception as e:
+                print(f"Catalog generation listener failed: {e}")
+        return self._value
+
+    def subscribe(self, listener):
+        """Call `listener(generation)` after every local bump"""
+        self._listeners.append(listener)
+
+
+catalog_generation = CatalogGeneration()
+
+
+# --- Response cache ---
+class ResponseCache:
+    """Two-tier cache of encoded JSON bodies: in-process LRU, then the optional shared tier"""
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES, max_entry_bytes=RESPONSE_CACHE_MAX_ENTRY_BYTES):
+        self.local = LRUCache(max_bytes=max_bytes)
+        self.max_entry_bytes = max_entry_bytes
+        self.shared = None
+        self._counters = {}  # namespace -> {"hits": .., "shared_hits": .., "misses": .., "stores": ..}
+
+    def configure_shared(self, backend: SharedCacheBackend):
+        self.shared = backend
+        catalog_generation.backend = backend
+
+    def _count(self, namespace, field):
+        counters = self._counters.get(namespace)
+        if counters is None:
+            counters = self._counters.setdefault(namespace, {"hits": 0, "shared_hits": 0, "misses": 0, "stores": 0})
+        counters[field] += 1
+
+    def get(self, namespace, key, ttl):
+        body = self.local.get(key)
+        if body is not None:
+            self._count(namespace, "hits")
+            return body
+        if self.shared is not None:
+            try:
+                body = self.shared.get(key)
+            except Exception as e:
+                print(f"Shared cache read failed: {e}")
+                body = None
+            if body is not None:
+                self._count(namespace, "shared_hits")
+                self.local.set(key, body, ttl=ttl, size=len(body))
+                return body
+        self._count(namespace, "misses")
+        return None
+
+    def set(self, namespace, key, body: bytes, ttl):
+        if len(body) > self.max_entry_bytes:
+            return
+        self._count(namespace, "stores")
+        self.local.set(key, body, ttl=ttl, size=len(body))
+        if self.shared is not None:
+            try:
+                self.shared.set(key, body, ttl=ttl)
+            except Exception as e:
+                print(f"Shared cache write failed: {e}")
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        routes = {}
+        for namespace, counters in self._counters.items():
+            lookups = counters["hits"] + counters["shared_hits"] + counters["misses"]
+            hit_rate = (counters["hits"] + counters["shared_hits"]) / lookups if lookups else 0.0
+            routes[namespace] = dict(counters, hit_rate=round(hit_rate, 4))
+        return {
+            "generation": catalog_generation.current(),
+            "entries": len(self.local),
+            "bytes": self.local.bytes,
+            "max_bytes": self.local.max_bytes,
+            "evictions": self.local.evictions,
+            "shared_tier": type(self.shared).__name__ if self.shared is not None else None,
+            "routes": routes,
+            "preencoded": preencoded_cache.stats(),
+        }
+
+
+# Singleton instance
+response_cache = ResponseCache()
+
+if RESPONSE_CACHE_SHARED == "local":
+    response_cache.configure_shared(LocalSharedBackend())
+elif RESPONSE_CACHE_SHARED:
+    print(f"⚠️ Unknown RESPONSE_CACHE_SHARED backend '{RESPONSE_CACHE_SHARED}', using local cache only.")
+
+
+def _normalise(value):
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(_normalise(v)) for v in value)
+    return value
+
+
+def _json_response(body: bytes, status: str):
+    return Response(content=body, media_type="application/json", headers={"X-Cache": status})
+
+
+def _encode_result(result):
+    """Encoded body for a cacheable route result, or None if it should not be cached"""
+    if isinstance(result, Response):
+        if result.status_code != 200 or not (result.media_type or "").startswith("application/json"):
+            return None
+        return result.body
+    # Routes report soft failures (e.g. database not connected) as {"error": ...}
+    if isinstance(result, dict) and "error" in result:
+        return None
+    return dumps(result)
+
+
+def cached_response(namespace: str, ttl: float, exclude=("admin", "current_user", "request")):
+    """Cache a route's JSON response keyed by its normalised query/path params.
+
+    Dependencies listed in `exclude` (auth principals, the request) still run on
+    every call but are left out of the key. Keys include the catalog generation,
+    so admin writes invalidate everything at once.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def make_key(args, kwargs):
+            bound = signature.bind_partial(*args, **kwargs)
+            params = sorted(
+                (name, _normalise(value)) for name, value in bound.arguments.items()
+                if name not in exclude and value is not None
+            )
+            return f"{namespace}:{catalog_generation.current()}:{urlencode(params)}"
+
+        def store(key, result):
+            body = _encode_result(result)
+            if body is None:
+                return result
+            response_cache.set(namespace, key, body, ttl)
+            return _json_response(body, "MISS")
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                body = response_cache.get(namespace, key, ttl)
+                if body is not None:
+                    return _json_response(body, "HIT")
+                return store(key, await func(*args, **kwargs))
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                body = response_cache.get(namespace, key, ttl)
+                if body is not None:
+                    return _json_response(body, "HIT")
+                return store(key, func(*args, **kwargs))
+
+        return wrapper
+    return decorator
@@ -0,0 +1,207 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import threading
+
+from utils.cache import LRUCache, catalog_generation
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Smaller bodies are sent as they are; compressing them saves less than the headers cost
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+COMPRESSION_CACHE_MAX_BYTES = int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+# Larger bodies are compressed in a worker thread instead of on the event loop
+COMPRESSION_THREAD_MIN_BYTES = 256 * 1024
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+# Never buffered: each event has to reach the client as soon as it is written
+STREAMING_TYPES = ("text/event-stream",)
+
+
+def _gzip(body):
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+# Server preference when the client accepts several equally
+ENCODERS = {}
+if brotli is not None:
+    ENCODERS["br"] = lambda body: brotli.compress(body, quality=5)
+if zstandard is not None:
+    _zstd = threading.local()
+
+    def _zstd_compress(body):
+        # ZstdCompressor is not thread-safe; sync routes run in the threadpool
+        compressor = getattr(_zstd, "compressor", None)
+        if compressor is None:
+            compressor = _zstd.compressor = zstandard.ZstdCompressor(level=6)
+        return compressor.compress(body)
+
+    ENCODERS["zstd"] = _zstd_compress
+ENCODERS["gzip"] = _gzip
+
+
+def negotiate(accept_encoding: str):
+    """The preferred encoding in ENCODERS the client accepts (q > 0), else None"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            accepted[name] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODERS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _etag_matches(if_none_match: str, digest: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2); our tags differ per encoding only by suffix
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"').split("-")[0] == digest:
+            return True
+    return False
+
+
+class CompressedBodies:
+    """Compressed variants of response bodies, keyed by (content digest, encoding).
+
+    A digest names exact bytes, so an entry can never be stale; a catalog
+    generation bump clears the cache anyway, since the variants of the
+    catalog-derived payloads it replaces will not be asked for again.
+    """
+
+    def __init__(self, max_bytes=COMPRESSION_CACHE_MAX_BYTES):
+        self._cache = LRUCache(max_bytes=max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.not_modified = 0
+        catalog_generation.subscribe(lambda generation: self._cache.clear())
+
+    async def get(self, digest, encoding, body) -> bytes:
+        key = (digest, encoding)
+        compressed = self._cache.get(key)
+        if compressed is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            if len(body) >= COMPRESSION_THREAD_MIN_BYTES:
+                compressed = await asyncio.to_thread(ENCODERS[encoding], body)
+            else:
+                compressed = ENCODERS[encoding](body)
+            self._cache.set(key, compressed, size=len(compressed))
+        self.bytes_in += len(body)
+        self.bytes_out += len(compressed)
+        return compressed
+
+    def stats(self):
+        return {
+            "encodings": list(ENCODERS),
+            "entries": len(self._cache),
+            "bytes": self._cache.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+        }
+
+
+# Singleton instance
+compressed_bodies = CompressedBodies()
+
+
+class HTTPCacheMiddleware:
+    """Strong ETags, If-None-Match -> 304 and negotiated compression for GET responses.
+
+    Only complete 200 responses with a JSON/text body are touched: the body
+    is buffered, hashed (the ETag) and, when the client's tag matches,
+    replaced by an empty 304. Otherwise it is sent compressed with the best
+    encoding the client accepts (br, zstd, gzip, as installed); the
+    compressed bytes are cached by digest, so repeated payloads are
+    compressed once. Streamed responses pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+
+        request_headers = dict(scope.get("headers", []))
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        encoding = negotiate(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                headers = {key.lower(): value for key, value in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if (message["status"] != 200 or b"content-encoding" in headers
+                        or content_type.startswith(STREAMING_TYPES)
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                    passthrough = True
+                    return await send(message)
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+            if message.get("more_body", False):
+                # Streamed in pieces: no single body to hash or compress
+                passthrough = True
+                await send(start_message)
+                return await send(message)
+            await self._send_complete(start_message, message.get("body", b""), if_none_match, encoding, send)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_complete(self, start_message, body, if_none_match, encoding, send):
+        headers = [(key, value) for key, value in start_message.get("headers", [])
+                   if key.lower() not in (b"content-length", b"etag", b"vary")]
+        vary = [value for key, value in start_message.get("headers", []) if key.lower() == b"vary"]
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        compress = encoding is not None and len(body) >= COMPRESSION_MIN_BYTES
+        # A strong tag names exact bytes, so each encoding gets its own
+        etag = f'"{digest}-{encoding}"' if compress else f'"{digest}"'
+        headers += [(b"etag", etag.encode()), (b"vary", b", ".join(vary + [b"Accept-Encoding"]))]
+
+        if if_none_match and _etag_matches(if_none_match, digest):
+            compressed_bodies.not_modified += 1
+            headers = [(key, value) for key, value in headers if key.lower() != b"content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            return await send({"type": "http.response.body", "body": b""})
+
+        if compress:
+            body = await compressed_bodies.get(digest, encoding, body)
+            headers.append((b"content-encoding", encoding.encode()))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send(dict(start_message, headers=headers))
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,229 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from pymongo import monitoring
+
+# "0" turns every timer into a no-op and leaves the middleware/listener out
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+# Emit OpenTelemetry spans for requests and stages (needs opentelemetry-api and an SDK configured)
+METRICS_TRACING = os.getenv("METRICS_TRACING", "0") == "1"
+
+# Seconds; covers sub-millisecond numpy stages up to slow LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+tracer = None
+if METRICS_ENABLED and METRICS_TRACING:
+    try:
+        from opentelemetry import propagate, trace
+        tracer = trace.get_tracer("ott-backend")
+    except ImportError:
+        print("⚠️ opentelemetry-api not installed. Tracing disabled.")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_labels(self.label_names, key)} {value}" for key, value in sorted(values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, labels=(), value=0.0):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format"""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[slot] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        lines = []
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {values[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """`collect()` returns {metric name: value} of gauges read at scrape time"""
+        self.collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for collect in self.collectors:
+            try:
+                values = collect()
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+                continue
+            for name, value in values.items():
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+registry = Registry()
+
+request_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")))
+requests_in_flight = registry.register(Gauge("http_requests_in_flight", "Requests currently being served"))
+stage_seconds = registry.register(Histogram(
+    "stage_duration_seconds", "Time spent in instrumented stages of a request", ("stage",)))
+mongo_command_seconds = registry.register(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("command", "outcome")))
+
+
+# --- Stage timers ---
+@contextmanager
+def _timed_stage(name):
+    span = tracer.start_as_current_span(name) if tracer is not None else nullcontext()
+    start = time.perf_counter()
+    with span:
+        try:
+            yield
+        finally:
+            stage_seconds.observe((name,), time.perf_counter() - start)
+
+
+def stage(name):
+    """`with stage("recommend.scoring"):` records the block's duration (no-op when disabled)"""
+    if not METRICS_ENABLED:
+        return nullcontext()
+    return _timed_stage(name)
+
+
+# --- ASGI middleware ---
+def _route_template(scope):
+    # Newer FastAPI keeps included routers nested and records the full template separately
+    route = (scope.get("fastapi") or {}).get("effective_route_context") or scope.get("route")
+    return getattr(route, "path_format", None) or "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Per-route latency histogram and in-flight gauge.
+
+    Routes are labelled by their template ("/platform/{platform_name}"), so
+    path parameters do not blow up the number of series; unmatched paths
+    share the "<unmatched>" label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _track(self, delta):
+        with self._lock:
+            self._in_flight += delta
+            requests_in_flight.set((), self._in_flight)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        span = nullcontext()
+        if tracer is not None:
+            carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", [])}
+            span = tracer.start_as_current_span(
+                f"{scope['method']} {scope['path']}", context=propagate.extract(carrier))
+
+        self._track(1)
+        start = time.perf_counter()
+        try:
+            with span:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            self._track(-1)
+            request_seconds.observe((scope["method"], _route_template(scope), str(status)), time.perf_counter() - start)
+
+
+# --- Mongo ---
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Command latency by name; passed to the client through event_listeners"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_command_seconds.observe((event.command_name, "ok"), event.duration_micros / 1e6)
+
+    def failed(self, event):
+        mongo_command_seconds.observe((event.command_name, "error"), event.duration_micros / 1e6)
+
+
+# Singleton instance
+mongo_command_metrics = MongoCommandMetrics()
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import hashlib
+import math
+import os
+from datetime import datetime
+
+import orjson
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from utils.cache import LRUCache, catalog_generation
+from utils.serialization import dumps
+
+# Totals and page -> cursor bookmarks are reused for this long per filter
+PAGINATION_COUNT_TTL = float(os.getenv("PAGINATION_COUNT_TTL", 30))
+PAGINATION_MAX_LIMIT = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# --- Cursor tokens ---
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and set(value) == {"d"}:
+        return datetime.fromisoformat(value["d"])
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise InvalidCursor("Malformed cursor")
+
+
+def encode_cursor(value, doc_id, digest: str) -> str:
+    raw = orjson.dumps([_encode_value(value), str(doc_id), digest])
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(token: str, digest: str):
+    """(sort value, _id) of the last row a cursor was issued after"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        value, doc_id, cursor_digest = orjson.loads(raw)
+        doc_id = ObjectId(doc_id)
+    except (binascii.Error, orjson.JSONDecodeError, InvalidId, TypeError, ValueError):
+        raise InvalidCursor("Malformed cursor")
+    if cursor_digest != digest:
+        raise InvalidCursor("Cursor belongs to a different filter or sort order")
+    return _decode_value(value), doc_id
+
+
+def query_digest(*parts) -> str:
+    return hashlib.blake2b(dumps(parts), digest_size=8).hexdigest()
+
+
+def keyset_filter(field, direction, value, doc_id):
+    """Rows strictly after (value, _id) in `sort((field, direction), ("_id", direction))` order.
+
+    Missing/null values sort first ascending and last descending, and `$lt`/`$gt`
+    never match them, so they get their own clauses.
+    """
+    after = "$gt" if direction == 1 else "$lt"
+    if value is None:
+        tail = {field: None, "_id": {after: doc_id}}
+        return {"$or": [tail, {field: {"$ne": None}}]} if direction == 1 else tail
+    clauses = [{field: {after: value}}, {field: value, "_id": {after: doc_id}}]
+    if direction == -1:
+        clauses.append({field: None})
+    return {"$or": clauses}
+
+
+# --- Paginator ---
+class KeysetPaginator:
+    """Cursor (keyset) pagination for one collection, with cached totals.
+
+    `sort_fields` maps the public sort names to document fields; each has a
+    (field, _id) index, so every page is an index range scan whatever its
+    depth. Clients pass back `next_cursor`; plain `page` numbers still work
+    and reuse the cursor remembered for that page when a client walks pages
+    in order, falling back to skip() only for jumps. Totals are cached per
+    filter for PAGINATION_COUNT_TTL (the unfiltered total is the collection's
+    estimated count); for catalog collections the cache key includes the
+    catalog generation, so admin writes are seen at once.
+    """
+
+    def __init__(self, name, sort_fields, catalog=False):
+        self.name = name
+        self.sort_fields = sort_fields
+        self.catalog = catalog
+        self._totals = LRUCache(max_entries=1024)
+        self._bookmarks = LRUCache(max_entries=4096)
+
+    def _generation(self):
+        return catalog_generation.current() if self.catalog else 0
+
+    async def total(self, collection, query) -> int:
+        if not query:
+            return await collection.estimated_document_count()
+        key = (self._generation(), query_digest(query))
+        total = self._totals.get(key)
+        if total is None:
+            total = await collection.count_documents(query)
+            self._totals.set(key, total, ttl=PAGINATION_COUNT_TTL)
+        return total
+
+    async def page(self, collection, query, sort_by, order="desc", limit=20, cursor=None, page=1):
+        """{"data": [docs], "total", "page", "pages", "next_cursor"}; raises InvalidCursor/KeyError"""
+        field = self.sort_fields[sort_by]
+        direction = 1 if order == "asc" else -1
+        limit = max(1, min(limit, PAGINATION_MAX_LIMIT))
+        page = max(1, page)
+        digest = query_digest(self.name, query, field, direction)
+
+        paged = cursor is None
+        if paged and page > 1:
+            cursor = self._bookmarks.get((self._generation(), digest, limit, page))
+        find = query
+        skip = 0
+        if cursor is not None:
+            value, doc_id = decode_cursor(cursor, digest)
+            after = keyset_filter(field, direction, value, doc_id)
+            find = {"$and": [query, after]} if query else after
+        else:
+            skip = (page - 1) * limit
+
+        docs = await collection.find(find).sort([(field, direction), ("_id", direction)]) \
+            .skip(skip).limit(limit + 1).to_list(limit + 1)
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            last = docs[-1]
+            next_cursor = encode_cursor(last.get(field), last["_id"], digest)
+            if paged:
+                self._bookmarks.set((self._generation(), digest, limit, page + 1), next_cursor,
+                                    ttl=PAGINATION_COUNT_TTL)
+
+        total = await self.total(collection, query)
+        return {
+            "data": docs,
+            "total": total,
+            "page": page,
+            "pages": math.ceil(total / limit),
+            "next_cursor": next_cursor,
+        }
@@ -0,0 +1,187 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+from utils.cache import LRUCache
+
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", 60))
+PROFILER_MIN_INTERVAL_MS = float(os.getenv("PROFILER_MIN_INTERVAL_MS", 1))
+# Requests carrying this header (and an admin bearer token) are run under cProfile
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "x-profile").lower()
+PROFILE_RESULTS_KEPT = int(os.getenv("PROFILE_RESULTS_KEPT", 50))
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+    """Wall-clock stack sampler for the whole process.
+
+    A background thread reads `sys._current_frames()` every interval and
+    counts each thread's stack, root first. Nothing is hooked into the
+    interpreter, so the cost is one stack walk per thread per sample, paid
+    only while a session runs; one session at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_run = None
+
+    def sample(self, seconds, interval=0.01, include_idle=False):
+        """Blocks for `seconds`; returns (Counter of collapsed stacks, sample count)"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profiling session is already running")
+        try:
+            me = threading.get_ident()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = Counter()
+            samples = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    if not include_idle and stack and self._is_idle(stack[0]):
+                        continue
+                    stack.append(names.get(ident, f"thread-{ident}"))
+                    stacks[";".join(reversed(stack))] += 1
+                samples += 1
+                time.sleep(interval)
+            self.last_run = {"at": time.time(), "seconds": seconds, "samples": samples}
+            return stacks, samples
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _is_idle(leaf):
+        # Threads parked in the selector, a queue or a lock wait are not using CPU
+        return leaf.split(":")[1] in {"select", "poll", "wait", "_wait_for_tstate_lock", "_worker"}
+
+    @staticmethod
+    def collapsed(stacks):
+        """Brendan Gregg's folded format, as read by flamegraph.pl and speedscope"""
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+
+class RequestProfiles:
+    """cProfile output of flagged requests, kept for a while so an admin can fetch it"""
+
+    def __init__(self, max_entries=PROFILE_RESULTS_KEPT):
+        self._results = LRUCache(max_entries=max_entries)
+        self._recent = deque(maxlen=max_entries)
+        # cProfile hooks the whole event-loop thread; profile one request at a time
+        self._active = threading.Lock()
+
+    def start(self):
+        """A running cProfile.Profile, or None when another request is being profiled"""
+        if not self._active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile, method, path, duration):
+        profile.disable()
+        self._active.release()
+        profile_id = uuid.uuid4().hex[:12]
+        summary = {"id": profile_id, "method": method, "path": path,
+                   "duration_ms": round(duration * 1000, 2), "at": time.time()}
+        self._results.set(profile_id, dict(summary, profile=profile))
+        self._recent.append(summary)
+        return profile_id
+
+    def recent(self):
+        return [summary for summary in reversed(self._recent) if self._results.get(summary["id"]) is not None]
+
+    def report(self, profile_id, sort="cumulative", limit=60):
+        entry = self._results.get(profile_id)
+        if entry is None:
+            return None
+        out = io.StringIO()
+        stats = pstats.Stats(entry["profile"], stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        header = f"{entry['method']} {entry['path']} took {entry['duration_ms']} ms\n"
+        return header + out.getvalue()
+
+
+class RequestProfilerMiddleware:
+    """Runs requests flagged with the profile header under cProfile.
+
+    Only admins may do this: the bearer token is checked with the same
+    dependency the admin routes use. The response carries `X-Profile-Id`;
+    the report is at GET /admin/profile/requests/{id}. cProfile sees the
+    event-loop thread, so sync route handlers (run in the threadpool) show up
+    only as the wait for their result; use the sampling profiler for those.
+    """
+
+    def __init__(self, app, authorize):
+        self.app = app
+        self.authorize = authorize
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers", []))
+        if not headers.get(PROFILE_HEADER.encode()):
+            return await self.app(scope, receive, send)
+
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        token = authorization[7:] if authorization.lower().startswith("bearer ") else ""
+        try:
+            await self.authorize(token)
+        except Exception:
+            # Not an admin: serve the request as if the header were absent
+            return await self.app(scope, receive, send)
+
+        profile = request_profiles.start()
+        if profile is None:
+            return await self.app(scope, receive, send)
+
+        profile_id = None
+        start = time.perf_counter()
+        held = []
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Headers go out first; hold them until the id exists
+                held.append(message)
+                return
+            if held and message["type"] == "http.response.body" and not message.get("more_body", False):
+                nonlocal profile_id
+                profile_id = request_profiles.finish(profile, scope["method"], scope["path"],
+                                                     time.perf_counter() - start)
+                start_message = held.pop()
+                start_message["headers"] = list(start_message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode())]
+                await send(start_message)
+            elif held:
+                start_message = held.pop()
+                await send(start_message)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profile_id is None:
+                request_profiles.finish(profile, scope["method"], scope["path"], time.perf_counter() - start)
+
+
+# Singleton instance
+sampling_profiler = SamplingProfiler()
+request_profiles = RequestProfiles()
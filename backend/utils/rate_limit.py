@@ -0,0 +1,35 @@
+import threading
+import time
+
+from utils.cache import LRUCache
+
+
+class RateLimiter:
+    """Token bucket per client: `burst` tokens, refilled at `rate` per second.
+
+    Buckets live in a bounded LRU, so a flood of distinct clients cannot grow
+    memory; an evicted client simply starts again with a full bucket.
+    """
+
+    def __init__(self, rate, burst, max_clients=100000):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = LRUCache(max_entries=max_clients)
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def acquire(self, client, cost=1) -> float:
+        """Take `cost` tokens; returns 0 when allowed, else the seconds until they would be available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if cost > tokens:
+                self._buckets.set(client, (tokens, now))
+                self.limited += 1
+                return (cost - tokens) / self.rate if self.rate > 0 else float("inf")
+            self._buckets.set(client, (tokens - cost, now))
+            return 0.0
+
+    def stats(self):
+        return {"rate": self.rate, "burst": self.burst, "clients": len(self._buckets), "limited": self.limited}
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+
+# Set when this module is first imported, i.e. close to process start
+PROCESS_STARTED_AT = time.perf_counter()
+# Failed critical components are warmed again after this backoff (doubling up to the max)
+READINESS_RETRY_MIN_SECONDS = float(os.getenv("READINESS_RETRY_MIN_SECONDS", 2))
+READINESS_RETRY_MAX_SECONDS = float(os.getenv("READINESS_RETRY_MAX_SECONDS", 120))
+
+
+class Readiness:
+    """Startup phase timings and the warm-up state of each subsystem, for /readyz.
+
+    Phases are the synchronous steps before the server accepts connections;
+    components are warmed in the background afterwards. The app is ready once
+    every critical component is. A critical component whose warm-up fails is
+    retried with backoff until it succeeds, so one transient error does not
+    keep the app unready for the life of the process.
+    """
+
+    def __init__(self):
+        self.phases = {}  # phase -> seconds
+        self.components = {}  # name -> {"state", "critical", "seconds", "error"}
+        self.listening_after = None
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - start, 3)
+
+    def record_phase(self, name, seconds):
+        self.phases[name] = round(seconds, 3)
+
+    def listening(self):
+        """Called right before the server starts accepting connections"""
+        self.listening_after = round(time.perf_counter() - PROCESS_STARTED_AT, 3)
+        timings = ", ".join(f"{name} {seconds}s" for name, seconds in self.phases.items())
+        print(f"✅ Accepting connections {self.listening_after}s after start ({timings})")
+
+    def register(self, name, critical=True):
+        self.components.setdefault(name, {"state": "pending", "critical": critical, "seconds": None, "error": None,
+                                          "attempts": 0})
+
+    async def track(self, name, warm, critical=True):
+        """Await `warm()` and record how it went; failures are reported, not raised.
+
+        Critical components are retried until `warm()` succeeds (state "retrying" in between).
+        """
+        self.register(name, critical)
+        component = self.components[name]
+        component.update(state="warming", critical=critical, error=None)
+        start = time.perf_counter()
+        delay = READINESS_RETRY_MIN_SECONDS
+        try:
+            while True:
+                component["attempts"] += 1
+                try:
+                    await warm()
+                    component.update(state="ready", error=None)
+                    return
+                except asyncio.CancelledError:
+                    component["state"] = "cancelled"
+                    raise
+                except Exception as e:
+                    component["error"] = str(e)
+                    if not critical:
+                        component["state"] = "failed"
+                        print(f"⚠️ Warm-up of {name} failed: {e}")
+                        return
+                    component["state"] = "retrying"
+                    print(f"⚠️ Warm-up of {name} failed (attempt {component['attempts']}): {e}. Retrying in {delay:g}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, READINESS_RETRY_MAX_SECONDS)
+        finally:
+            component["seconds"] = round(time.perf_counter() - start, 3)
+
+    @property
+    def ready(self):
+        return all(c["state"] == "ready" for c in self.components.values() if c["critical"])
+
+    def snapshot(self):
+        return {
+            "ready": self.ready,
+            "components": self.components,
+            "startup": {"phases": self.phases, "listening_after_s": self.listening_after},
+        }
+
+
+# Singleton instance
+readiness = Readiness()
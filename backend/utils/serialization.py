@@ -0,0 +1,103 @@
+import threading
+from decimal import Decimal
+
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi.responses import Response
+
+from utils.metrics import stage
+
+# numpy arrays/scalars are encoded natively, int dict keys (e.g. years) are allowed
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    """Fallback encoder for types orjson does not know about (BSON, pandas, sets)"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return float(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # pandas Timestamp / Timedelta and friends
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    # numpy scalars that slipped past OPT_SERIALIZE_NUMPY (e.g. np.bool_)
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content) -> bytes:
+    """Encode content to JSON bytes; ObjectId/datetime/numpy are handled natively"""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+def loads(data):
+    return orjson.loads(data)
+
+
+class FastJSONResponse(Response):
+    """orjson-backed JSON response.
+
+    Returning this directly from a route skips FastAPI's `jsonable_encoder`
+    pass, which is where most of the time goes for big lists of Mongo docs.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        with stage("serialize"):
+            return dumps(content)
+
+
+class PreEncodedCache:
+    """Keeps encoded JSON bytes for payloads derived from immutable datasets"""
+
+    def __init__(self):
+        self._store = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_encode(self, key, builder) -> bytes:
+        body = self._store.get(key)
+        if body is not None:
+            self.hits += 1
+            return body
+
+        self.misses += 1
+        body = dumps(builder())
+        with self._lock:
+            # Another thread may have encoded it meanwhile, keep the first one
+            body = self._store.setdefault(key, body)
+        return body
+
+    def invalidate(self, prefix=None):
+        """Drop every entry, or only keys whose first element equals `prefix`"""
+        with self._lock:
+            if prefix is None:
+                self._store.clear()
+                return
+            for key in [k for k in self._store if isinstance(k, tuple) and k and k[0] == prefix]:
+                del self._store[key]
+
+    def stats(self):
+        return {
+            "entries": len(self._store),
+            "bytes": sum(len(v) for v in self._store.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Singleton instance
+preencoded_cache = PreEncodedCache()
+
+
+def preencoded_response(key, builder) -> Response:
+    """Serve `builder()` from cached bytes, building and encoding it only once per key"""
+    body = preencoded_cache.get_or_encode(key, builder)
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", 50000))
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", 1000))
+WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv("WRITE_BEHIND_FLUSH_SECONDS", 1.0))
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", 5))
+
+
+class WriteBehindBuffer:
+    """Bounded in-memory buffer that hands items to `flush(batch)` in the background.
+
+    A batch is flushed as soon as `max_batch` items are waiting or `flush_seconds`
+    after its first item arrived. Listeners added with `subscribe` see accepted
+    items immediately, before they are written. `submit` never blocks: it returns False when the
+    buffer is full so the caller can push back on the client. A failed flush is
+    retried with backoff before the batch is dropped; `stop` drains everything
+    that is still buffered.
+    """
+
+    def __init__(self, name, flush, max_queue=WRITE_BEHIND_MAX_QUEUE, max_batch=WRITE_BEHIND_MAX_BATCH,
+                 flush_seconds=WRITE_BEHIND_FLUSH_SECONDS, max_retries=WRITE_BEHIND_MAX_RETRIES):
+        self.name = name
+        self.flush = flush
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.flush_seconds = flush_seconds
+        self.max_retries = max_retries
+        self._items = deque()
+        self._in_flight = []
+        self._not_empty = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = None
+        self._closing = False
+        self._listeners = []
+        self.stats = {"submitted": 0, "rejected": 0, "flushed": 0, "batches": 0, "failed_flushes": 0, "dropped": 0}
+        self.last_flush_ms = 0.0
+
+    @property
+    def depth(self):
+        return len(self._items)
+
+    def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    def subscribe(self, listener):
+        """Call `listener(items)` with every accepted submission"""
+        self._listeners.append(listener)
+
+    def submit(self, items) -> bool:
+        """Queue all of `items` or none of them"""
+        if self._closing or len(self._items) + len(items) > self.max_queue:
+            self.stats["rejected"] += len(items)
+            return False
+        self._items.extend(items)
+        self.stats["submitted"] += len(items)
+        for listener in self._listeners:
+            try:
+                listener(items)
+            except Exception as e:
+                print(f"{self.name} listener failed: {e}")
+        self._not_empty.set()
+        if len(self._items) >= self.max_batch:
+            self._full.set()
+        return True
+
+    def pending(self, predicate=None):
+        """Items accepted but not yet written (including the batch being flushed), oldest first"""
+        items = [*self._in_flight, *self._items]
+        return items if predicate is None else [item for item in items if predicate(item)]
+
+    async def stop(self):
+        """Stop accepting items and flush whatever is buffered"""
+        self._closing = True
+        self._not_empty.set()
+        self._full.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while True:
+            if not self._items:
+                if self._closing:
+                    return
+                self._not_empty.clear()
+                await self._not_empty.wait()
+                continue
+
+            # Give a partial batch until the interval is up to fill
+            if len(self._items) < self.max_batch and not self._closing:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = [self._items.popleft() for _ in range(min(self.max_batch, len(self._items)))]
+            self._in_flight = batch
+            try:
+                await self._flush_with_retry(batch)
+            finally:
+                self._in_flight = []
+
+    async def _flush_with_retry(self, batch):
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                await self.flush(batch)
+                self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+                self.stats["flushed"] += len(batch)
+                self.stats["batches"] += 1
+                return
+            except Exception as e:
+                self.stats["failed_flushes"] += 1
+                print(f"⚠️ {self.name} flush of {len(batch)} items failed (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(min(2 ** attempt * 0.5, 10))
+        self.stats["dropped"] += len(batch)
+        print(f"❌ {self.name}: dropped {len(batch)} items after {self.max_retries + 1} attempts")
+
+    def snapshot(self):
+        return dict(self.stats, name=self.name, depth=self.depth, max_queue=self.max_queue,
+                    last_flush_ms=self.last_flush_ms)
@@ -4,6 +4,7 @@ import {
     PieChart, Pie, Cell, LineChart, Line, AreaChart, Area
 } from 'recharts';
 import { API_URL } from '../config/api';
+import { loadCatalogIndex } from '../utils/catalog';
 
 const UserAnalytics = () => {
     // --- State ---
@@ -61,8 +62,7 @@ const UserAnalytics = () => {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const response = await fetch('/data/final_df_cleaned.json');
-                const jsonData = await response.json();
+                const jsonData = await loadCatalogIndex();
                 setData(jsonData);
                 setLoading(false);
             } catch (error) {
@@ -5,6 +5,7 @@ import Head from 'next/head';
 import AdminSidebar from '../../components/AdminSidebar';
 import { API_URL } from '../../config/api';
 import Link from 'next/link';
+import { loadCatalogDetails, loadCatalogIndex } from '../../utils/catalog';
 
 export default function ContentManagement() {
     const [content, setContent] = useState([]);
@@ -18,6 +19,7 @@ export default function ContentManagement() {
         minRating: 0
     });
     const [searchTerm, setSearchTerm] = useState('');
+    const [details, setDetails] = useState({});
     const [pagination, setPagination] = useState({ page: 1, limit: 15 });
     const router = useRouter();
 
@@ -29,40 +31,14 @@ export default function ContentManagement() {
             }
 
             try {
-                // Fetch both datasets
-                const [finalRes, newRes] = await Promise.all([
-                    fetch('/data/final_df_cleaned.json'),
-                    fetch('/data/new_data.json')
-                ]);
+                // Slim catalog index: main dataset plus the 2021-2025 additions
+                const rows = await loadCatalogIndex();
 
-                const finalData = await finalRes.json();
-                const newData = await newRes.json();
-
-                // Normalize New Data
-                const normalizedNewData = newData.map((item, idx) => ({
-                    _id: `new-${idx}`,
-                    Title: item.title,
-                    Year: item.year,
-                    IMDb: item.imdb_rating,
-                    Type: item.type,
-                    Netflix: item.platform === 'Netflix' ? 1 : 0,
-                    'Prime Video': item.platform === 'Prime Video' ? 1 : 0,
-                    Hulu: item.platform === 'Hulu' ? 1 : 0,
-                    'Disney+': item.platform === 'Disney+' ? 1 : 0,
-                    isNew: true
-                }));
-
-                // Normalize Final Data (ensure IDs)
-                const normalizedFinalData = finalData.map((item, idx) => ({
+                const combined = rows.map(item => ({
                     ...item,
-                    _id: `final-${idx}`,
-                    // Ensure numeric types
-                    Year: parseInt(item.Year),
-                    IMDb: parseFloat(item.IMDb)
+                    _id: `${item.source}-${item._index}`,
+                    isNew: item.source === 'new_data'
                 }));
-
-                // Combine
-                const combined = [...normalizedNewData, ...normalizedFinalData];
                 setContent(combined);
                 setLoading(false);
             } catch (err) {
@@ -74,6 +50,25 @@ export default function ContentManagement() {
         fetchData();
     }, []);
 
+    // Directors, age rating and runtime live in per-platform/decade shards:
+    // fetch only the ones the platform and year filters select
+    useEffect(() => {
+        if (filters.platform === 'all' && filters.year === 'all') {
+            setDetails({});
+            return;
+        }
+        let cancelled = false;
+        loadCatalogDetails({
+            platform: filters.platform === 'all' ? null : filters.platform,
+            year: filters.year === 'all' ? null : filters.year
+        })
+            .then(rows => {
+                if (!cancelled) setDetails(Object.fromEntries(rows.map(row => [row._index, row])));
+            })
+            .catch(err => console.error("Failed to load content details", err));
+        return () => { cancelled = true; };
+    }, [filters.platform, filters.year]);
+
     // --- Filtering Logic ---
     const filteredContent = useMemo(() => {
         let result = content;
@@ -262,6 +257,13 @@ export default function ContentManagement() {
                                                     {item.isNew && <span className="bg-primary text-[10px] uppercase font-bold px-1.5 rounded">New</span>}
                                                     {item.Title}
                                                 </div>
+                                                {details[item._index] && (
+                                                    <div className="text-xs text-gray-500 font-normal mt-1">
+                                                        {[details[item._index].Directors, details[item._index].Age,
+                                                          details[item._index].Runtime && `${details[item._index].Runtime} min`]
+                                                            .filter(Boolean).join(' · ')}
+                                                    </div>
+                                                )}
                                             </td>
                                             <td className="px-6 py-4 font-mono">{item.Year}</td>
                                             <td className="px-6 py-4 capitalize">
@@ -70,6 +70,29 @@ export default function AICommandCenter() {
   };
 
   // --- 2. Chat Logic ---
+  // Calls onEvent(event, data) for each server-sent event of a streamed response
+  const readEventStream = async (response, onEvent) => {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const blocks = buffer.split('\n\n');
+      buffer = blocks.pop();
+      blocks.forEach(block => {
+        let event = 'message';
+        let data = '';
+        block.split('\n').forEach(line => {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        });
+        if (data) onEvent(event, JSON.parse(data));
+      });
+    }
+  };
+
   const sendMessage = async (msgText = '', category = 'general') => {
     const text = msgText || input;
     if (!text) return;
@@ -98,6 +121,7 @@ export default function AICommandCenter() {
           method: 'POST',
           headers: {
             'Content-Type': 'application/json',
+            'Accept': 'text/event-stream',
             'Authorization': `Bearer ${token}`
           },
           body: JSON.stringify({ user_email: userEmail, message: text, category }),
@@ -109,6 +133,26 @@ export default function AICommandCenter() {
         return;
       }
 
+      if (response.ok && response.headers.get('content-type')?.startsWith('text/event-stream')) {
+        // Show the reply as it is written: one message, updated with each token
+        let streamed = '';
+        setMessages(prev => [...prev, { role: 'ai', text: '' }]);
+        setLoading(false);
+        const updateReply = (replyText) => setMessages(prev => [...prev.slice(0, -1), { role: 'ai', text: replyText }]);
+        await readEventStream(response, (event, data) => {
+          if (event === 'token') {
+            streamed += data.text;
+            updateReply(streamed);
+          } else if (event === 'done') {
+            updateReply(data.response);
+          } else if (event === 'error') {
+            updateReply(streamed || 'System Error: Brain Engine could not answer. Please retry.');
+          }
+        });
+        fetchHistory(userEmail);
+        return;
+      }
+
       const data = await response.json();
 
       const aiMsg = {
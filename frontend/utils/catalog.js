@@ -0,0 +1,123 @@
+// Lazy loader for the static catalog files written by backend/catalog_artifacts.py.
+// The manifest is revalidated on every load; the hashed files it points to never change,
+// so the browser cache keeps them (see the [[headers]] rules in netlify.toml). Records use the dataset's column names (Title, Year,
+// IMDb, Type, Genres, Netflix, Hulu, 'Prime Video', 'Disney+', ...).
+
+const BASE_PATH = '/data/catalog';
+const MANIFEST_PATH = '/data/catalog-manifest.json';
+// Sources the dashboards have always shown; 'upcoming' holds unreleased 2025-2026 titles
+const DEFAULT_SOURCES = ['catalog', 'new_data'];
+
+let manifestPromise = null;
+const shardPromises = {};
+
+const fetchJson = async (path, options) => {
+    const response = await fetch(path, options);
+    if (!response.ok) {
+        throw new Error(`Failed to load ${path}: ${response.status}`);
+    }
+    return response.json();
+};
+
+// Columnar table -> array of row objects, resolving dictionary-encoded columns
+const decodeTable = (table) => {
+    const names = Object.keys(table.columns);
+    const columns = names.map(name => {
+        const values = table.columns[name];
+        const dictionary = table.dictionaries[name];
+        return dictionary ? values.map(code => (code === null ? null : dictionary[code])) : values;
+    });
+    const rows = new Array(table.count);
+    for (let r = 0; r < table.count; r++) {
+        const row = {};
+        for (let c = 0; c < names.length; c++) {
+            row[names[c]] = columns[c][r];
+        }
+        rows[r] = row;
+    }
+    return rows;
+};
+
+export const loadManifest = () => {
+    if (!manifestPromise) {
+        manifestPromise = fetchJson(MANIFEST_PATH, { cache: 'no-cache' }).catch(error => {
+            manifestPromise = null;
+            throw error;
+        });
+    }
+    return manifestPromise;
+};
+
+const indexPromises = {};
+
+// One index part (one source), numbered from the part's start so positions match the shards' "i"
+const loadIndexPart = (manifest, part) => {
+    if (!indexPromises[part.file]) {
+        indexPromises[part.file] = fetchJson(`${BASE_PATH}/${part.file}`)
+            .then(table => {
+                const rows = decodeTable(table);
+                rows.forEach((row, i) => {
+                    // Platform bitmask -> the 0/1 flag columns the components filter on
+                    manifest.platforms.forEach((platform, bit) => {
+                        row[platform] = (row.platforms >> bit) & 1;
+                    });
+                    delete row.platforms;
+                    row.source = part.source;
+                    row._index = part.start + i;
+                });
+                return rows;
+            })
+            .catch(error => {
+                delete indexPromises[part.file];
+                throw error;
+            });
+    }
+    return indexPromises[part.file];
+};
+
+// Only the parts for `sources` (all of them when null) are fetched
+const loadIndexRows = async (sources) => {
+    const manifest = await loadManifest();
+    const parts = manifest.index.filter(part => !sources || sources.includes(part.source));
+    const loaded = await Promise.all(parts.map(part => loadIndexPart(manifest, part)));
+    return loaded.flat();
+};
+
+// Every item with the fields lists and charts need; the upcoming titles are a separate part, fetched on request
+export const loadCatalogIndex = ({ sources = DEFAULT_SOURCES } = {}) => loadIndexRows(sources);
+
+const loadShard = (file) => {
+    if (!shardPromises[file]) {
+        shardPromises[file] = fetchJson(`${BASE_PATH}/${file}`).then(decodeTable).catch(error => {
+            delete shardPromises[file];
+            throw error;
+        });
+    }
+    return shardPromises[file];
+};
+
+// Index rows completed with the detail columns (Directors, Country, Language, Age, ...),
+// fetching only the shards for `platform` (or all) and the decades covering `year` (or all)
+export const loadCatalogDetails = async ({ platform = null, year = null, sources = DEFAULT_SOURCES } = {}) => {
+    const manifest = await loadManifest();
+    const decade = year ? `${Math.floor(parseInt(year) / 10) * 10}s` : null;
+    const shards = manifest.shards.filter(shard =>
+        (!platform || shard.platform === platform) && (!decade || shard.decade === decade)
+    );
+    const [index, ...parts] = await Promise.all([loadIndexRows(sources), ...shards.map(shard => loadShard(shard.file))]);
+    const byPosition = new Map(index.map(row => [row._index, row]));
+
+    const seen = new Set();
+    const rows = [];
+    parts.forEach(part => part.forEach(({ i, ...details }) => {
+        // Items on several platforms appear in each platform's shard
+        if (seen.has(i)) return;
+        seen.add(i);
+        // Missing when the item's source was not asked for
+        const row = byPosition.get(i);
+        if (row) {
+            rows.push({ ...row, ...details });
+        }
+    }));
+    return rows.sort((a, b) => a._index - b._index);
+};